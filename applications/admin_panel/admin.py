@@ -1,15 +1,15 @@
 from sqladmin import Admin
-from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 
 from .views import UserAdmin, TaskAdmin, TeamAdmin
 from applications.auth.security import FastAPIAuthBackend
 
 
-def setup_admin(app, engine: AsyncEngine):
+def setup_admin(app, session_maker: async_sessionmaker):
     admin = Admin(
         app,
-        engine,
+        session_maker=session_maker,
         title="Admin Panel",
         base_url="/admin",
         logo_url="https://example.com/logo.png",
@@ -1,5 +1,13 @@
-from sqladmin import ModelView
+import datetime
+
+from fastapi import Request
+from fastapi.responses import RedirectResponse
+from sqladmin import ModelView, action
+from cache import user_cache
+from database.database import async_session_maker
 from database.models import User, Task, Team
+from database.repositories import TaskRepository, task_channel
+from pubsub import hub
 
 
 class UserAdmin(ModelView, model=User):
@@ -12,6 +20,15 @@ class UserAdmin(ModelView, model=User):
     can_edit = True
     can_delete = True
 
+    # Служебные колонки валидаторов кэша меняет только база
+    form_excluded_columns = [User.updated_at, User.version]
+
+    async def after_model_change(self, data, model, is_created, request):
+        user_cache.invalidate(model.id)
+
+    async def after_model_delete(self, model, request):
+        user_cache.invalidate(model.id)
+
 
 class TaskAdmin(ModelView, model=Task):
     name = "Задача"
@@ -23,6 +40,63 @@ class TaskAdmin(ModelView, model=Task):
     can_edit = True
     can_delete = True
 
+    form_excluded_columns = [Task.updated_at, Task.version]
+
+    repository = TaskRepository()
+
+    async def after_model_change(self, data, model, is_created, request):
+        # Правка идёт мимо репозитория: открытые страницы задачи узнают
+        # о статусе и оценке так же, как после update_status. Календари
+        # версию считают по базе и в событиях не нуждаются
+        if is_created:
+            return
+        await hub.publish(task_channel(model.id), {
+            "type": "status",
+            "status": getattr(model.status, "code", model.status)
+        })
+        if model.assessment is not None:
+            await hub.publish(task_channel(model.id), {
+                "type": "assessment", "assessment": model.assessment
+            })
+
+    async def _bulk(self, request: Request, method, *args):
+        # Те же запросы, что и у списка задач, но без фильтра по автору:
+        # в админку пускают только администраторов
+        task_ids = [
+            int(pk) for pk in request.query_params.get("pks", "").split(",")
+            if pk.isdigit()
+        ]
+        async with async_session_maker() as session:
+            await method(session, task_ids, *args)
+        return RedirectResponse(
+            request.headers.get("referer")
+            or request.url_for("admin:list", identity=self.identity)
+        )
+
+    @action(name="mark_in_work", label="Статус: в работе")
+    async def mark_in_work(self, request: Request):
+        return await self._bulk(
+            request, self.repository.bulk_update_status, "in_work"
+        )
+
+    @action(name="mark_completed", label="Статус: выполнено")
+    async def mark_completed(self, request: Request):
+        return await self._bulk(
+            request, self.repository.bulk_update_status, "completed"
+        )
+
+    @action(name="shift_deadline_week", label="Сдвинуть срок на неделю")
+    async def shift_deadline_week(self, request: Request):
+        return await self._bulk(
+            request, self.repository.bulk_shift_deadline,
+            datetime.timedelta(weeks=1)
+        )
+
+    @action(name="bulk_delete", label="Удалить одним запросом",
+            confirmation_message="Удалить выбранные задачи?")
+    async def bulk_delete(self, request: Request):
+        return await self._bulk(request, self.repository.bulk_delete)
+
 
 class TeamAdmin(ModelView, model=Team):
     name = "Команды"
@@ -33,3 +107,5 @@ class TeamAdmin(ModelView, model=Team):
     can_create = True
     can_edit = True
     can_delete = True
+
+    form_excluded_columns = [Team.updated_at, Team.version]
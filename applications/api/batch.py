@@ -0,0 +1,134 @@
+from fastapi import status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from applications.api.schemas import (AddCommentOp, BatchIn, ChangeStatusOp,
+                                      ChangeAssessmentOp, CreateTaskOp,
+                                      TaskChatOut, TaskOut, dump)
+from database.database import write_queue
+from database.models import Task, User
+from database.repositories import TaskChatRepository, TaskRepository
+
+
+TASK_FIELDS = tuple(TaskOut.model_fields)
+COMMENT_FIELDS = tuple(TaskChatOut.model_fields)
+
+
+class OperationFailed(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+class BatchAborted(Exception):
+    # Атомарный пакет: откатывает единицу записи целиком
+    pass
+
+
+def failed(status_code: int, error: str) -> dict:
+    return {"status": status_code, "result": None, "error": error}
+
+
+class BatchRunner:
+    """Выполняет операции пакета по порядку в одной транзакции.
+
+    Каждая операция — те же вызовы репозиториев, что и у страниц, в своём
+    SAVEPOINT: ошибка откатывает только её. В атомарном пакете первая
+    ошибка откатывает всё, остальные операции получают 424.
+    """
+
+    def __init__(self, user: User, task_repo: TaskRepository,
+                 taskchat_repo: TaskChatRepository):
+        self.user = user
+        self.task_repo = task_repo
+        self.taskchat_repo = taskchat_repo
+
+    async def run(self, session: AsyncSession, batch: BatchIn) -> dict:
+        results = []
+
+        async def unit(writer_session: AsyncSession):
+            for operation in batch.operations:
+                results.append(await self.execute(writer_session, operation))
+                if batch.atomic and results[-1]["error"]:
+                    # Откат единицы отменяет и события/версии, которые
+                    # успели зарегистрировать прошлые операции (on_commit)
+                    raise BatchAborted()
+
+        try:
+            await write_queue.run(session, unit)
+        except BatchAborted:
+            *rolled_back, error = results
+            not_run = batch.operations[len(results):]
+            return {"committed": False, "results": [
+                *(failed(status.HTTP_424_FAILED_DEPENDENCY, "Пакет отменён")
+                  for _ in rolled_back),
+                error,
+                *(failed(status.HTTP_424_FAILED_DEPENDENCY, "Не выполнена")
+                  for _ in not_run),
+            ]}
+        return {"committed": True, "results": results}
+
+    async def execute(self, session: AsyncSession, operation) -> dict:
+        try:
+            async with session.begin_nested():
+                status_code, result = await getattr(self, operation.op)(
+                    session, operation
+                )
+        except OperationFailed as e:
+            return failed(e.status_code, str(e))
+        except (ValueError, SQLAlchemyError) as e:
+            return failed(status.HTTP_400_BAD_REQUEST, str(e))
+        return {"status": status_code, "result": result, "error": None}
+
+    async def _task(self, session: AsyncSession, task_id: int) -> Task:
+        # Задачу меняют только её создатель и исполнитель
+        task = await self.task_repo.get(session, task_id)
+        if not task:
+            raise OperationFailed(
+                status.HTTP_404_NOT_FOUND, "Такого задания не существует"
+            )
+        if self.user.id not in (task.creator, task.performer):
+            raise OperationFailed(
+                status.HTTP_403_FORBIDDEN, "Недостаточно прав"
+            )
+        return task
+
+    async def create_task(self, session: AsyncSession, op: CreateTaskOp):
+        if self.user.role != "admin":
+            raise OperationFailed(
+                status.HTTP_403_FORBIDDEN, "Недостаточно прав"
+            )
+        task = await self.task_repo.create_task(session, {
+            "creator": self.user,
+            "performer": op.performer,
+            "description": op.description,
+            "deadline": op.deadline
+        })
+        return status.HTTP_201_CREATED, dump(TaskOut, TASK_FIELDS, [task])[0]
+
+    async def change_status(self, session: AsyncSession, op: ChangeStatusOp):
+        await self._task(session, op.task_id)
+        task = await self.task_repo.update_status(
+            session, op.task_id, op.status
+        )
+        return status.HTTP_200_OK, dump(TaskOut, TASK_FIELDS, [task])[0]
+
+    async def change_assessment(self, session: AsyncSession,
+                                op: ChangeAssessmentOp):
+        await self._task(session, op.task_id)
+        task = await self.task_repo.update_assessment(
+            session, op.task_id, op.assessment
+        )
+        return status.HTTP_200_OK, dump(TaskOut, TASK_FIELDS, [task])[0]
+
+    async def add_comment(self, session: AsyncSession, op: AddCommentOp):
+        await self._task(session, op.task_id)
+        comment = await self.taskchat_repo.add(session, {
+            "user_id": self.user.id,
+            "task_id": op.task_id,
+            "text": op.text
+        })
+        return (
+            status.HTTP_201_CREATED,
+            dump(TaskChatOut, COMMENT_FIELDS, [comment])[0]
+        )
@@ -0,0 +1,289 @@
+import contextlib
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from applications.api.batch import BatchRunner
+from applications.api.schemas import (BatchIn, BatchOut, MeetingOut, PageOut,
+                                      TaskChatOut, TaskOut, TeamOut, dump,
+                                      parse_fields)
+from applications.auth.schemas import UserOut
+from applications.auth.security import get_current_user
+from database.database import AsyncSession, get_db
+from database.models import Task, User
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page
+from database.repositories import (MeetingRepository, TaskChatRepository,
+                                   TaskRepository, TeamRepository,
+                                   UserRepository)
+from dependencies import (get_meeting_repo, get_task_repo, get_taskchat_repo,
+                          get_team_repo, get_user_repo)
+
+
+# JSON для интеграций: те же репозитории, что и у страниц, но без
+# рендера шаблонов. Ответы собираются из строк с запрошенными колонками
+# и сериализуются orjson; response_model — только для документации
+router = APIRouter(
+    prefix='/api/v1', tags=["API"], default_response_class=ORJSONResponse
+)
+
+get_current_user_dep = get_current_user()
+get_current_user_dep_admin = get_current_user(admin=True)
+
+Limit = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+def fields_of(schema: type[BaseModel]):
+    def depends(
+        fields: Optional[str] = Query(
+            None, description="Поля через запятую: id,status,deadline"
+        )
+    ) -> tuple[str, ...]:
+        try:
+            return parse_fields(schema, fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            )
+    return depends
+
+
+def item_response(schema: type[BaseModel], fields: tuple[str, ...],
+                  item) -> ORJSONResponse:
+    if item is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return ORJSONResponse(dump(schema, fields, [item])[0])
+
+
+def page_response(schema: type[BaseModel], fields: tuple[str, ...],
+                  page: Page) -> ORJSONResponse:
+    return ORJSONResponse({
+        "items": dump(schema, fields, page.items),
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    })
+
+
+@contextlib.contextmanager
+def bad_cursor():
+    # Некорректный курсор — ошибка клиента
+    try:
+        yield
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+
+
+@router.get('/users/me', response_model=UserOut)
+async def api_current_user(
+    fields: tuple = Depends(fields_of(UserOut)),
+    current_user: User = Depends(get_current_user_dep)
+):
+    return item_response(UserOut, fields, current_user)
+
+
+@router.get('/users', response_model=PageOut[UserOut])
+async def api_users(
+    cursor: Optional[str] = None,
+    limit: int = Limit,
+    fields: tuple = Depends(fields_of(UserOut)),
+    current_user: User = Depends(get_current_user_dep_admin),
+    user_repo: UserRepository = Depends(get_user_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    with bad_cursor():
+        page = await user_repo.paginate(session, cursor, limit, fields=fields)
+    return page_response(UserOut, fields, page)
+
+
+@router.get('/users/{user_id}', response_model=UserOut)
+async def api_user(
+    user_id: int,
+    fields: tuple = Depends(fields_of(UserOut)),
+    current_user: User = Depends(get_current_user_dep),
+    user_repo: UserRepository = Depends(get_user_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    if current_user.role != "admin" and current_user.id != user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    return item_response(
+        UserOut, fields, await user_repo.get_fields(session, user_id, fields)
+    )
+
+
+@router.get('/tasks', response_model=PageOut[TaskOut])
+async def api_tasks(
+    cursor: Optional[str] = None,
+    limit: int = Limit,
+    fields: tuple = Depends(fields_of(TaskOut)),
+    current_user: User = Depends(get_current_user_dep),
+    task_repo: TaskRepository = Depends(get_task_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    with bad_cursor():
+        query = task_repo.user_tasks_query(
+            current_user.id, cursor, limit, fields
+        )
+    page = await task_repo.fetch_page(session, query)
+    return page_response(TaskOut, fields, page)
+
+
+async def get_task_for(session: AsyncSession, task_repo: TaskRepository,
+                       task_id: int, user: User, fields=("id",)):
+    # Задача видна только создателю и исполнителю
+    task = await task_repo.get_fields(
+        session, task_id, fields, Task.creator, Task.performer
+    )
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if user.id not in (task.creator, task.performer):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    return task
+
+
+@router.get('/tasks/{task_id}', response_model=TaskOut)
+async def api_task(
+    task_id: int,
+    fields: tuple = Depends(fields_of(TaskOut)),
+    current_user: User = Depends(get_current_user_dep),
+    task_repo: TaskRepository = Depends(get_task_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    task = await get_task_for(
+        session, task_repo, task_id, current_user, fields
+    )
+    return item_response(TaskOut, fields, task)
+
+
+@router.get('/tasks/{task_id}/comments', response_model=PageOut[TaskChatOut])
+async def api_task_comments(
+    task_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Limit,
+    fields: tuple = Depends(fields_of(TaskChatOut)),
+    current_user: User = Depends(get_current_user_dep),
+    task_repo: TaskRepository = Depends(get_task_repo),
+    taskchat_repo: TaskChatRepository = Depends(get_taskchat_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    # Последние сообщения; prev_cursor ведёт к более ранним
+    await get_task_for(session, task_repo, task_id, current_user)
+    with bad_cursor():
+        page = await taskchat_repo.get_history(
+            session, task_id, cursor, limit, fields
+        )
+    return page_response(TaskChatOut, fields, page)
+
+
+@router.get('/teams', response_model=PageOut[TeamOut])
+async def api_teams(
+    cursor: Optional[str] = None,
+    limit: int = Limit,
+    fields: tuple = Depends(fields_of(TeamOut)),
+    current_user: User = Depends(get_current_user_dep_admin),
+    team_repo: TeamRepository = Depends(get_team_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    with bad_cursor():
+        page = await team_repo.paginate(session, cursor, limit, fields=fields)
+    return page_response(TeamOut, fields, page)
+
+
+@router.get('/teams/{team_id}', response_model=TeamOut)
+async def api_team(
+    team_id: int,
+    fields: tuple = Depends(fields_of(TeamOut)),
+    current_user: User = Depends(get_current_user_dep),
+    team_repo: TeamRepository = Depends(get_team_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    return item_response(
+        TeamOut, fields, await team_repo.get_fields(session, team_id, fields)
+    )
+
+
+@router.get('/teams/{team_id}/members', response_model=PageOut[UserOut])
+async def api_team_members(
+    team_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Limit,
+    fields: tuple = Depends(fields_of(UserOut)),
+    current_user: User = Depends(get_current_user_dep),
+    team_repo: TeamRepository = Depends(get_team_repo),
+    user_repo: UserRepository = Depends(get_user_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    if not await team_repo.get_fields(session, team_id, ("id",)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    with bad_cursor():
+        page = await user_repo.get_in_team(
+            session, team_id, fields, cursor=cursor, limit=limit
+        )
+    return page_response(UserOut, fields, page)
+
+
+@router.get('/meetings', response_model=PageOut[MeetingOut])
+async def api_meetings(
+    cursor: Optional[str] = None,
+    limit: int = Limit,
+    fields: tuple = Depends(fields_of(MeetingOut)),
+    current_user: User = Depends(get_current_user_dep_admin),
+    meeting_repo: MeetingRepository = Depends(get_meeting_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    # Предстоящие встречи по дате
+    with bad_cursor():
+        query = meeting_repo.upcoming_query(cursor, limit, fields)
+    page = await meeting_repo.fetch_page(session, query)
+    return page_response(MeetingOut, fields, page)
+
+
+@router.get('/meetings/{meeting_id}', response_model=MeetingOut)
+async def api_meeting(
+    meeting_id: int,
+    fields: tuple = Depends(fields_of(MeetingOut)),
+    current_user: User = Depends(get_current_user_dep),
+    meeting_repo: MeetingRepository = Depends(get_meeting_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    return item_response(
+        MeetingOut, fields,
+        await meeting_repo.get_fields(session, meeting_id, fields)
+    )
+
+
+@router.get('/meetings/{meeting_id}/participants',
+            response_model=PageOut[UserOut])
+async def api_meeting_participants(
+    meeting_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Limit,
+    fields: tuple = Depends(fields_of(UserOut)),
+    current_user: User = Depends(get_current_user_dep),
+    meeting_repo: MeetingRepository = Depends(get_meeting_repo),
+    user_repo: UserRepository = Depends(get_user_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    if not await meeting_repo.get_fields(session, meeting_id, ("id",)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    with bad_cursor():
+        page = await user_repo.get_in_meeting(
+            session, meeting_id, fields, cursor=cursor, limit=limit
+        )
+    return page_response(UserOut, fields, page)
+
+
+@router.post('/batch', response_model=BatchOut)
+async def api_batch(
+    batch: BatchIn,
+    current_user: User = Depends(get_current_user_dep),
+    task_repo: TaskRepository = Depends(get_task_repo),
+    taskchat_repo: TaskChatRepository = Depends(get_taskchat_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    # Пакет операций с одной авторизацией и одной транзакцией вместо
+    # сотен отдельных запросов; результаты — по операции, в том же порядке
+    runner = BatchRunner(current_user, task_repo, taskchat_repo)
+    return ORJSONResponse(await runner.run(session, batch))
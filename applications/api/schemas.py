@@ -0,0 +1,156 @@
+import functools
+from datetime import datetime
+from typing import Annotated, Generic, Literal, Optional, Sequence, TypeVar
+
+from pydantic import BaseModel, ConfigDict, Field, create_model
+
+from applications.auth.schemas import ChoiceCode
+
+
+class TaskOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    creator: Optional[int]
+    performer: Optional[int]
+    description: Optional[str]
+    status: Optional[ChoiceCode]
+    deadline: Optional[datetime]
+    assessment: Optional[int]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    version: int
+
+
+class TaskChatOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    task_id: Optional[int]
+    user_id: Optional[int]
+    text: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    version: int
+
+
+class TeamOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str]
+    updated_at: Optional[datetime]
+    version: int
+
+
+class MeetingOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    description: Optional[str]
+    date: Optional[datetime]
+    duration: int
+    creator_id: Optional[int]
+    updated_at: Optional[datetime]
+    version: int
+
+
+Item = TypeVar("Item")
+
+
+class PageOut(BaseModel, Generic[Item]):
+    items: list[Item]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+# Операции пакета (/api/v1/batch): поле op выбирает схему
+MAX_BATCH_OPERATIONS = 500
+
+
+class CreateTaskOp(BaseModel):
+    op: Literal["create_task"]
+    performer: int
+    description: str
+    deadline: datetime
+
+
+class ChangeStatusOp(BaseModel):
+    op: Literal["change_status"]
+    task_id: int
+    status: Literal["open", "in_work", "completed"]
+
+
+class ChangeAssessmentOp(BaseModel):
+    op: Literal["change_assessment"]
+    task_id: int
+    assessment: int = Field(ge=1, le=5)
+
+
+class AddCommentOp(BaseModel):
+    op: Literal["add_comment"]
+    task_id: int
+    text: str = Field(min_length=1)
+
+
+Operation = Annotated[
+    CreateTaskOp | ChangeStatusOp | ChangeAssessmentOp | AddCommentOp,
+    Field(discriminator="op")
+]
+
+
+class BatchIn(BaseModel):
+    operations: list[Operation] = Field(
+        min_length=1, max_length=MAX_BATCH_OPERATIONS
+    )
+    # Всё или ничего: первая ошибка откатывает весь пакет
+    atomic: bool = False
+
+
+class OperationResult(BaseModel):
+    status: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class BatchOut(BaseModel):
+    committed: bool
+    results: list[OperationResult]
+
+
+def parse_fields(schema: type[BaseModel],
+                 fields: Optional[str]) -> tuple[str, ...]:
+    # ?fields=id,status,deadline — подмножество полей схемы в порядке
+    # запроса; без параметра — все поля
+    if not fields:
+        return tuple(schema.model_fields)
+    names = tuple(dict.fromkeys(
+        name.strip() for name in fields.split(",") if name.strip()
+    ))
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown or not names:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+    return names
+
+
+@functools.lru_cache(maxsize=256)
+def partial_schema(schema: type[BaseModel],
+                   names: tuple[str, ...]) -> type[BaseModel]:
+    # Схема только с запрошенными полями: строки запроса без остальных
+    # колонок проходят валидацию, а лишние колонки (ключи курсора,
+    # проверка доступа) не попадают в ответ
+    if names == tuple(schema.model_fields):
+        return schema
+    return create_model(
+        schema.__name__,
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation,
+                  schema.model_fields[name]) for name in names}
+    )
+
+
+def dump(schema: type[BaseModel], names: tuple[str, ...],
+         items: Sequence) -> list[dict]:
+    model = partial_schema(schema, names)
+    return [model.model_validate(item).model_dump() for item in items]
+
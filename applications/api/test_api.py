@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from applications.api.router import get_current_user_dep
+from database.pagination import Page
+from dependencies import get_task_repo, get_taskchat_repo
+from main import app
+
+
+class FakeUser(NamedTuple):
+    id: int
+    email: str
+    name: str
+    lastname: str
+    role: str
+
+
+class FakeChoice(NamedTuple):
+    code: str
+    value: str
+
+
+class TaskRow(NamedTuple):
+    id: int
+    status: FakeChoice
+    deadline: Optional[datetime]
+
+
+class AccessRow(NamedTuple):
+    id: int
+    creator: int
+    performer: int
+
+
+class FakeTaskRepo:
+    def __init__(self):
+        self.calls = []
+
+    def user_tasks_query(self, user_id, cursor, limit, fields):
+        self.calls.append((user_id, cursor, limit, fields))
+        if cursor == "bad":
+            raise ValueError("Некорректный курсор")
+        return fields
+
+    async def fetch_page(self, session, query):
+        return Page([
+            TaskRow(1, FakeChoice("open", "Открыто"), datetime(2026, 2, 1)),
+            TaskRow(2, FakeChoice("in_work", "В работе"), None),
+        ], next_cursor="abc")
+
+    async def get_fields(self, session, task_id, fields, *required):
+        return AccessRow(task_id, 1, 2) if task_id == 1 else None
+
+    async def get(self, session, task_id):
+        return await self.get_fields(session, task_id, ())
+
+
+@pytest.fixture
+def task_repo():
+    repo = FakeTaskRepo()
+
+    async def override_current_user():
+        return FakeUser(id=7, email="test@example.com", name="Test",
+                        lastname="User", role="user")
+
+    app.dependency_overrides[get_task_repo] = lambda: repo
+    app.dependency_overrides[get_current_user_dep] = override_current_user
+    yield repo
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_tasks_sparse_fields(task_repo):
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            "/api/v1/tasks", params={"fields": "id,status,deadline"}
+        )
+        unknown = await ac.get("/api/v1/tasks", params={"fields": "id,pwd"})
+        bad_cursor = await ac.get("/api/v1/tasks", params={"cursor": "bad"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    # В репозиторий уходят только запрошенные поля
+    assert task_repo.calls[0] == (7, None, 20, ("id", "status", "deadline"))
+    assert response.json() == {
+        "items": [
+            {"id": 1, "status": "open", "deadline": "2026-02-01T00:00:00"},
+            {"id": 2, "status": "in_work", "deadline": None},
+        ],
+        "next_cursor": "abc",
+        "prev_cursor": None,
+    }
+
+    assert unknown.status_code == 400
+    assert unknown.json() == {"detail": "Неизвестные поля: pwd"}
+    assert bad_cursor.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_task_comments_access(task_repo):
+    class FakeTaskChatRepo:
+        async def get_history(self, session, task_id, cursor, limit, fields):
+            return Page([])
+
+    app.dependency_overrides[get_taskchat_repo] = lambda: FakeTaskChatRepo()
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        forbidden = await ac.get("/api/v1/tasks/1/comments")
+        missing = await ac.get("/api/v1/tasks/2/comments")
+
+    # Ошибки API — JSON, а не страницы
+    assert forbidden.status_code == 403
+    assert forbidden.json() == {"detail": "Forbidden"}
+    assert missing.status_code == 404
+    assert missing.json() == {"detail": "Not Found"}
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_each_operation(task_repo):
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/api/v1/batch", json={"operations": [
+            {"op": "create_task", "performer": 2, "description": "x",
+             "deadline": "2026-02-01T10:00:00"},
+            {"op": "add_comment", "task_id": 1, "text": "чужая"},
+            {"op": "change_status", "task_id": 2, "status": "completed"},
+        ]})
+        unknown = await ac.post("/api/v1/batch", json={"operations": [
+            {"op": "drop_table", "task_id": 1},
+        ]})
+        empty = await ac.post("/api/v1/batch", json={"operations": []})
+
+    # Ошибка одной операции не мешает остальным
+    assert response.status_code == 200
+    assert response.json() == {"committed": True, "results": [
+        {"status": 403, "result": None, "error": "Недостаточно прав"},
+        {"status": 403, "result": None, "error": "Недостаточно прав"},
+        {"status": 404, "result": None,
+         "error": "Такого задания не существует"},
+    ]}
+    # Пакет с неизвестной операцией отклоняется целиком
+    assert unknown.status_code == 400
+    assert empty.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_api_requires_auth():
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/api/v1/users/me")
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Unauthorized"}
@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends, Form, status, Response, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.exceptions import HTTPException
-from fastapi.templating import Jinja2Templates
 from datetime import timedelta
 
 
@@ -11,10 +10,10 @@ from database.repositories import UserRepository
 from database.database import get_db, AsyncSession
 from .security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from dependencies import get_user_repo
+from templating import templates
 
 
 router = APIRouter(prefix='/auth', tags=["Auth"])
-templates = Jinja2Templates(directory="templates")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
@@ -1,9 +1,20 @@
-from pydantic import (BaseModel, ConfigDict, Field, EmailStr, field_validator)
+from typing import Annotated
+
+from pydantic import (BaseModel, BeforeValidator, ConfigDict, Field, EmailStr,
+                      field_validator)
 
 
 from database.models import UserRoleEnum
 
 
+def choice_code(value):
+    # Колонки ChoiceType отдают Choice(code, value), в схемах — код
+    return getattr(value, "code", value)
+
+
+ChoiceCode = Annotated[str, BeforeValidator(choice_code)]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -37,4 +48,4 @@ class UserOut(BaseModel):
     name: str
     lastname: str
     email: EmailStr
-    role: UserRoleEnum
+    role: Annotated[UserRoleEnum, BeforeValidator(choice_code)]
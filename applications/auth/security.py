@@ -3,14 +3,17 @@ import os
 
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, Request, status
+from starlette.requests import HTTPConnection
 from jose import JWTError, jwt
-from typing import Optional
+from typing import NamedTuple, Optional
 from sqladmin.authentication import AuthenticationBackend
 from dotenv import load_dotenv
 
 
+from applications.auth.schemas import choice_code
+from cache import user_cache
 from database.repositories import UserRepository
-from database.database import get_db, AsyncSession, async_session_maker
+from database.database import get_db, AsyncSession, read_session_maker
 from database.models import User
 from dependencies import get_user_repo
 
@@ -22,6 +25,25 @@ ALGORITHM = os.environ.get('ALGORITHM')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES'))
 
 
+class CurrentUser(NamedTuple):
+    # Неизменяемый снимок пользователя для кэша: ORM-объект привязан к
+    # загрузившей его сессии, а из кэша его читают параллельные запросы
+    id: int
+    name: str
+    lastname: str
+    email: str
+    role: str
+    version: int
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            user.id, user.name, user.lastname, user.email,
+            choice_code(user.role), user.version, user.updated_at
+        )
+
+
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.now() + expires_delta
@@ -34,13 +56,19 @@ def get_current_user(
     need_auth: bool = True,
     admin: bool = False
 ):
+    # HTTPConnection, а не Request: зависимость работает и для WebSocket
     async def depends(
-        request: Request,
+        request: HTTPConnection,
         user_repo: UserRepository = Depends(get_user_repo),
         session: AsyncSession = Depends(get_db)
-    ) -> Optional[User]:
+    ) -> Optional[CurrentUser]:
 
-        token = request.cookies.get("access_token")
+        # Cookie у страниц, заголовок Authorization у клиентов API; формат
+        # один и тот же: "Bearer <jwt>"
+        token = (
+            request.cookies.get("access_token")
+            or request.headers.get("authorization")
+        )
 
         if not token:
             if need_auth:
@@ -65,7 +93,15 @@ def get_current_user(
                 raise HTTPException(status_code=401, detail="Unauthorized")
             return None
 
-        user = await user_repo.get(session, int(user_id))
+        # Поколение — до чтения: если изменение пользователя закоммитят
+        # между чтением и set, устаревший снимок в кэш не попадёт
+        generation = user_cache.generation(int(user_id))
+        user = user_cache.get(int(user_id))
+        if user is None:
+            user = await user_repo.get(session, int(user_id))
+            if user:
+                user = CurrentUser.from_user(user)
+                user_cache.set(user.id, user, generation)
         if not user:
             if need_auth:
                 raise HTTPException(status_code=401, detail="Unauthorized")
@@ -91,7 +127,7 @@ class FastAPIAuthBackend(AuthenticationBackend):
 
     async def authenticate(self, request: Request) -> bool:
         user_repo = UserRepository()
-        async with async_session_maker() as session:
+        async with read_session_maker() as session:
             current_user = get_current_user(need_auth=False, admin=False)
             current_user = await current_user(
                 request,
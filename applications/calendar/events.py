@@ -0,0 +1,100 @@
+import calendar
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+
+from cache import TTLCache
+from database.database import AsyncSession
+from database.repositories import CalendarRepository
+
+
+UPCOMING_DAYS = 7
+
+# Готовые сетка и список предстоящих по (user_id, year, month, today,
+# версия данных). Версию считает база, поэтому ключ устаревает от любой
+# записи: через репозитории, из админки или в другом воркере
+calendar_cache = TTLCache(maxsize=4096, ttl=300.0)
+
+Window = Tuple[datetime, datetime]
+
+
+def event_windows(year: int, month: int, today: date) -> List[Window]:
+    # Месяц сетки и неделя предстоящих событий; пересекающиеся окна
+    # склеиваются, чтобы строки не дублировались
+    month_start = datetime(year, month, 1)
+    month_end = month_start + timedelta(
+        days=calendar.monthrange(year, month)[1]
+    )
+    upcoming_start = datetime.combine(today, time.min)
+    upcoming_end = upcoming_start + timedelta(days=UPCOMING_DAYS)
+
+    first, second = sorted([
+        (month_start, month_end), (upcoming_start, upcoming_end)
+    ])
+    if second[0] <= first[1]:
+        return [(first[0], max(first[1], second[1]))]
+    return [first, second]
+
+
+def index_events_by_day(rows: Sequence) -> Dict[date, List[dict]]:
+    events_by_day = {}
+    for row in rows:
+        events_by_day.setdefault(row.at.date(), []).append({
+            "title": (row.description or "")[:30],
+            "time": row.at.strftime("%H:%M"),
+            "type": row.type,
+        })
+    return events_by_day
+
+
+def build_month_grid(year: int, month: int,
+                     events_by_day: Dict[date, List[dict]]):
+    calendar_grid = []
+    for week in calendar.Calendar(firstweekday=0).monthdatescalendar(
+        year, month
+    ):
+        week_data = []
+        for day in week:
+            is_current_month = day.month == month
+            week_data.append({
+                "date": day if is_current_month else None,
+                "events": (
+                    events_by_day.get(day, []) if is_current_month else None
+                )
+            })
+        calendar_grid.append(week_data)
+    return calendar_grid
+
+
+def build_upcoming(today: date, events_by_day: Dict[date, List[dict]]):
+    upcoming_list = []
+    for offset in range(UPCOMING_DAYS):
+        day = today + timedelta(days=offset)
+        upcoming_list.append({
+            "date": day.strftime("%d.%m.%Y"),
+            "events": events_by_day.get(day, [])
+        })
+    return upcoming_list
+
+
+async def load_calendar(session: AsyncSession,
+                        calendar_repo: CalendarRepository,
+                        user_id: int, year: int, month: int, today: date):
+    # Версию читаем до запроса: если данные изменятся, пока он идёт,
+    # результат ляжет под уже устаревшим ключом
+    key = (user_id, year, month, today,
+           await calendar_repo.get_version(session, user_id))
+    events = calendar_cache.get(key)
+    if events is not None:
+        return events
+
+    rows = await calendar_repo.get_events(
+        session, user_id, event_windows(year, month, today)
+    )
+    events_by_day = index_events_by_day(rows)
+    events = {
+        "calendar": build_month_grid(year, month, events_by_day),
+        "upcoming_events": build_upcoming(today, events_by_day),
+    }
+    calendar_cache.set(key, events)
+    return events
@@ -0,0 +1,109 @@
+import hashlib
+import hmac
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+
+from applications.auth.security import SECRET_KEY
+from http_cache import Validator, data_validator
+from database.database import read_session_maker
+from database.repositories import MeetingRepository, TaskRepository
+
+
+# RFC 5545: строки не длиннее 75 октетов, продолжение с пробела
+ICS_LINE_LIMIT = 75
+
+
+def feed_token(user_id: int) -> str:
+    signature = hmac.new(
+        SECRET_KEY.encode(), f"calendar-feed:{user_id}".encode(),
+        hashlib.sha256
+    ).hexdigest()[:32]
+    return f"{user_id}-{signature}"
+
+
+def user_id_from_token(token: str) -> Optional[int]:
+    user_id, _, _ = token.partition("-")
+    if not user_id.isdigit():
+        return None
+    if not hmac.compare_digest(feed_token(int(user_id)), token):
+        return None
+    return int(user_id)
+
+
+def feed_validator(user_id: int, version: tuple) -> Validator:
+    # version — CalendarRepository.get_version: одна агрегатная строка
+    # вместо выборки и сборки всего календаря
+    return data_validator(("calendar-feed", user_id), version)
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;")
+        .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    encoded = line.encode()
+    if len(encoded) <= ICS_LINE_LIMIT:
+        return line + "\r\n"
+    parts, current = [], ""
+    for char in line:
+        limit = ICS_LINE_LIMIT if not parts else ICS_LINE_LIMIT - 1
+        if len((current + char).encode()) > limit:
+            parts.append(current)
+            current = ""
+        current += char
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_datetime(value: datetime) -> str:
+    # Время в базе локальное и без зоны: отдаём как floating time
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _vevent(uid: str, summary: str, start: datetime, end: datetime,
+            stamp: str) -> str:
+    return "".join(_fold(line) for line in (
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_ics_datetime(start)}",
+        f"DTEND:{_ics_datetime(end)}",
+        f"SUMMARY:{_escape(summary)}",
+        "END:VEVENT",
+    ))
+
+
+async def stream_feed(user_id: int, host: str,
+                      session_maker=read_session_maker) -> AsyncIterator[str]:
+    # Сессия открывается внутри генератора: зависимость get_db закрывается
+    # раньше, чем StreamingResponse отдаст тело
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//Task Manager//Calendar feed//RU\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+    )
+    async with session_maker() as session:
+        async for meeting in MeetingRepository().stream_user_meetings(
+            session, user_id
+        ):
+            yield _vevent(
+                f"meeting-{meeting.id}@{host}",
+                meeting.description or "Встреча",
+                meeting.date,
+                meeting.date + timedelta(minutes=meeting.duration), stamp
+            )
+        async for task in TaskRepository().stream_user_deadlines(
+            session, user_id
+        ):
+            yield _vevent(
+                f"task-{task.id}@{host}",
+                f"Дедлайн: {task.description or ''}",
+                task.deadline, task.deadline, stamp
+            )
+    yield "END:VCALENDAR\r\n"
@@ -1,44 +1,30 @@
 import calendar
 
 
-from fastapi import APIRouter, Depends, Query, Request
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 
 
 from applications.auth.security import get_current_user
 from database.database import get_db, AsyncSession
 from database.models import User
-from database.repositories import MeetingRepository, TaskRepository
+from database.repositories import CalendarRepository
 from utils import render_template
-from dependencies import get_meeting_repo, get_task_repo
+from templating import templates
+from dependencies import get_calendar_repo
+from applications.calendar.events import load_calendar
+from applications.calendar.feed import (feed_token, feed_validator,
+                                        stream_feed, user_id_from_token)
+from http_cache import cache_headers, not_modified
 
 
 router = APIRouter(prefix='/calendar', tags=["Calendar"])
-templates = Jinja2Templates(directory="templates")
 
 get_current_user_dep = get_current_user()
 
 
-def format_event(event, date_getter, event_type: str):
-    return {
-        "title": event.description[:30],
-        "time": date_getter(event).strftime("%H:%M"),
-        "type": event_type,
-    }
-
-
-def group_events_by_day(events, date_getter, event_type: str):
-    grouped = {}
-    for event in events:
-        day_key = date_getter(event).date()
-        grouped.setdefault(day_key, []).append(
-            format_event(event, date_getter, event_type)
-        )
-    return grouped
-
-
 @router.get("", name="calendar_view")
 async def calendar_view(
     request: Request,
@@ -46,82 +32,22 @@ async def calendar_view(
     month: int = Query(default=date.today().month),
     session: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_dep),
-    meeting_repo: MeetingRepository = Depends(get_meeting_repo),
-    task_repo: TaskRepository = Depends(get_task_repo)
+    calendar_repo: CalendarRepository = Depends(get_calendar_repo)
 ):
     today = date.today()
     current_date = date(year, month, 1)
 
-    # Диапазон дат месяца
-    month_start = datetime(year, month, 1)
-    _, last_day = calendar.monthrange(year, month)
-    month_end = datetime(year, month, last_day)
-
-    # Встречи
-    meetings = await meeting_repo.get_meeting_with_date(
-        session, month_start, month_end, current_user.id
-    )
-
-    tasks = await task_repo.get_task_with_date(
-        session, current_user.id, month_start, month_end
+    # Месяц и ближайшая неделя одним запросом
+    events = await load_calendar(
+        session, calendar_repo, current_user.id, year, month, today
     )
 
-    events_by_day = {}
-    events_by_day.update(group_events_by_day(
-        meetings, lambda m: m.date, "meeting"
-    ))
-    events_by_day.update(group_events_by_day(
-        tasks, lambda t: t.deadline, "task"
-    ))
-
-    # Создаём календарную сетку
-    cal = calendar.Calendar(firstweekday=0)
-    month_weeks = cal.monthdatescalendar(year, month)
-
-    calendar_grid = []
-    for week in month_weeks:
-        week_data = []
-        for day in week:
-            is_current_month = day.month == month
-            week_data.append({
-                "date": day if is_current_month else None,
-                "events": (
-                    events_by_day.get(day, []) if is_current_month else None
-                )
-            })
-        calendar_grid.append(week_data)
-
-    # Предстоящие события (на 7 дней вперёд)
-    upcoming_range_end = today + timedelta(days=7)
-    upcoming_meetings = await meeting_repo.get_meeting_with_date(
-        session, today, upcoming_range_end, current_user.id
-    )
-    upcoming_tasks = await task_repo.get_task_with_date(
-        session, current_user.id, today, upcoming_range_end
-    )
-
-    upcoming_by_day = {}
-    upcoming_by_day.update(group_events_by_day(
-        upcoming_meetings, lambda m: m.date, "meeting"
-    ))
-    upcoming_by_day.update(group_events_by_day(
-        upcoming_tasks, lambda t: t.deadline, "task"
-    ))
-
-    upcoming_list = []
-    for offset in range(7):
-        d = today + timedelta(days=offset)
-        upcoming_list.append({
-            "date": d.strftime("%d.%m.%Y"),
-            "events": upcoming_by_day.get(d, [])
-        })
-
     return render_template(
         request,
         templates,
         "calendar/calendar.html",
         {
-            "calendar": calendar_grid,
+            "calendar": events["calendar"],
             "current_date": current_date,
             "today": today,
             "prev_month": (current_date - timedelta(days=1)).replace(day=1),
@@ -130,7 +56,35 @@ async def calendar_view(
                     current_date.year, current_date.month
                 )[1])
             ).replace(day=1),
-            "upcoming_events": upcoming_list,
+            "upcoming_events": events["upcoming_events"],
+            "feed_url": request.url_for(
+                "calendar_feed", token=feed_token(current_user.id)
+            ),
         },
         user=current_user
     )
+
+
+@router.get("/feed/{token}.ics", name="calendar_feed")
+async def calendar_feed(
+    request: Request,
+    token: str,
+    session: AsyncSession = Depends(get_db),
+    calendar_repo: CalendarRepository = Depends(get_calendar_repo)
+):
+    # Токен вместо cookie: клиенты календаря не проходят авторизацию
+    user_id = user_id_from_token(token)
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    validator = feed_validator(
+        user_id, await calendar_repo.get_version(session, user_id)
+    )
+    cached = not_modified(request, validator)
+    if cached is not None:
+        return cached
+    return StreamingResponse(
+        stream_feed(user_id, request.url.hostname),
+        media_type="text/calendar; charset=utf-8",
+        headers=cache_headers(validator)
+    )
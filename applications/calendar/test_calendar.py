@@ -1,13 +1,16 @@
 import pytest
-from datetime import datetime
+from datetime import date, datetime
 from httpx import AsyncClient, ASGITransport
-from dataclasses import dataclass
 from typing import NamedTuple
 
 from bs4 import BeautifulSoup
 
-from dependencies import get_meeting_repo, get_task_repo
+from dependencies import get_calendar_repo
 from main import app
+from applications.calendar.events import (calendar_cache, event_windows,
+                                          load_calendar)
+from applications.calendar.feed import feed_token, feed_validator
+from http_cache import http_date
 from applications.calendar.router import get_current_user_dep
 
 
@@ -20,35 +23,29 @@ class FakeUser(NamedTuple):
     is_authenticated: bool = True
 
 
-@dataclass
-class FakeMeeting:
-    date: datetime
+class FakeEvent(NamedTuple):
+    type: str
+    id: int
     description: str
+    at: datetime
 
 
-@dataclass
-class FakeTask:
-    deadline: datetime
-    description: str
+class FakeCalendarRepo:
+    def __init__(self):
+        self.calls = 0
+        self.version = (1, datetime(2026, 1, 1))
 
+    async def get_version(self, session, user_id):
+        return self.version
 
-class FakeMeetingRepo:
-    async def get_meeting_with_date(self, session, start, end, user_id):
+    async def get_events(self, session, user_id, windows):
+        self.calls += 1
+        today = datetime.today()
         return [
-            FakeMeeting(
-                datetime.today().replace(hour=10, minute=0),
-                "Team Sync"
-            )
-        ]
-
-
-class FakeTaskRepo:
-    async def get_task_with_date(self, session, user_id, start, end):
-        return [
-            FakeTask(
-                datetime.today().replace(hour=15, minute=30),
-                "Finish Report"
-            )
+            FakeEvent("meeting", 1, "Team Sync",
+                      today.replace(hour=10, minute=0)),
+            FakeEvent("task", 1, "Finish Report",
+                      today.replace(hour=15, minute=30)),
         ]
 
 
@@ -66,8 +63,8 @@ async def test_calendar_view():
     async def override_current_user():
         return test_user
 
-    app.dependency_overrides[get_meeting_repo] = lambda: FakeMeetingRepo()
-    app.dependency_overrides[get_task_repo] = lambda: FakeTaskRepo()
+    calendar_cache.clear()
+    app.dependency_overrides[get_calendar_repo] = lambda: FakeCalendarRepo()
     app.dependency_overrides[get_current_user_dep] = override_current_user
 
     transport = ASGITransport(app=app, raise_app_exceptions=True)
@@ -81,3 +78,69 @@ async def test_calendar_view():
     html_text = soup.get_text()
 
     assert "Finish Report" in html_text
+    # Встреча и задача в один день не затирают друг друга
+    assert "Team Sync" in html_text
+
+
+def test_event_windows_merge_overlapping():
+    # Неделя с 28.01 заходит в февраль: одно окно на оба месяца
+    assert event_windows(2026, 1, date(2026, 1, 28)) == [
+        (datetime(2026, 1, 1), datetime(2026, 2, 4))
+    ]
+    assert event_windows(2026, 3, date(2026, 1, 28)) == [
+        (datetime(2026, 1, 28), datetime(2026, 2, 4)),
+        (datetime(2026, 3, 1), datetime(2026, 4, 1)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_load_calendar_cached_until_version_bump():
+    calendar_cache.clear()
+    repo = FakeCalendarRepo()
+    today = date.today()
+
+    first = await load_calendar(None, repo, 7, today.year, today.month, today)
+    second = await load_calendar(None, repo, 7, today.year, today.month, today)
+    assert second is first
+    assert repo.calls == 1
+
+    repo.version = (2, datetime(2026, 1, 2))
+    await load_calendar(None, repo, 7, today.year, today.month, today)
+    assert repo.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_calendar_feed_conditional_get():
+    token = feed_token(5)
+    repo = FakeCalendarRepo()
+    app.dependency_overrides[get_calendar_repo] = lambda: repo
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        forged = await ac.get("/calendar/feed/5-forged.ics")
+        assert forged.status_code == 404
+
+        etag, last_modified = feed_validator(5, repo.version)
+        not_modified = await ac.get(
+            f"/calendar/feed/{token}.ics",
+            headers={"If-None-Match": etag}
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+        assert repo.calls == 0
+
+        since = await ac.get(
+            f"/calendar/feed/{token}.ics",
+            headers={"If-Modified-Since": http_date(last_modified)}
+        )
+        assert since.status_code == 304
+
+        # Версию считает база: любая запись, в том числе из админки
+        repo.version = (2, datetime(2026, 1, 2))
+        changed = await ac.get(
+            f"/calendar/feed/{token}.ics",
+            headers={"If-None-Match": etag}
+        )
+    app.dependency_overrides.clear()
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.text.startswith("BEGIN:VCALENDAR\r\n")
@@ -1,24 +1,31 @@
 import datetime
-from typing import Tuple
-from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
+from typing import Optional, Tuple
+from fastapi import (APIRouter, Depends, Form, HTTPException, Query, Request,
+                     status)
+from fastapi.responses import (HTMLResponse, JSONResponse,
+                               RedirectResponse)
 
 
 from applications.auth.security import get_current_user
-from database.models import User
+from applications.meeting.scheduling import find_common_slots, find_conflicts
+from database.models import Meeting, User
 from database.repositories import MeetingRepository, UserRepository
 from database.database import AsyncSession, get_db
 from dependencies import get_user_repo, get_meeting_repo
-from utils import render_template
+from http_cache import cache_headers, not_modified, page_validator
+from utils import is_partial, render_template, stream_template
+from templating import templates
 
 
 router = APIRouter(prefix='/meetings', tags=["Meeting"])
-templates = Jinja2Templates(directory="templates")
 
 get_current_user_dep = get_current_user()
 get_current_user_dep_admin = get_current_user(admin=True)
 
+# Где искать свободное время, если выбранное занято
+SUGGESTION_RANGE = datetime.timedelta(days=7)
+SUGGESTION_LIMIT = 5
+
 
 async def get_repositories(
     user_repo: UserRepository = Depends(get_user_repo),
@@ -30,58 +37,131 @@ async def get_repositories(
 @router.get('')
 async def meeting_list_page(
     request: Request,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user_dep_admin),
-    session: AsyncSession = Depends(get_db),
     repositories: Tuple[
         UserRepository, MeetingRepository
     ] = Depends(get_repositories)
 ):
     _, meeting_repo = repositories
-    meetings = await meeting_repo.get_all(session)
-    return render_template(
+    try:
+        query = meeting_repo.upcoming_query(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return stream_template(
         request,
-        templates,
         'meeting/meeting_list.html',
-        {"meetings": meetings},
-        current_user
+        {},
+        current_user,
+        streams={"page": lambda stream_session: meeting_repo.stream_page(
+            stream_session, query
+        )}
     )
 
 
 @router.get('/create')
 async def create_meeting_page(
     request: Request,
-    current_user: User = Depends(get_current_user_dep_admin),
-    session: AsyncSession = Depends(get_db),
-    repositories: Tuple[
-        UserRepository, MeetingRepository
-    ] = Depends(get_repositories)
+    current_user: User = Depends(get_current_user_dep_admin)
 ):
-    user_repo, _ = repositories
-    users = await user_repo.get_all(session)
     return render_template(
         request,
         templates,
         'meeting/create_meeting.html',
-        {"users": users},
+        {},
         current_user
     )
 
 
+@router.get('/slots')
+async def meeting_slots(
+    members: list[int] = Query(..., description="ID участников"),
+    start: datetime.datetime = Query(..., description="Начало поиска"),
+    end: Optional[datetime.datetime] = Query(default=None),
+    duration: int = Query(
+        default=Meeting.DEFAULT_DURATION,
+        ge=Meeting.MIN_DURATION, le=Meeting.MAX_DURATION
+    ),
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: User = Depends(get_current_user_dep_admin),
+    session: AsyncSession = Depends(get_db),
+    repositories: Tuple[
+        UserRepository, MeetingRepository
+    ] = Depends(get_repositories)
+):
+    _, meeting_repo = repositories
+    slots = await find_common_slots(
+        session, meeting_repo, members, start,
+        end or start + SUGGESTION_RANGE,
+        datetime.timedelta(minutes=duration), limit
+    )
+    return JSONResponse([
+        {"start": slot_start.isoformat(), "end": slot_end.isoformat()}
+        for slot_start, slot_end in slots
+    ])
+
+
 @router.post('/create')
 async def create_meeting(
+    request: Request,
     description: str = Form(..., description="Описание встречи"),
     members: list[int] = Form(..., description="ID участников"),
     date: datetime.datetime = Form(..., description="Дата и время встречи"),
+    duration: int = Form(
+        default=Meeting.DEFAULT_DURATION,
+        ge=Meeting.MIN_DURATION, le=Meeting.MAX_DURATION,
+        description="Длительность в минутах"
+    ),
+    ignore_conflicts: bool = Form(default=False),
     current_user: User = Depends(get_current_user_dep_admin),
     session: AsyncSession = Depends(get_db),
     repositories: Tuple[
         UserRepository, MeetingRepository
     ] = Depends(get_repositories)
 ):
-    _, meeting_repo = repositories
+    user_repo, meeting_repo = repositories
+    length = datetime.timedelta(minutes=duration)
+    if not ignore_conflicts:
+        busy = await find_conflicts(
+            session, meeting_repo, members, date, length
+        )
+        if busy:
+            users = await user_repo.project(
+                session, *UserRepository.CHOICE_COLUMNS,
+                where=User.id.in_(members)
+            )
+            suggestions = await find_common_slots(
+                session, meeting_repo, members, date,
+                date + SUGGESTION_RANGE, length, SUGGESTION_LIMIT
+            )
+            return render_template(
+                request,
+                templates,
+                'meeting/create_meeting.html',
+                {
+                    "error": "В это время заняты: " + ", ".join(
+                        f"{user.name} {user.lastname}"
+                        for user in users if user.id in busy
+                    ),
+                    "conflicts": True,
+                    "suggestions": suggestions,
+                    "form": {
+                        "description": description,
+                        "date": date,
+                        "duration": duration,
+                        "members": users,
+                    },
+                },
+                current_user,
+                status_code=status.HTTP_409_CONFLICT
+            )
     try:
         await meeting_repo.add(
-            session, date, description, current_user.id, members
+            session, date, description, current_user.id, members,
+            duration=duration
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -98,30 +178,32 @@ async def meeting_detail_page(
         UserRepository, MeetingRepository
     ] = Depends(get_repositories)
 ):
-    user_repo, meeting_repo = repositories
+    _, meeting_repo = repositories
+    version = await meeting_repo.get_version(session, meeting_id)
+    if not version:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    validator = page_validator(current_user, version)
+    cached = not_modified(request, validator)
+    if cached is not None:
+        return cached
+
     meeting = await meeting_repo.get(session, meeting_id)
-    all_users = await user_repo.get_all(session)
-    try:
-        meeting_member_ids = {
-            member.user.id for member in meeting.participants
-        }
-    except AttributeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Ошибка структуры данных участника: {str(e)}"
-        )
-    available_users = [u for u in all_users if u.id not in meeting_member_ids]
-    return render_template(
+    if not meeting:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    response = render_template(
         request,
         templates,
         'meeting/meeting_detail.html',
-        {"meeting": meeting, "available_users": available_users},
+        {"meeting": meeting},
         current_user
     )
+    response.headers.update(cache_headers(validator))
+    return response
 
 
 @router.post('/{meeting_id}/add_meeting_member')
 async def add_meeting_member(
+    request: Request,
     meeting_id: int,
     user_id: int = Form(..., description="ID пользователя"),
     current_user: User = Depends(get_current_user_dep_admin),
@@ -132,7 +214,7 @@ async def add_meeting_member(
 ):
     _, meeting_repo = repositories
     try:
-        await meeting_repo.add_member(
+        participant = await meeting_repo.add_member(
             session,
             meeting_id,
             user_id
@@ -142,6 +224,14 @@ async def add_meeting_member(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    if is_partial(request):
+        return render_template(
+            request,
+            templates,
+            'meeting/participant.html',
+            {"participant": participant, "meeting_id": meeting_id},
+            current_user
+        )
     return RedirectResponse(
         f'/meetings/{meeting_id}',
         status_code=status.HTTP_303_SEE_OTHER
@@ -150,6 +240,7 @@ async def add_meeting_member(
 
 @router.post('/{meeting_id}/delete_meeting_member')
 async def delete_meeting_member(
+    request: Request,
     meeting_id: int,
     user_id: int = Form(..., description="ID пользователя"),
     current_user: User = Depends(get_current_user_dep_admin),
@@ -168,6 +259,9 @@ async def delete_meeting_member(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    if is_partial(request):
+        # Пустой ответ: htmx заменяет им строку удалённого участника
+        return HTMLResponse('')
     return RedirectResponse(
         f'/meetings/{meeting_id}',
         status_code=status.HTTP_303_SEE_OTHER
@@ -0,0 +1,101 @@
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+from database.database import AsyncSession
+from database.repositories import MeetingRepository
+
+
+Interval = Tuple[datetime, datetime]
+
+# Свободное время ищем только в рабочие часы будних дней
+WORK_DAY_START = time(9, 0)
+WORK_DAY_END = time(18, 0)
+WORK_WEEKDAYS = frozenset(range(5))
+
+# Дальше месяца вперёд подбор не нужен, а окно ограничивает выборку
+MAX_SEARCH_RANGE = timedelta(days=31)
+
+
+def busy_intervals(rows) -> Iterator[Interval]:
+    for row in rows:
+        yield row.date, row.date + timedelta(minutes=row.duration)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    # Сортировка и один проход: пересекающиеся и смежные отрезки
+    # склеиваются, результат упорядочен и не пересекается
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def working_windows(start: datetime, end: datetime) -> Iterator[Interval]:
+    day: date = start.date()
+    while day <= end.date():
+        if day.weekday() in WORK_WEEKDAYS:
+            window_start = max(start, datetime.combine(day, WORK_DAY_START))
+            window_end = min(end, datetime.combine(day, WORK_DAY_END))
+            if window_start < window_end:
+                yield window_start, window_end
+        day += timedelta(days=1)
+
+
+def free_slots(busy: Sequence[Interval], start: datetime, end: datetime,
+               duration: timedelta) -> List[Interval]:
+    # busy — результат merge_intervals; окна и занятость идут по времени,
+    # поэтому обе последовательности проходятся один раз
+    slots = []
+    index = 0
+    for window_start, window_end in working_windows(start, end):
+        while index < len(busy) and busy[index][1] <= window_start:
+            index += 1
+        cursor = window_start
+        position = index
+        while position < len(busy) and busy[position][0] < window_end:
+            busy_start, busy_end = busy[position]
+            if busy_start - cursor >= duration:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            position += 1
+        if window_end - cursor >= duration:
+            slots.append((cursor, window_end))
+    return slots
+
+
+def conflicting_users(rows, start: datetime, end: datetime) -> List[int]:
+    return sorted({
+        row.user_id for row in rows
+        if row.date < end
+        and row.date + timedelta(minutes=row.duration) > start
+    })
+
+
+async def find_common_slots(session: AsyncSession,
+                            meeting_repo: MeetingRepository,
+                            user_ids: Sequence[int], start: datetime,
+                            end: datetime, duration: timedelta,
+                            limit: Optional[int] = None) -> List[Interval]:
+    end = min(end, start + MAX_SEARCH_RANGE)
+    rows = await meeting_repo.get_busy_meetings(
+        session, user_ids, start, end
+    )
+    slots = free_slots(merge_intervals(busy_intervals(rows)),
+                       start, end, duration)
+    return slots[:limit] if limit is not None else slots
+
+
+async def find_conflicts(session: AsyncSession,
+                         meeting_repo: MeetingRepository,
+                         user_ids: Sequence[int], start: datetime,
+                         duration: timedelta) -> List[int]:
+    end = start + duration
+    rows = await meeting_repo.get_busy_intervals(
+        session, user_ids, start, end
+    )
+    return conflicting_users(rows, start, end)
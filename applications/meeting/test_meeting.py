@@ -1,10 +1,11 @@
 import pytest
 from httpx import ASGITransport, AsyncClient
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import NamedTuple
 from fastapi import status
 
 from main import app
-from database.models import User
+from database.models import MeetingParticipant, User
 from dependencies import get_meeting_repo, get_user_repo
 from applications.meeting.router import (
     get_current_user_dep,
@@ -32,9 +33,19 @@ def override_get_current_user(test_admin_user):
 
 @pytest.mark.asyncio
 async def test_meeting_list_page(override_get_current_user):
+    class FakePageStream:
+        next_cursor = prev_cursor = None
+
+        async def __aiter__(self):
+            return
+            yield
+
     class FakeMeetingRepo:
-        async def get_all(self, session):
-            return []
+        def upcoming_query(self, cursor=None):
+            return cursor
+
+        def stream_page(self, session, query):
+            return FakePageStream()
 
     app.dependency_overrides[
         get_current_user_dep_admin
@@ -48,18 +59,14 @@ async def test_meeting_list_page(override_get_current_user):
 
     assert response.status_code == 200
     assert "text/html" in response.headers["content-type"]
+    assert "Нет запланированных встреч" in response.text
 
 
 @pytest.mark.asyncio
 async def test_create_meeting_page(override_get_current_user):
-    class FakeUserRepo:
-        async def get_all(self, session):
-            return []
-
     app.dependency_overrides[
         get_current_user_dep_admin
     ] = override_get_current_user
-    app.dependency_overrides[get_user_repo] = lambda: FakeUserRepo()
 
     transport = ASGITransport(app=app, raise_app_exceptions=True)
     async with AsyncClient(
@@ -74,8 +81,12 @@ async def test_create_meeting_page(override_get_current_user):
 @pytest.mark.asyncio
 async def test_create_meeting_post(override_get_current_user):
     class FakeMeetingRepo:
-        async def add(self, session, date, description, user_id, members):
-            pass
+        async def get_busy_intervals(self, session, user_ids, start, end):
+            return []
+
+        async def add(self, session, date, description, user_id, members,
+                      duration):
+            assert duration == 60
 
     app.dependency_overrides[
         get_current_user_dep_admin
@@ -117,24 +128,28 @@ async def test_meeting_detail_page(override_get_current_user):
             self.participants = [FakeParticipant(FakeUser(1))]
 
     class FakeMeetingRepo:
+        async def get_version(self, session, meeting_id):
+            return (1, None, 1, None, 1, 1, 1, None)
+
         async def get(self, session, meeting_id):
             return FakeMeeting()
 
-    class FakeUserRepo:
-        async def get_all(self, session):
-            return [FakeUser(1), FakeUser(2)]
-
     app.dependency_overrides[get_current_user_dep] = override_get_current_user
     app.dependency_overrides[get_meeting_repo] = lambda: FakeMeetingRepo()
-    app.dependency_overrides[get_user_repo] = lambda: FakeUserRepo()
 
     transport = ASGITransport(app=app, raise_app_exceptions=True)
     async with AsyncClient(
         transport=transport, base_url="http://test"
     ) as client:
         response = await client.get("/meetings/1")
+        changed = await client.get("/meetings/1", headers={
+            "If-None-Match": 'W/"stale"'
+        })
 
     assert response.status_code == 200
+    assert "not_in_meeting=1" in response.text
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] == response.headers["ETag"]
 
 
 @pytest.mark.asyncio
@@ -161,6 +176,47 @@ async def test_add_meeting_member(override_get_current_user):
     assert response.headers["location"] == "/meetings/1"
 
 
+@pytest.mark.asyncio
+async def test_meeting_member_partial(override_get_current_user):
+    class FakeMeetingRepo:
+        async def add_member(self, session, meeting_id, user_id):
+            return MeetingParticipant(
+                meeting_id=meeting_id, user_id=user_id,
+                user=User(id=user_id, name="Ivan", lastname="Petrov",
+                          email="ivan@example.com")
+            )
+
+        async def delete_member(self, session, meeting_id, user_id):
+            pass
+
+    app.dependency_overrides[
+        get_current_user_dep_admin
+    ] = override_get_current_user
+    app.dependency_overrides[get_meeting_repo] = lambda: FakeMeetingRepo()
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test",
+        headers={"HX-Request": "true"}
+    ) as client:
+        added = await client.post(
+            "/meetings/1/add_meeting_member",
+            data={"user_id": 2}
+        )
+        deleted = await client.post(
+            "/meetings/1/delete_meeting_member",
+            data={"user_id": 2}
+        )
+
+    # Строка нового участника вместо редиректа на всю страницу
+    assert added.status_code == 200
+    assert "Ivan Petrov" in added.text
+    assert "/meetings/1/delete_meeting_member" in added.text
+    assert "<html" not in added.text
+    assert deleted.status_code == 200
+    assert deleted.text == ""
+
+
 @pytest.mark.asyncio
 async def test_delete_meeting_member(override_get_current_user):
     class FakeMeetingRepo:
@@ -210,3 +266,101 @@ async def test_edit_meeting(override_get_current_user):
 
     assert response.status_code == status.HTTP_303_SEE_OTHER
     assert response.headers["location"] == "/meetings/1"
+
+
+class BusyRow(NamedTuple):
+    user_id: int
+    id: int
+    date: datetime
+    duration: int
+
+
+class UserRow(NamedTuple):
+    id: int
+    name: str
+    lastname: str
+    email: str
+
+
+@pytest.mark.asyncio
+async def test_create_meeting_conflict(override_get_current_user):
+    start = datetime(2026, 3, 2, 10, 0)  # понедельник
+    added = []
+
+    class FakeMeetingRepo:
+        async def get_busy_intervals(self, session, user_ids, start, end):
+            return [BusyRow(2, 7, datetime(2026, 3, 2, 9, 30), 60)]
+
+        async def get_busy_meetings(self, session, user_ids, start, end):
+            return await self.get_busy_intervals(
+                session, user_ids, start, end
+            )
+
+        async def add(self, *args, **kwargs):
+            added.append(args)
+
+    class FakeUserRepo:
+        async def project(self, session, *columns, where=None):
+            return [UserRow(1, "Ann", "Lee", "ann@example.com"),
+                    UserRow(2, "Bob", "Ray", "bob@example.com")]
+
+    app.dependency_overrides[
+        get_current_user_dep_admin
+    ] = override_get_current_user
+    app.dependency_overrides[get_meeting_repo] = lambda: FakeMeetingRepo()
+    app.dependency_overrides[get_user_repo] = lambda: FakeUserRepo()
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        form = {
+            "description": "Planning",
+            "members": [1, 2],
+            "date": start.isoformat(),
+            "duration": 30,
+        }
+        conflict = await client.post("/meetings/create", data=form)
+        forced = await client.post(
+            "/meetings/create", data={**form, "ignore_conflicts": "true"}
+        )
+
+    assert conflict.status_code == status.HTTP_409_CONFLICT
+    assert "Bob Ray" in conflict.text
+    assert "Ann Lee" not in conflict.text.split("alert-danger")[1][:100]
+    # Первое общее окно после занятости Боба
+    assert 'data-start="2026-03-02T10:30"' in conflict.text
+    assert forced.status_code == status.HTTP_303_SEE_OTHER
+    assert len(added) == 1
+
+
+@pytest.mark.asyncio
+async def test_meeting_slots(override_get_current_user):
+    class FakeMeetingRepo:
+        async def get_busy_meetings(self, session, user_ids, start, end):
+            assert user_ids == [1, 2]
+            return [
+                BusyRow(1, 1, datetime(2026, 3, 2, 9, 0), 60),
+                BusyRow(2, 2, datetime(2026, 3, 2, 9, 30), 90),
+            ]
+
+    app.dependency_overrides[
+        get_current_user_dep_admin
+    ] = override_get_current_user
+    app.dependency_overrides[get_meeting_repo] = lambda: FakeMeetingRepo()
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        response = await client.get("/meetings/slots", params={
+            "members": [1, 2],
+            "start": "2026-03-02T08:00:00",
+            "end": (datetime(2026, 3, 2) + timedelta(days=1)).isoformat(),
+            "duration": 60,
+        })
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"start": "2026-03-02T11:00:00", "end": "2026-03-02T18:00:00"}
+    ]
@@ -0,0 +1,74 @@
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from markupsafe import Markup, escape
+
+
+from applications.auth.security import get_current_user
+from database.database import AsyncSession, get_db
+from database.fts import SNIPPET_END, SNIPPET_START
+from database.models import User
+from database.repositories import SearchRepository
+from dependencies import get_search_repo
+from utils import render_template
+from templating import templates
+
+
+router = APIRouter(prefix='/search', tags=["Search"])
+
+get_current_user_dep = get_current_user()
+
+RESULT_URLS = {
+    "task": "/tasks/{}",
+    "message": "/tasks/{}",
+    "meeting": "/meetings/{}",
+    "team": "/teams/{}",
+}
+
+
+def highlight(snippet: Optional[str]) -> Markup:
+    # Текст экранируется целиком, после чего маркеры FTS5 становятся <mark>
+    return Markup(
+        str(escape(snippet or ""))
+        .replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>")
+    )
+
+
+@router.get('')
+async def search_page(
+    request: Request,
+    q: str = Query("", max_length=200),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user_dep),
+    search_repo: SearchRepository = Depends(get_search_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    page = None
+    if q.strip():
+        try:
+            page = await search_repo.search(
+                session, current_user.id, q,
+                is_admin=current_user.role == "admin", cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    results = [
+        {
+            "type": item.type,
+            "url": RESULT_URLS[item.type].format(item.target_id),
+            "snippet": highlight(item.snippet),
+        }
+        for item in (page.items if page else [])
+    ]
+    return render_template(
+        request,
+        templates,
+        "search/search.html",
+        {"q": q, "results": results, "page": page,
+         "pagination_query": urlencode({"q": q})},
+        current_user
+    )
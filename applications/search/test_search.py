@@ -0,0 +1,74 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup
+
+from database.pagination import Page
+from dependencies import get_search_repo
+from main import app
+from applications.search.router import get_current_user_dep
+
+
+class FakeUser(NamedTuple):
+    id: int
+    email: str
+    name: str
+    lastname: str
+    role: str
+    is_authenticated: bool = True
+
+
+class FakeResult(NamedTuple):
+    type: str
+    id: int
+    target_id: int
+    snippet: str
+    rank: float
+
+
+class FakeSearchRepo:
+    def __init__(self):
+        self.calls = []
+
+    async def search(self, session, user_id, query, is_admin=False,
+                     cursor=None):
+        self.calls.append((user_id, query, is_admin, cursor))
+        return Page([
+            FakeResult("message", 12, 3,
+                       "…про <script> и \x02отчёт\x03 к пятнице…", -2.5),
+            FakeResult("team", 4, 4, "\x02Отчёт\x03ность", -1.0),
+        ], next_cursor="abc")
+
+
+@pytest.mark.asyncio
+async def test_search_page():
+    test_user = FakeUser(id=7, email="test@example.com", name="Test",
+                         lastname="User", role="user")
+    repo = FakeSearchRepo()
+
+    async def override_current_user():
+        return test_user
+
+    app.dependency_overrides[get_search_repo] = lambda: repo
+    app.dependency_overrides[get_current_user_dep] = override_current_user
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        empty = await ac.get("/search")
+        response = await ac.get("/search", params={"q": "отчёт"})
+    app.dependency_overrides.clear()
+
+    assert empty.status_code == 200
+    assert response.status_code == 200
+    assert repo.calls == [(7, "отчёт", False, None)]
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    links = soup.select(".list-group-item")
+    assert [link["href"] for link in links] == ["/tasks/3", "/teams/4"]
+    assert [mark.text for mark in soup.select("mark")] == ["отчёт", "Отчёт"]
+    # Текст сообщения экранирован, размечены только совпадения
+    assert links[0].find("script") is None
+    assert "<script>" in links[0].text
+    next_link = soup.select(".page-link")[1]["href"]
+    assert next_link == "?q=%D0%BE%D1%82%D1%87%D1%91%D1%82&cursor=abc"
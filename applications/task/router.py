@@ -1,42 +1,140 @@
+import asyncio
 import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Form, Query, Request, Depends, status
+from fastapi import (APIRouter, Form, Request, Depends, WebSocket,
+                     status)
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.exceptions import HTTPException
-from fastapi.templating import Jinja2Templates
 
 
 from database.database import AsyncSession, get_db
 from database.repositories import (TaskRepository, UserRepository,
-                                   TaskChatRepository)
+                                   TaskChatRepository, task_channel)
 from database.models import User
 from dependencies import get_task_repo, get_user_repo, get_taskchat_repo
 from applications.auth.security import get_current_user
-from utils import render_template
+from http_cache import cache_headers, not_modified, page_validator
+from pubsub import hub
+from utils import is_partial, render_template, stream_template
+from templating import templates
 
 
 router = APIRouter(prefix='/tasks', tags=["Task"])
-templates = Jinja2Templates(directory="templates")
 
 get_current_user_dep = get_current_user()
 get_current_user_dep_admin = get_current_user(admin=True)
 
+STATUS_NAMES = {
+    'open': 'Открыто',
+    'in_work': 'В работе',
+    'completed': 'Завершено'
+}
+
+# Задачи создают только администраторы, а эти действия доступны лишь
+# создателю: остальным форма их не показывает
+ADMIN_BULK_ACTIONS = frozenset({"reassign", "shift", "delete"})
+
+
+async def _bulk_action(task_repo: TaskRepository, session: AsyncSession,
+                       task_ids: list[int], action: str, user_id: int,
+                       task_status: Optional[str] = None,
+                       performer: Optional[str] = None,
+                       days: Optional[int] = None) -> int:
+    if action == "status":
+        if task_status not in STATUS_NAMES:
+            raise ValueError("Неизвестный статус")
+        return await task_repo.bulk_update_status(
+            session, task_ids, task_status, user_id
+        )
+    if action == "reassign":
+        if not performer or not performer.isdigit():
+            raise ValueError("Не выбран исполнитель")
+        return await task_repo.bulk_reassign(
+            session, task_ids, int(performer), user_id
+        )
+    if action == "shift":
+        if not days:
+            raise ValueError("Не указан сдвиг срока")
+        return await task_repo.bulk_shift_deadline(
+            session, task_ids, datetime.timedelta(days=days), user_id
+        )
+    if action == "delete":
+        return await task_repo.bulk_delete(session, task_ids, user_id)
+    raise ValueError("Неизвестное действие")
+
 
 @router.get('')
 async def tasks_list_page(
     request: Request,
+    cursor: Optional[str] = None,
+    changed: Optional[int] = None,
     current_user: User = Depends(get_current_user_dep),
     task_repo: TaskRepository = Depends(get_task_repo),
     session: AsyncSession = Depends(get_db)
 ):
-    tasks = await task_repo.get_all_user_tasks(session, current_user.id)
-    return render_template(
+    try:
+        query = task_repo.user_tasks_query(current_user.id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # Повторный запрос с актуальной копией: одна агрегатная строка вместо
+    # выборки страницы и рендера
+    validator = page_validator(
+        current_user,
+        await task_repo.get_list_version(session, current_user.id)
+    )
+    cached = not_modified(request, validator)
+    if cached is not None:
+        return cached
+    # Средняя оценка показывается только исполнителям
+    avg = None
+    if current_user.role != "admin":
+        avg = await task_repo.get_average_assessment(session, current_user.id)
+    response = stream_template(
         request,
-        templates,
         "task/tasks_list.html",
-        {"tasks": tasks["tasks"], "avg": tasks["avg"]},
-        current_user
+        {"avg": avg, "changed": changed,
+         "status_choices": list(STATUS_NAMES.items())},
+        current_user,
+        streams={"page": lambda stream_session: task_repo.stream_page(
+            stream_session, query
+        )}
+    )
+    response.headers.update(cache_headers(validator))
+    return response
+
+
+@router.post('/bulk')
+async def bulk_tasks(
+    action: str = Form(...),
+    task_ids: list[int] = Form([]),
+    task_status: Optional[str] = Form(None),
+    performer: Optional[str] = Form(None),
+    days: Optional[int] = Form(None),
+    session: AsyncSession = Depends(get_db),
+    task_repo: TaskRepository = Depends(get_task_repo),
+    current_user: User = Depends(get_current_user_dep)
+):
+    # Отмеченные в списке задачи меняются одним запросом; задачи, на
+    # которые у пользователя нет прав, просто не попадают в счётчик
+    if action in ADMIN_BULK_ACTIONS and current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    try:
+        changed = await _bulk_action(
+            task_repo, session, task_ids, action, current_user.id,
+            task_status=task_status, performer=performer, days=days
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return RedirectResponse(
+        f"/tasks?changed={changed}",
+        status_code=status.HTTP_303_SEE_OTHER
     )
 
 
@@ -45,16 +143,13 @@ async def create_task_page(
     request: Request, error: str = None,
     current_user: User = Depends(
         get_current_user_dep_admin
-    ),
-    user_repo: UserRepository = Depends(get_user_repo),
-    session: AsyncSession = Depends(get_db)
+    )
 ):
-    users = await user_repo.get_all(session)
     return render_template(
         request,
         templates,
         "task/create_task.html",
-        {"error": error, "users": users},
+        {"error": error},
         current_user
     )
 
@@ -62,7 +157,6 @@ async def create_task_page(
 @router.post('/create')
 async def create_task(
     request: Request,
-    user_repo: UserRepository = Depends(get_user_repo),
     performer: int = Form(...),
     description: str = Form(...),
     deadline: datetime.datetime = Form(...),
@@ -79,12 +173,11 @@ async def create_task(
             "deadline": deadline
         })
     except ValueError as e:
-        users = await user_repo.get_all_with_user(session)
         return render_template(
             request,
             templates,
             "task/create_task.html",
-            {"error": str(e), "users": users},
+            {"error": str(e)},
             current_user
         )
     return RedirectResponse(
@@ -99,52 +192,161 @@ async def task_detail_page(
     request: Request,
     session: AsyncSession = Depends(get_db),
     task_repo: TaskRepository = Depends(get_task_repo),
+    taskchat_repo: TaskChatRepository = Depends(get_taskchat_repo),
     current_user: User = Depends(get_current_user_dep)
 ):
+    version = await task_repo.get_version(session, task_id)
+    validator = None
+    if version and current_user.id in version[:2]:
+        validator = page_validator(current_user, version)
+        cached = not_modified(request, validator)
+        if cached is not None:
+            return cached
+
     task = await task_repo.get_user_tasks(session, task_id, current_user.id)
 
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
     if current_user.id not in (task.creator, task.performer):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
+    comments = await taskchat_repo.get_history(session, task_id)
+    response = render_template(
+        request,
+        templates,
+        "task/task_detail.html",
+        {"task": task, "comments": comments, "status_names": STATUS_NAMES},
+        current_user
+    )
+    if validator:
+        response.headers.update(cache_headers(validator))
+    return response
+
+
+@router.get('/{task_id}/comments', response_class=HTMLResponse)
+async def task_comments(
+    task_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_db),
+    task_repo: TaskRepository = Depends(get_task_repo),
+    taskchat_repo: TaskChatRepository = Depends(get_taskchat_repo),
+    current_user: User = Depends(get_current_user_dep)
+):
+    # Фрагмент с более ранними сообщениями: подгружается на странице задачи
+    task = await task_repo.get(session, task_id)
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if current_user.id not in (task.creator, task.performer):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
+    try:
+        comments = await taskchat_repo.get_history(session, task_id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     return render_template(
         request,
         templates,
-        "task/task_detail.html",
-        {"task": task},
-        current_user
+        "task/comments.html",
+        {"task": task, "comments": comments},
     )
 
 
-@router.get('/{task_id}/change_status')
+@router.websocket('/{task_id}/ws')
+async def task_events(
+    websocket: WebSocket,
+    task_id: int,
+    session: AsyncSession = Depends(get_db),
+    task_repo: TaskRepository = Depends(get_task_repo),
+    current_user: User = Depends(get_current_user_dep)
+):
+    # Новые комментарии и смена статуса/оценки для открытой страницы
+    task = await task_repo.get(session, task_id)
+    # Сессия из get_db живёт до конца обработчика: не держим соединение
+    # (и снимок WAL) всё время, пока открыт сокет
+    await session.close()
+    if not task or current_user.id not in (task.creator, task.performer):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with hub.subscribe(task_channel(task_id)) as subscription:
+        async def send_events():
+            async for event in subscription:
+                await websocket.send_json(event)
+
+        async def wait_disconnect():
+            message = {}
+            while message.get("type") != "websocket.disconnect":
+                message = await websocket.receive()
+
+        sender = asyncio.create_task(send_events())
+        receiver = asyncio.create_task(wait_disconnect())
+        done, pending = await asyncio.wait(
+            {sender, receiver}, return_when=asyncio.FIRST_COMPLETED
+        )
+        for job in pending:
+            job.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    # Клиент ушёл сам (или отправка в закрытый сокет не удалась)
+    if receiver in done or sender.exception() is not None:
+        return
+    # Подписка закрыта сервером. Отставший клиент пропустил события:
+    # пусть переподключится и перечитает страницу
+    await websocket.close(
+        code=status.WS_1013_TRY_AGAIN_LATER if subscription.evicted
+        else status.WS_1001_GOING_AWAY
+    )
+
+
+@router.post('/{task_id}/change_status')
 async def change_status(
+    request: Request,
     task_id: int,
-    task_status: str,
+    task_status: str = Form(...),
     session: AsyncSession = Depends(get_db),
     task_repo: TaskRepository = Depends(get_task_repo),
     current_user: User = Depends(get_current_user_dep)
 ):
-    await task_repo.update_status(
+    task = await task_repo.update_status(
         session, task_id, task_status
     )
+    if is_partial(request):
+        return render_template(
+            request,
+            templates,
+            "task/status.html",
+            {"task": task, "status_names": STATUS_NAMES},
+        )
     return RedirectResponse(
         f'/tasks/{task_id}',
         status_code=status.HTTP_303_SEE_OTHER
     )
 
 
-@router.get('/{task_id}/change_assessment')
+@router.post('/{task_id}/change_assessment')
 async def change_assessment(
-    task_id: int, assessment: int = Query(ge=1, le=5),
+    request: Request,
+    task_id: int, assessment: int = Form(ge=1, le=5),
     session: AsyncSession = Depends(get_db),
     task_repo: TaskRepository = Depends(get_task_repo),
     current_user: User = Depends(get_current_user_dep)
 ):
-    await task_repo.update_assessment(
+    task = await task_repo.update_assessment(
         session, task_id, assessment
     )
+    if is_partial(request):
+        return render_template(
+            request,
+            templates,
+            "task/assessment.html",
+            {"task": task},
+        )
     return RedirectResponse(
         f'/tasks/{task_id}',
         status_code=status.HTTP_303_SEE_OTHER
@@ -179,18 +381,14 @@ async def edit_task_page(
 ):
     task = await task_repo.get(session, task_id)
     if task and (task.creator == current_user.id):
-        users = await user_repo.get_all(session)
+        performer = await user_repo.get(session, task.performer)
         return render_template(
             request,
             templates,
             "task/edit_task.html",
             {"task": task,
-             "status_choices": [
-                ('open', 'Открыто'),
-                ('in_work', 'В работе'),
-                ('completed', 'Завершено')
-             ],
-             "users": users},
+             "status_choices": list(STATUS_NAMES.items()),
+             "performer": performer},
             current_user
         )
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
@@ -237,6 +435,7 @@ async def edit_task(
 
 @router.post('/{task_id}/add_comment')
 async def add_comment(
+    request: Request,
     task_id: int,
     message: str = Form(...),
     session: AsyncSession = Depends(get_db),
@@ -248,20 +447,27 @@ async def add_comment(
     if task and (task.creator == current_user.id or
                  task.performer == current_user.id):
         try:
-            await taskchat_repo.add(session, {
+            comment = await taskchat_repo.add(session, {
                 "user_id": current_user.id,
                 "task_id": task_id,
                 "text": message
             })
-            return RedirectResponse(
-                    f'/tasks/{task_id}',
-                    status_code=status.HTTP_303_SEE_OTHER
-                )
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=str(e)
             )
+        if is_partial(request):
+            return render_template(
+                request,
+                templates,
+                "task/comment.html",
+                {"task": task, "comment": comment},
+            )
+        return RedirectResponse(
+            f'/tasks/{task_id}',
+            status_code=status.HTTP_303_SEE_OTHER
+        )
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN
     )
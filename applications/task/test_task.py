@@ -1,14 +1,21 @@
+import asyncio
 from datetime import datetime
 import pytest
+from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
+from starlette.websockets import WebSocketDisconnect
 
 
 from main import app
 from database.models import User
-from dependencies import get_task_repo, get_user_repo
+from database.pagination import Page
+from database.repositories import task_channel
+from dependencies import get_task_repo, get_taskchat_repo, get_user_repo
 from applications.task.router import (
     get_current_user_dep, get_current_user_dep_admin
 )
+from http_cache import STARTED_AT, http_date
+from pubsub import hub
 
 
 @pytest.fixture
@@ -63,12 +70,25 @@ async def test_tasks_list_page(override_get_current_user):
             self.assessment = 5
             self.deadline = datetime.now()
 
+    class FakePageStream:
+        next_cursor = "abc"
+        prev_cursor = None
+
+        async def __aiter__(self):
+            yield FakeTask()
+
     class FakeTaskRepo:
-        async def get_all_user_tasks(self, session, user_id):
-            return {
-                "tasks": [FakeTask()],
-                "avg": 4.5
-            }
+        def user_tasks_query(self, user_id, cursor=None):
+            return cursor
+
+        async def get_list_version(self, session, user_id):
+            return (1, 1, 1, datetime(2026, 1, 15), 1, None, 1, None)
+
+        async def get_average_assessment(self, session, user_id):
+            return 4.5
+
+        def stream_page(self, session, query):
+            return FakePageStream()
 
     app.dependency_overrides[get_current_user_dep] = override_get_current_user
     app.dependency_overrides[get_task_repo] = lambda: FakeTaskRepo()
@@ -78,22 +98,29 @@ async def test_tasks_list_page(override_get_current_user):
         transport=transport, base_url="http://test"
     ) as client:
         response = await client.get("/tasks")
+        nothing_changed = await client.get("/tasks?changed=0")
 
     assert response.status_code == 200
     assert "Sample task" in response.text
     assert "Admin" in response.text
+    assert "Средняя оценка: 4.5" in response.text
+    # Ссылка на следующую страницу известна только после строк
+    assert "?cursor=abc" in response.text
+    assert response.headers["ETag"].startswith('W/"')
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    # Исполнителю — только смена статуса: поиск пользователей для него
+    # закрыт, а остальные действия доступны лишь создателю
+    assert 'name="task_status"' in response.text
+    assert 'value="delete"' not in response.text
+    assert "user-typeahead" not in response.text
+    assert "Ни одна задача не изменена" in nothing_changed.text
 
 
 @pytest.mark.asyncio
 async def test_create_task_page(override_get_current_user_admin):
-    class FakeUserRepo:
-        async def get_all(self, session):
-            return [User(id=1), User(id=2)]
-
     app.dependency_overrides[
         get_current_user_dep_admin
     ] = override_get_current_user_admin
-    app.dependency_overrides[get_user_repo] = lambda: FakeUserRepo()
 
     transport = ASGITransport(app=app, raise_app_exceptions=True)
     async with AsyncClient(
@@ -105,6 +132,29 @@ async def test_create_task_page(override_get_current_user_admin):
     assert "text/html" in response.headers["content-type"]
 
 
+class FakeComment:
+    def __init__(self, id, text):
+        self.id = id
+        self.user_id = 2
+        self.user = User(id=2, name="Perf", lastname="Ormer")
+        self.text = text
+        self.created_at = datetime(2026, 1, 15, 12, id)
+
+
+class FakeTaskChatRepo:
+    def __init__(self):
+        self.cursors = []
+
+    async def get_history(self, session, task_id, cursor=None):
+        self.cursors.append(cursor)
+        if cursor is None:
+            return Page([FakeComment(3, "Newest")], prev_cursor="older")
+        return Page([FakeComment(1, "Oldest")])
+
+    async def add(self, session, obj_in):
+        return FakeComment(4, obj_in["text"])
+
+
 @pytest.mark.asyncio
 async def test_task_detail_page(override_get_current_user):
     class FakeTask:
@@ -115,20 +165,95 @@ async def test_task_detail_page(override_get_current_user):
             self.creator_user = "test"
 
     class FakeTaskRepo:
+        def __init__(self):
+            self.loaded = 0
+
+        async def get_version(self, session, task_id):
+            return (1, 2, 3, datetime(2026, 1, 15, 12), 1, None, 1, None,
+                    1, 3, 1, datetime(2026, 1, 15, 12, 3), 1, 2, 1, None)
+
         async def get_user_tasks(self, session, task_id, user_id):
+            self.loaded += 1
             return FakeTask()
 
+        async def get(self, session, task_id):
+            return FakeTask()
+
+    task_repo = FakeTaskRepo()
+    chat_repo = FakeTaskChatRepo()
     app.dependency_overrides[get_current_user_dep] = override_get_current_user
-    app.dependency_overrides[get_task_repo] = lambda: FakeTaskRepo()
+    app.dependency_overrides[get_task_repo] = lambda: task_repo
+    app.dependency_overrides[get_taskchat_repo] = lambda: chat_repo
 
     transport = ASGITransport(app=app, raise_app_exceptions=True)
     async with AsyncClient(
         transport=transport, base_url="http://test"
     ) as client:
         response = await client.get("/tasks/1")
+        older = await client.get("/tasks/1/comments?cursor=older")
+        revalidated = await client.get(
+            "/tasks/1", headers={"If-None-Match": response.headers["ETag"]}
+        )
 
     assert response.status_code == 200
     assert "text/html" in response.headers["content-type"]
+    assert "Newest" in response.text
+    assert "/tasks/1/comments?cursor=older" in response.text
+    assert '<span class="badge bg-success">Исполнитель</span>' in response.text
+
+    # Фрагмент без базового шаблона и без ссылки на следующую страницу
+    assert older.status_code == 200
+    assert "Oldest" in older.text
+    assert "<html" not in older.text
+    assert "load-older-comments" not in older.text
+
+    # Данные старше процесса: Last-Modified — время его запуска
+    assert response.headers["Last-Modified"] == http_date(STARTED_AT)
+    # Актуальная копия: 304 без загрузки задачи и чата
+    assert revalidated.status_code == 304
+    assert revalidated.text == ""
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+    assert task_repo.loaded == 1
+    assert chat_repo.cursors == [None, "older"]
+
+
+@pytest.mark.asyncio
+async def test_add_comment_partial(override_get_current_user):
+    class FakeTask:
+        def __init__(self):
+            self.id = 1
+            self.creator = 1
+            self.performer = 2
+
+    class FakeTaskRepo:
+        async def get(self, session, task_id):
+            return FakeTask()
+
+    app.dependency_overrides[get_current_user_dep] = override_get_current_user
+    app.dependency_overrides[get_task_repo] = lambda: FakeTaskRepo()
+    app.dependency_overrides[get_taskchat_repo] = lambda: FakeTaskChatRepo()
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        redirect = await client.post(
+            "/tasks/1/add_comment", data={"message": "Hello"}
+        )
+        fragment = await client.post(
+            "/tasks/1/add_comment", data={"message": "Hello"},
+            headers={"HX-Request": "true"}
+        )
+
+    assert redirect.status_code == 303
+    assert redirect.headers["location"] == "/tasks/1"
+
+    # Только новый комментарий, без страницы вокруг
+    assert fragment.status_code == 200
+    assert 'id="comment-4"' in fragment.text
+    assert "Hello" in fragment.text
+    assert "Perf Ormer" in fragment.text
+    assert "<html" not in fragment.text
 
 
 @pytest.mark.asyncio
@@ -137,14 +262,17 @@ async def test_edit_task_page(override_get_current_user):
         def __init__(self):
             self.id = 1
             self.creator = 1
+            self.performer = 2
 
     class FakeTaskRepo:
         async def get(self, session, task_id):
             return FakeTask()
 
     class FakeUserRepo:
-        async def get_all(self, session):
-            return [User(id=1), User(id=2)]
+        async def get(self, session, user_id):
+            assert user_id == 2
+            return User(id=2, name="Perf", lastname="Ormer",
+                        email="performer@example.com")
 
     app.dependency_overrides[get_current_user_dep] = override_get_current_user
     app.dependency_overrides[get_task_repo] = lambda: FakeTaskRepo()
@@ -158,3 +286,128 @@ async def test_edit_task_page(override_get_current_user):
 
     assert response.status_code == 200
     assert "text/html" in response.headers["content-type"]
+    assert "Perf Ormer (performer@example.com)" in response.text
+
+
+@pytest.mark.asyncio
+async def test_bulk_tasks(override_get_current_user):
+    class FakeTaskRepo:
+        def __init__(self):
+            self.calls = []
+
+        async def bulk_update_status(self, session, task_ids, task_status,
+                                     user_id):
+            self.calls.append((task_ids, task_status, user_id))
+            return 2
+
+    repo = FakeTaskRepo()
+    app.dependency_overrides[get_current_user_dep] = override_get_current_user
+    app.dependency_overrides[get_task_repo] = lambda: repo
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        response = await client.post("/tasks/bulk", data={
+            "action": "status", "task_status": "completed",
+            "task_ids": ["1", "5", "9"]
+        })
+        unknown = await client.post("/tasks/bulk", data={
+            "action": "status", "task_status": "lost", "task_ids": ["1"]
+        })
+        forbidden = await client.post("/tasks/bulk", data={
+            "action": "delete", "task_ids": ["1"]
+        })
+
+    # Права проверяет сам запрос: в репозиторий уходит id пользователя
+    assert repo.calls == [([1, 5, 9], "completed", 1)]
+    assert response.status_code == 303
+    assert response.headers["location"] == "/tasks?changed=2"
+    assert unknown.status_code == 400
+    # Удаление и переназначение — только для администраторов
+    assert forbidden.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_change_status_partial(override_get_current_user):
+    class FakeTask:
+        id = 1
+        status = "in_work"
+
+    class FakeTaskRepo:
+        def __init__(self):
+            self.calls = []
+
+        async def update_status(self, session, task_id, task_status):
+            self.calls.append((task_id, task_status))
+            return FakeTask()
+
+    repo = FakeTaskRepo()
+    app.dependency_overrides[get_current_user_dep] = override_get_current_user
+    app.dependency_overrides[get_task_repo] = lambda: repo
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        redirect = await client.post(
+            "/tasks/1/change_status", data={"task_status": "in_work"}
+        )
+        fragment = await client.post(
+            "/tasks/1/change_status", data={"task_status": "in_work"},
+            headers={"HX-Request": "true"}
+        )
+        # Изменение — только POST: GET-ссылку могут открыть краулер
+        # или предзагрузка браузера
+        old_link = await client.get(
+            "/tasks/1/change_status?task_status=open"
+        )
+
+    assert repo.calls == [(1, "in_work"), (1, "in_work")]
+    assert redirect.status_code == 303
+    assert redirect.headers["location"] == "/tasks/1"
+    assert fragment.status_code == 200
+    assert 'id="task-status"' in fragment.text
+    assert "В работе" in fragment.text
+    assert old_link.status_code == 405
+
+
+def test_task_events_websocket(override_get_current_user):
+    class FakeTask:
+        def __init__(self, performer):
+            self.id = 1
+            self.creator = 3
+            self.performer = performer
+
+    class FakeTaskRepo:
+        def __init__(self, performer):
+            self.performer = performer
+
+        async def get(self, session, task_id):
+            return FakeTask(self.performer)
+
+    app.dependency_overrides[get_current_user_dep] = override_get_current_user
+    client = TestClient(app)
+
+    app.dependency_overrides[get_task_repo] = lambda: FakeTaskRepo(1)
+    with client.websocket_connect("/tasks/1/ws") as websocket:
+        # Подписка оформляется после accept: ждём её перед публикацией
+        websocket.portal.call(wait_for_subscriber, task_channel(1))
+        websocket.portal.call(
+            hub.publish, task_channel(1), {"type": "status",
+                                           "status": "in_work"}
+        )
+        assert websocket.receive_json() == {"type": "status",
+                                            "status": "in_work"}
+
+    # Чужая задача: соединение закрывается сразу
+    app.dependency_overrides[get_task_repo] = lambda: FakeTaskRepo(2)
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/tasks/1/ws"):
+            pass
+    assert closed.value.code == 1008
+
+
+async def wait_for_subscriber(channel):
+    while not hub.subscribers(channel):
+        await asyncio.sleep(0.01)
@@ -1,18 +1,19 @@
+from typing import Optional
 from fastapi import APIRouter, Form, HTTPException, Request, Depends, status
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 
 
 from applications.auth.security import get_current_user
 from database.models import User
-from database.repositories import TeamRepository, UserRepository
+from database.repositories import TeamRepository
 from database.database import AsyncSession, get_db
-from dependencies import get_team_repo, get_user_repo
-from utils import render_template
+from dependencies import get_team_repo
+from http_cache import cache_headers, not_modified, page_validator
+from utils import is_partial, render_template, stream_template
+from templating import templates
 
 
 router = APIRouter(prefix='/teams', tags=["Team"])
-templates = Jinja2Templates(directory="templates")
 
 get_current_user_dep = get_current_user()
 get_current_user_dep_admin = get_current_user(admin=True)
@@ -21,17 +22,25 @@ get_current_user_dep_admin = get_current_user(admin=True)
 @router.get('')
 async def team_list_page(
     request: Request,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user_dep_admin),
-    session: AsyncSession = Depends(get_db),
     team_repo: TeamRepository = Depends(get_team_repo)
 ):
-    teams = await team_repo.get_all(session)
-    return render_template(
+    try:
+        query = team_repo.page_query(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return stream_template(
         request,
-        templates,
         'team/teams_list.html',
-        {"teams": teams},
-        current_user
+        {},
+        current_user,
+        streams={"page": lambda stream_session: team_repo.stream_page(
+            stream_session, query
+        )}
     )
 
 
@@ -39,15 +48,12 @@ async def team_list_page(
 async def create_team_page(
     request: Request,
     current_user: User = Depends(get_current_user_dep_admin),
-    session: AsyncSession = Depends(get_db),
-    user_repo: UserRepository = Depends(get_user_repo),
 ):
-    users = await user_repo.get_all(session)
     return render_template(
         request,
         templates,
         'team/create_team.html',
-        {"users": users},
+        {},
         current_user
     )
 
@@ -98,24 +104,33 @@ async def team_detail_page(
     team_id: int,
     current_user: User = Depends(get_current_user_dep),
     session: AsyncSession = Depends(get_db),
-    team_repo: TeamRepository = Depends(get_team_repo),
-    user_repo: UserRepository = Depends(get_user_repo)
+    team_repo: TeamRepository = Depends(get_team_repo)
 ):
+    version = await team_repo.get_version(session, team_id)
+    if not version:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    validator = page_validator(current_user, version)
+    cached = not_modified(request, validator)
+    if cached is not None:
+        return cached
+
     team = await team_repo.get(session, team_id)
-    all_users = await user_repo.get_all(session)
-    team_member_ids = {member.user.id for member in team.user_teams}
-    available_users = [u for u in all_users if u.id not in team_member_ids]
-    return render_template(
+    if not team:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    response = render_template(
         request,
         templates,
         'team/team_detail.html',
-        {"team": team, "available_users": available_users},
+        {"team": team},
         current_user
     )
+    response.headers.update(cache_headers(validator))
+    return response
 
 
 @router.post('/{team_id}/add_team_member')
 async def add_team_member(
+    request: Request,
     team_id: int,
     user_id: int = Form(...),
     role: str = Form('staff'),
@@ -124,7 +139,7 @@ async def add_team_member(
     team_repo: TeamRepository = Depends(get_team_repo)
 ):
     try:
-        await team_repo.add_member(
+        member = await team_repo.add_member(
             session,
             team_id,
             user_id,
@@ -135,6 +150,14 @@ async def add_team_member(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    if is_partial(request):
+        return render_template(
+            request,
+            templates,
+            'team/member.html',
+            {"member": member, "team_id": team_id},
+            current_user
+        )
     return RedirectResponse(
         f'/teams/{team_id}',
         status_code=status.HTTP_303_SEE_OTHER
@@ -143,6 +166,7 @@ async def add_team_member(
 
 @router.post('/{team_id}/delete_team_member')
 async def delete_team_member(
+    request: Request,
     team_id: int,
     user_id: int = Form(...),
     current_user: User = Depends(get_current_user_dep_admin),
@@ -158,6 +182,9 @@ async def delete_team_member(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    if is_partial(request):
+        # Пустой ответ: htmx заменяет им строку удалённого участника
+        return HTMLResponse('')
     return RedirectResponse(
         f'/teams/{team_id}',
         status_code=status.HTTP_303_SEE_OTHER
@@ -186,6 +213,7 @@ async def delete_team(
 
 @router.post('/{team_id}/rename')
 async def rename_team(
+    request: Request,
     team_id: int,
     name: str = Form(..., max_length=100),
     current_user: User = Depends(get_current_user_dep_admin),
@@ -199,6 +227,13 @@ async def rename_team(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    if is_partial(request):
+        return render_template(
+            request,
+            templates,
+            'team/team_name.html',
+            {"team": {"id": team_id, "name": name}},
+        )
     return RedirectResponse(
         f'/teams/{team_id}',
         status_code=status.HTTP_303_SEE_OTHER
@@ -2,7 +2,7 @@ import pytest
 from httpx import ASGITransport, AsyncClient
 from main import app
 from database.models import User
-from dependencies import get_team_repo, get_user_repo
+from dependencies import get_team_repo
 from applications.team.router import (
     get_current_user_dep, get_current_user_dep_admin
 )
@@ -51,9 +51,18 @@ async def test_team_list_page(override_get_current_user_admin):
             self.id = id
             self.name = name
 
+    class FakePageStream:
+        next_cursor = prev_cursor = None
+
+        async def __aiter__(self):
+            yield FakeTeam()
+
     class FakeTeamRepo:
-        async def get_all(self, session):
-            return [FakeTeam()]
+        def page_query(self, cursor=None):
+            return cursor
+
+        def stream_page(self, session, query):
+            return FakePageStream()
 
     app.dependency_overrides[
         get_current_user_dep_admin
@@ -72,14 +81,9 @@ async def test_team_list_page(override_get_current_user_admin):
 
 @pytest.mark.asyncio
 async def test_create_team_page(override_get_current_user_admin):
-    class FakeUserRepo:
-        async def get_all(self, session):
-            return [User(id=1, name="Alice"), User(id=2, name="Bob")]
-
     app.dependency_overrides[
         get_current_user_dep_admin
     ] = override_get_current_user_admin
-    app.dependency_overrides[get_user_repo] = lambda: FakeUserRepo()
 
     transport = ASGITransport(app=app, raise_app_exceptions=True)
     async with AsyncClient(
@@ -140,3 +144,73 @@ async def test_my_team_page(override_get_current_user_user):
 
     assert response.status_code == 200
     assert "My Team" in response.text
+
+
+@pytest.mark.asyncio
+async def test_team_detail_page(override_get_current_user_admin):
+    class FakeTeam:
+        def __init__(self):
+            self.id = 1
+            self.name = "Team Alpha"
+            self.user_teams = []
+
+    class FakeTeamRepo:
+        def __init__(self):
+            self.loaded = 0
+
+        async def get_version(self, session, team_id):
+            return (2, None, 0, None, None, None)
+
+        async def get(self, session, team_id):
+            self.loaded += 1
+            return FakeTeam()
+
+    team_repo = FakeTeamRepo()
+    app.dependency_overrides[
+        get_current_user_dep
+    ] = override_get_current_user_admin
+    app.dependency_overrides[get_team_repo] = lambda: team_repo
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        response = await client.get("/teams/1")
+        revalidated = await client.get("/teams/1", headers={
+            "If-Modified-Since": response.headers["Last-Modified"]
+        })
+
+    assert response.status_code == 200
+    assert "not_in_team=1" in response.text
+    assert revalidated.status_code == 304
+    assert team_repo.loaded == 1
+
+
+@pytest.mark.asyncio
+async def test_rename_team_partial(override_get_current_user_admin):
+    class FakeTeamRepo:
+        async def update(self, session, team_id, data):
+            return True
+
+    app.dependency_overrides[
+        get_current_user_dep_admin
+    ] = override_get_current_user_admin
+    app.dependency_overrides[get_team_repo] = lambda: FakeTeamRepo()
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        redirect = await client.post(
+            "/teams/1/rename", data={"name": "Team Beta"}
+        )
+        fragment = await client.post(
+            "/teams/1/rename", data={"name": "<b>Team Beta</b>"},
+            headers={"HX-Request": "true"}
+        )
+
+    assert redirect.status_code == 303
+    assert fragment.status_code == 200
+    assert fragment.text.strip() == (
+        '<h2 id="team-name">&lt;b&gt;Team Beta&lt;/b&gt;</h2>'
+    )
@@ -1,23 +1,29 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, Form, Request, status
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Form, Query, Request, status
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.exceptions import HTTPException
 from pydantic import EmailStr
 
 
 from database.models import User
 from database.database import AsyncSession, get_db
+from database.password_hasher import PasswordHasherBusy
 from database.repositories import UserRepository
 from applications.auth.security import get_current_user, get_user_repo
+from cache import TTLCache
 from utils import render_template
+from templating import templates
 
 
 router = APIRouter(prefix='/users', tags=["User"])
-templates = Jinja2Templates(directory="templates")
 
 
 get_current_user_dep = get_current_user()
+get_current_user_dep_admin = get_current_user(admin=True)
+
+# Подсказки по префиксу: короткий TTL, новые сотрудники появятся быстро
+SEARCH_CACHE_TTL = 30
+user_search_cache = TTLCache(maxsize=1024, ttl=SEARCH_CACHE_TTL)
 
 
 @router.get("/profile", response_class=HTMLResponse)
@@ -34,6 +40,43 @@ async def profile_page(
     )
 
 
+@router.get('/search')
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=20),
+    not_in_meeting: Optional[int] = None,
+    not_in_team: Optional[int] = None,
+    current_user: User = Depends(get_current_user_dep_admin),
+    user_repo: UserRepository = Depends(get_user_repo),
+    session: AsyncSession = Depends(get_db)
+):
+    # Выборки «кроме участников» меняются с каждым добавлением — без кэша
+    if not_in_meeting is not None:
+        page = await user_repo.get_not_in_meeting(
+            session, not_in_meeting, prefix=q, limit=limit
+        )
+        rows = page.items
+    elif not_in_team is not None:
+        page = await user_repo.get_not_in_team(
+            session, not_in_team, prefix=q, limit=limit
+        )
+        rows = page.items
+    else:
+        rows = user_search_cache.get((q, limit))
+        if rows is None:
+            rows = await user_repo.search(session, q, limit)
+            user_search_cache.set((q, limit), rows)
+
+    return JSONResponse(
+        [
+            {"id": row.id, "name": row.name,
+             "lastname": row.lastname, "email": row.email}
+            for row in rows
+        ],
+        headers={"Cache-Control": f"private, max-age={SEARCH_CACHE_TTL}"}
+    )
+
+
 @router.post('/edit')
 async def profile_edit(
     current_user: User = Depends(get_current_user_dep),
@@ -70,6 +113,8 @@ async def profile_edit(
             '/users/profile',
             status_code=status.HTTP_303_SEE_OTHER
         )
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -85,7 +130,7 @@ async def profile_delete(
     session: AsyncSession = Depends(get_db)
 ):
     try:
-        if not user_repo.is_auth(session, current_user.email, password):
+        if not await user_repo.is_auth(session, current_user.email, password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail='Неверный пароль'
@@ -103,6 +148,8 @@ async def profile_delete(
         response.delete_cookie("access_token")
         return response
 
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -7,7 +7,9 @@ from httpx import ASGITransport, AsyncClient
 from main import app
 from database.models import User
 from dependencies import get_user_repo
-from applications.user.router import get_current_user_dep
+from applications.user.router import (
+    get_current_user_dep, get_current_user_dep_admin, user_search_cache
+)
 
 
 @pytest.fixture
@@ -109,3 +111,34 @@ async def test_profile_delete(
     assert response.status_code == 303
     assert response.headers["location"] == "/auth/login"
     assert "access_token" not in response.cookies
+
+
+@pytest.mark.asyncio
+async def test_search_users(test_user):
+    calls = []
+
+    class FakeUserRepo:
+        async def search(self, session, prefix, limit):
+            calls.append((prefix, limit))
+            return [User(id=3, name="Ann", lastname="Lee",
+                         email="ann@example.com")]
+
+    async def override_admin():
+        return test_user
+
+    user_search_cache.clear()
+    app.dependency_overrides[get_current_user_dep_admin] = override_admin
+    app.dependency_overrides[get_user_repo] = FakeUserRepo
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        first = await client.get("/users/search", params={"q": "An"})
+        second = await client.get("/users/search", params={"q": "An"})
+
+    assert first.status_code == 200
+    assert first.json() == second.json() == [{
+        "id": 3, "name": "Ann", "lastname": "Lee", "email": "ann@example.com"
+    }]
+    assert calls == [("An", 10)]
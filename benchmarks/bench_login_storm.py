@@ -0,0 +1,74 @@
+"""Задержка посторонних запросов во время всплеска логинов.
+
+Сравнивает проверку пароля прямо в event loop и через PasswordHasher.
+Логины приходят каждые LOGIN_INTERVAL секунд. Посторонний запрос
+моделируется корутиной, которая просыпается каждые PROBE_INTERVAL секунд;
+его задержка — насколько позже запланированного она проснулась.
+
+Запуск: python -m benchmarks.bench_login_storm [число логинов]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from database.password_hasher import PasswordHasher
+
+
+LOGIN_INTERVAL = 0.005
+PROBE_INTERVAL = 0.002
+
+
+async def probe(latencies: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        latencies.append(time.perf_counter() - expected)
+
+
+async def login(verify, delay: float):
+    await asyncio.sleep(delay)
+    return await verify()
+
+
+async def storm(verify, logins: int) -> list:
+    latencies = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(latencies, stop))
+    await asyncio.gather(*(
+        login(verify, i * LOGIN_INTERVAL) for i in range(logins)
+    ))
+    stop.set()
+    await prober
+    return latencies
+
+
+def p99(latencies: list) -> float:
+    return statistics.quantiles(latencies, n=100)[98]
+
+
+async def main(logins: int):
+    password_hash = generate_password_hash("password")
+
+    async def inline():
+        return check_password_hash(password_hash, "password")
+
+    hasher = PasswordHasher(max_pending=logins)
+
+    async def pooled():
+        return await hasher.verify(password_hash, "password")
+
+    for name, verify in (("inline", inline), ("pool", pooled)):
+        started = time.perf_counter()
+        latencies = await storm(verify, logins)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>6}: {logins} logins in {elapsed:.2f} s, "
+              f"p99 unrelated latency {p99(latencies) * 1000:.2f} ms "
+              f"({len(latencies)} probes)")
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,123 @@
+"""Поиск общего свободного времени для большой группы за месяц.
+
+У каждого участника по MEETINGS_PER_DAY встреч в рабочий день, встречи
+общие для случайных групп по GROUP_SIZE человек. Меряется полный
+find_common_slots: выборка занятости одним запросом и слияние.
+
+Запуск: python -m benchmarks.bench_scheduling [число участников]
+"""
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from applications.meeting.scheduling import (busy_intervals,
+                                             find_common_slots,
+                                             free_slots, merge_intervals)
+from database.database import Base
+from database.models import Meeting, MeetingParticipant, User
+from database.repositories import MeetingRepository
+
+
+ROUNDS = 5
+DAYS = 31
+MEETINGS_PER_DAY = 4
+GROUP_SIZE = 5
+START = datetime.datetime(2026, 3, 1)
+
+
+async def seed(session_maker, users: int):
+    rng = random.Random(42)
+    meetings, participants = [], []
+    for day in range(DAYS):
+        date = START + datetime.timedelta(days=day)
+        if date.weekday() >= 5:
+            continue
+        for _ in range(users * MEETINGS_PER_DAY // GROUP_SIZE):
+            meeting_id = len(meetings) + 1
+            meetings.append({
+                "id": meeting_id, "description": "Bench", "creator_id": 1,
+                "date": date + datetime.timedelta(
+                    minutes=rng.randrange(8 * 60, 18 * 60, 15)
+                ),
+                "duration": rng.choice((30, 60, 90)),
+            })
+            participants.extend(
+                {"meeting_id": meeting_id, "user_id": user_id}
+                for user_id in rng.sample(range(1, users + 1), GROUP_SIZE)
+            )
+    async with session_maker() as session:
+        await session.execute(insert(User), [
+            {"id": i, "name": f"User{i}", "lastname": "Bench", "role": "user",
+             "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(1, users + 1)
+        ])
+        await session.execute(insert(Meeting), meetings)
+        await session.execute(insert(MeetingParticipant), participants)
+        await session.commit()
+    return len(meetings), len(participants)
+
+
+async def measure(run) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        await run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main(users: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        meetings, participants = await seed(session_maker, users)
+
+        meeting_repo = MeetingRepository()
+        user_ids = list(range(1, users + 1))
+        end = START + datetime.timedelta(days=DAYS)
+        duration = datetime.timedelta(minutes=30)
+
+        async with session_maker() as session:
+            rows = await meeting_repo.get_busy_meetings(
+                session, user_ids, START, end
+            )
+
+            async def fetch():
+                await meeting_repo.get_busy_meetings(
+                    session, user_ids, START, end
+                )
+
+            async def sweep():
+                free_slots(merge_intervals(busy_intervals(rows)),
+                           START, end, duration)
+
+            async def full():
+                await find_common_slots(
+                    session, meeting_repo, user_ids, START, end, duration
+                )
+
+            fetch_time = await measure(fetch)
+            sweep_time = await measure(sweep)
+            full_time = await measure(full)
+        await engine.dispose()
+
+    print(f"participants: {users}, meetings: {meetings}, "
+          f"busy rows: {len(rows)} ({participants} participations)")
+    print(f"busy query:     {fetch_time * 1000:8.2f} ms")
+    print(f"merge + sweep:  {sweep_time * 1000:8.2f} ms")
+    print(f"total:          {full_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
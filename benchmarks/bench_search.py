@@ -0,0 +1,152 @@
+"""Полнотекстовый поиск по чату задач: FTS5 с токенами видимости.
+
+MESSAGES сообщений по 10 слов (частоты по Ципфу) в TASKS задачах у USERS
+пользователей. Сравниваются SearchRepository.search (фильтр видимости
+внутри MATCH) и обычный FTS5-индекс, где видимость проверяется join-ом
+с задачами после поиска.
+
+Запуск: python -m benchmarks.bench_search [число сообщений]
+"""
+import asyncio
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.database import Base
+from database.fts import match_terms
+from database.repositories import SearchRepository
+
+
+ROUNDS = 10
+USERS = 2000
+TASKS = 200_000
+VOCABULARY = 20_000
+WORDS = 10
+BATCH = 50_000
+USER_ID = 7
+
+# Слова из случайных слогов
+SYLLABLES = [c + v for c in "бвгдзклмнпрстх" for v in "аеиоуы"]
+
+PLAIN_FTS = [
+    "CREATE VIRTUAL TABLE chat_plain_fts USING fts5("
+    "text, content = 'task_chat', content_rowid = 'id')",
+    "INSERT INTO chat_plain_fts(chat_plain_fts) VALUES ('rebuild')",
+]
+
+PLAIN_SEARCH = (
+    "SELECT f.rowid, bm25(chat_plain_fts) AS rank FROM chat_plain_fts f "
+    "JOIN task_chat c ON c.id = f.rowid JOIN tasks t ON t.id = c.task_id "
+    "WHERE chat_plain_fts MATCH ? AND (t.creator = ? OR t.performer = ?) "
+    "ORDER BY rank LIMIT 20"
+)
+
+
+def make_vocabulary() -> list:
+    rng = random.Random(1)
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def queries(vocabulary: list) -> list:
+    # По рангу Ципфа: первое слово есть в 63% сообщений (уровень
+    # служебных слов, см. STOP_WORDS), шестое — в 15%, дальше среднее,
+    # редкое и пара частых
+    return [vocabulary[0], vocabulary[5], vocabulary[99], vocabulary[4999],
+            f"{vocabulary[5]} {vocabulary[20]}"]
+
+
+def messages(count: int, vocabulary: list):
+    rng = random.Random(42)
+    weights = list(itertools.accumulate(
+        1 / (rank + 1) for rank in range(VOCABULARY)
+    ))
+    for message_id in range(1, count + 1):
+        yield (message_id, rng.randrange(1, TASKS + 1),
+               rng.randrange(1, USERS + 1),
+               " ".join(rng.choices(vocabulary, cum_weights=weights,
+                                    k=WORDS)))
+
+
+async def insert(conn, statement: str, rows):
+    for batch in iter(lambda: list(itertools.islice(rows, BATCH)), []):
+        await conn.exec_driver_sql(statement, batch)
+
+
+async def seed(engine, count: int):
+    rng = random.Random(7)
+    async with engine.begin() as conn:
+        await insert(conn, "INSERT INTO users (id, email, password_hash) "
+                           "VALUES (?, ?, 'x')",
+                     ((i, f"user{i}@example.com")
+                      for i in range(1, USERS + 1)))
+        await insert(conn, "INSERT INTO tasks (id, creator, performer, "
+                           "description, status) VALUES (?, ?, ?, ?, 'open')",
+                     ((i, rng.randrange(1, USERS + 1),
+                       rng.randrange(1, USERS + 1), f"Задача {i}")
+                      for i in range(1, TASKS + 1)))
+        await insert(conn, "INSERT INTO task_chat (id, task_id, user_id, "
+                           "text) VALUES (?, ?, ?, ?)",
+                     messages(count, make_vocabulary()))
+        for statement in PLAIN_FTS:
+            await conn.exec_driver_sql(statement)
+        await conn.exec_driver_sql("ANALYZE")
+
+
+async def measure(run) -> tuple:
+    best, found = float("inf"), 0
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        found = await run()
+        best = min(best, time.perf_counter() - started)
+    return best, found
+
+
+async def main(count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        started = time.perf_counter()
+        await seed(engine, count)
+        seeded = time.perf_counter() - started
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        results = {}
+        async with session_maker() as session, engine.connect() as conn:
+            for query in queries(make_vocabulary()):
+                async def search():
+                    page = await SearchRepository().search(
+                        session, USER_ID, query
+                    )
+                    return len(page.items)
+
+                async def plain():
+                    result = await conn.exec_driver_sql(
+                        PLAIN_SEARCH, (match_terms(query), USER_ID, USER_ID)
+                    )
+                    return len(result.all())
+
+                results[f"{query!r}, acl tokens"] = await measure(search)
+                results[f"{query!r}, join"] = await measure(plain)
+        await engine.dispose()
+
+    print(f"messages: {count}, tasks: {TASKS}, users: {USERS}, "
+          f"seeded in {seeded:.1f} s (triggers included)")
+    for name, (best, found) in results.items():
+        print(f"{name:<32} {best * 1000:9.3f} ms  ({found} rows)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000))
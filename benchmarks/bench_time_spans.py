@@ -0,0 +1,152 @@
+"""Поиск пересечений с интервалом: R*Tree против B-tree индекса.
+
+Задачи с отрезками created_at → deadline (от часа до месяца) за три года
+у USERS исполнителей. Сравниваются запросы "всё, что пересекается
+с неделей" для одного пользователя и для всех сразу.
+
+Запуск: python -m benchmarks.bench_time_spans [число задач]
+"""
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.database import Base
+from database.models import Task
+from database.repositories import CalendarRepository
+from database.spans import ceil_minutes, floor_minutes, task_spans
+
+
+ROUNDS = 20
+USERS = 1000
+BATCH = 50000
+START = datetime.datetime(2024, 1, 1)
+YEARS = 3
+
+
+def rows(tasks: int):
+    rng = random.Random(42)
+    span = YEARS * 365 * 24 * 60
+    for task_id in range(1, tasks + 1):
+        created = START + datetime.timedelta(minutes=rng.randrange(span))
+        deadline = created + datetime.timedelta(
+            minutes=rng.randrange(60, 30 * 24 * 60)
+        )
+        yield (task_id, rng.randrange(1, USERS + 1), "Bench",
+               created.isoformat(" "), deadline.isoformat(" "), "open")
+
+
+async def seed(engine, tasks: int):
+    batch = []
+    async with engine.begin() as conn:
+        for row in rows(tasks):
+            batch.append(row)
+            if len(batch) == BATCH:
+                await conn.exec_driver_sql(
+                    "INSERT INTO tasks (id, performer, description, "
+                    "created_at, deadline, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", batch
+                )
+                batch = []
+        if batch:
+            await conn.exec_driver_sql(
+                "INSERT INTO tasks (id, performer, description, "
+                "created_at, deadline, status) VALUES (?, ?, ?, ?, ?, ?)",
+                batch
+            )
+        await conn.exec_driver_sql("ANALYZE")
+
+
+async def measure(session_maker, run) -> tuple:
+    best, found = float("inf"), 0
+    async with session_maker() as session:
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            found = await run(session)
+            best = min(best, time.perf_counter() - started)
+    return best, found
+
+
+def btree_overlap(start, end, user_id=None):
+    stmt = select(Task.id).where(Task.deadline >= start,
+                                 Task.created_at <= end)
+    if user_id is not None:
+        stmt = stmt.where(Task.performer == user_id)
+    return stmt
+
+
+def rtree_overlap(start, end, user_id=None):
+    stmt = (
+        select(Task.id)
+        .join(task_spans, task_spans.c.id == Task.id)
+        .where(task_spans.c.start_at <= ceil_minutes(end),
+               task_spans.c.end_at >= floor_minutes(start),
+               Task.deadline >= start, Task.created_at <= end)
+    )
+    if user_id is not None:
+        stmt = stmt.where(and_(task_spans.c.user_lo <= user_id,
+                               task_spans.c.user_hi >= user_id))
+    return stmt
+
+
+async def main(tasks: int):
+    start = START + datetime.timedelta(days=500)
+    end = start + datetime.timedelta(days=7)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        started = time.perf_counter()
+        await seed(engine, tasks)
+        seeded = time.perf_counter() - started
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def count(stmt):
+            async def run(session):
+                return await session.scalar(
+                    select(func.count()).select_from(stmt.subquery())
+                )
+            return run
+
+        results = {
+            "user, B-tree": await measure(
+                session_maker, await count(btree_overlap(start, end, 7))
+            ),
+            "user, R*Tree": await measure(
+                session_maker, await count(rtree_overlap(start, end, 7))
+            ),
+            "user, get_overlapping": await measure(
+                session_maker,
+                lambda session: _count_spans(session, start, end)
+            ),
+            "all, B-tree": await measure(
+                session_maker, await count(btree_overlap(start, end))
+            ),
+            "all, R*Tree": await measure(
+                session_maker, await count(rtree_overlap(start, end))
+            ),
+        }
+        await engine.dispose()
+
+    print(f"tasks: {tasks}, performers: {USERS}, "
+          f"seeded in {seeded:.1f} s (triggers included)")
+    for name, (best, found) in results.items():
+        print(f"{name:<24} {best * 1000:9.3f} ms  ({found} rows)")
+
+
+async def _count_spans(session, start, end):
+    return len(await CalendarRepository().get_overlapping(
+        session, 7, start, end
+    ))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,70 @@
+"""Стоимость строки для списков выбора пользователей: ORM против проекции.
+
+Запуск: python -m benchmarks.bench_user_pickers [число пользователей]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.database import Base
+from database.models import User
+from database.repositories import UserRepository
+
+
+ROUNDS = 5
+
+
+async def seed(session_maker, users: int):
+    async with session_maker() as session:
+        await session.execute(insert(User), [
+            {"name": f"User{i}", "lastname": "Bench", "role": "user",
+             "email": f"user{i}@example.com", "password_hash": "x" * 100}
+            for i in range(users)
+        ])
+        await session.commit()
+
+
+async def measure(session_maker, load) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        async with session_maker() as session:
+            started = time.perf_counter()
+            rows = await load(session)
+            best = min(best, time.perf_counter() - started)
+    return best / len(rows)
+
+
+async def main(users: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        await seed(session_maker, users)
+
+        user_repo = UserRepository()
+        orm = await measure(session_maker, user_repo.get_all)
+        # Колонки поля выбора пользователя, как в поиске и форме встречи
+        projection = await measure(
+            session_maker,
+            lambda session: user_repo.project(
+                session, *UserRepository.CHOICE_COLUMNS
+            )
+        )
+        await engine.dispose()
+
+    print(f"users: {users}")
+    print(f"get_all (ORM):        {orm * 1e6:8.2f} us/row")
+    print(f"project (Row):        {projection * 1e6:8.2f} us/row")
+    print(f"speedup:              {orm / projection:8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
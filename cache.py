@@ -0,0 +1,68 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Процессный LRU-кэш с ограниченным размером и временем жизни записей."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0,
+                 timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        # Поколение ключа растёт при каждом сбросе: значение, прочитанное
+        # из базы до сброса, уже не кладётся в кэш
+        self._epoch = 0
+        self._generations: "dict[Hashable, int]" = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, value = entry
+            if expires_at > self.timer():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def generation(self, key: Hashable) -> tuple[int, int]:
+        # Снимается до чтения из базы и передаётся в set
+        return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: Any,
+            generation: Optional[tuple[int, int]] = None):
+        if generation is not None and generation != self.generation(key):
+            return
+        self._data[key] = (self.timer() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        self._data.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+
+# Текущий пользователь по id: get_current_user, сбрасывается при изменениях
+user_cache = TTLCache(maxsize=10000, ttl=60.0)
+
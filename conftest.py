@@ -1,9 +1,27 @@
 import pytest
+from contextlib import contextmanager
 
 from database.database import async_session_maker
+from database.instrumentation import collect_queries
 
 
 @pytest.fixture
 async def async_session():
     async with async_session_maker() as session:
         yield session
+
+
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def _budget(max_queries: int, allow_repeated: bool = False):
+        with collect_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"{stats.count} SQL queries, budget is {max_queries}"
+        )
+        if not allow_repeated:
+            assert not stats.repeated(), (
+                f"Possible N+1: {stats.repeated()}"
+            )
+    return _budget
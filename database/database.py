@@ -1,29 +1,126 @@
-from sqlalchemy.orm import declarative_base
+from starlette.requests import HTTPConnection
+from sqlalchemy import event
+from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
+    AsyncEngine,
     AsyncSession
 )
 from typing import AsyncGenerator
 
+from .instrumentation import instrument_engine
+from .write_queue import WriteQueue
+
 
 DATABASE_URL = 'sqlite+aiosqlite:///db.sqlite3'
 
+# Прагмы, которые выставляются на каждом новом соединении
+SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 268435456,
+    "cache_size": -64000,
+    "temp_store": "MEMORY",
+}
+
+# Пул читателей: в WAL они не блокируют писателя и друг друга
+READ_POOL_SIZE = 30
+READ_MAX_OVERFLOW = 20
+
+# Методы, для которых get_db отдаёт сессию только для чтения
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
 Base = declarative_base()
 
-engine = create_async_engine(
+
+def apply_sqlite_pragmas(engine: AsyncEngine, read_only: bool = False):
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return engine
+
+
+def use_explicit_transactions(engine: AsyncEngine):
+    # pysqlite сам решает, когда слать BEGIN, и ломает SAVEPOINT-ы
+    # группового коммита: берём управление транзакцией на себя
+    @event.listens_for(engine.sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+# Единственное соединение-писатель: SQLite всё равно сериализует запись
+engine = use_explicit_transactions(apply_sqlite_pragmas(create_async_engine(
     DATABASE_URL,
-    pool_size=30,
-    max_overflow=20,
+    pool_size=1,
+    max_overflow=0,
     pool_recycle=3600
-)
+)))
+
+read_engine = apply_sqlite_pragmas(create_async_engine(
+    DATABASE_URL,
+    pool_size=READ_POOL_SIZE,
+    max_overflow=READ_MAX_OVERFLOW,
+    pool_recycle=3600
+), read_only=True)
+
+instrument_engine(engine)
+instrument_engine(read_engine)
 
 async_session_maker = async_sessionmaker(
     bind=engine,
     expire_on_commit=False
 )
 
+read_session_maker = async_sessionmaker(
+    bind=read_engine,
+    expire_on_commit=False
+)
+
+
+
+class RoutingSession(Session):
+    # Сессия админки: выборки идут в пул читателей, а flush и явные
+    # INSERT/UPDATE/DELETE — в писатель. Соединение-писатель (с его
+    # BEGIN IMMEDIATE) берётся только на flush и коммит
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or getattr(clause, "is_dml", False):
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+
+admin_session_maker = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    expire_on_commit=False
+)
+
+write_queue = WriteQueue(async_session_maker)
+
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
+async def get_db(
+    request: HTTPConnection
+) -> AsyncGenerator[AsyncSession, None]:
+    # Пока работает очередь записи, соединение-писатель принадлежит ей.
+    # У WebSocket метода нет: такие обработчики только читают
+    method = request.scope.get("method", "GET")
+    if method in READ_ONLY_METHODS or write_queue.is_running:
+        session_maker = read_session_maker
+    else:
+        session_maker = async_session_maker
+    async with session_maker() as session:
         yield session
+
@@ -0,0 +1,195 @@
+import re
+from typing import Optional
+
+from sqlalchemy import column, table
+
+
+# Полнотекстовый индекс FTS5 (external content: текст хранится только в
+# исходных таблицах). У задач и сообщений чата рядом с текстом лежит
+# колонка acl с токенами "u<creator> u<performer>": фильтр видимости
+# выполняется внутри MATCH, и частое слово не тянет за собой сотни тысяч
+# чужих совпадений, которые пришлось бы отбрасывать join-ом
+tasks_fts = table("tasks_fts", column("rowid"), column("description"),
+                  column("acl"))
+task_chat_fts = table("task_chat_fts", column("rowid"), column("text"),
+                      column("acl"))
+meeting_fts = table("meeting_fts", column("rowid"), column("description"))
+teams_fts = table("teams_fts", column("rowid"), column("name"))
+
+_TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2'"
+
+_ACL = (
+    "'u' || coalesce({t}.creator, 0) || ' u' || coalesce({t}.performer, 0)"
+)
+
+
+def acl_token(user_id: int) -> str:
+    return f"u{user_id}"
+
+
+def _chat_rows(command: str, task: str, chat: str) -> str:
+    # command — 'delete' для удаления из индекса, иначе вставка
+    if command == "delete":
+        target = ("task_chat_fts(task_chat_fts, rowid, text, acl) "
+                  "SELECT 'delete', ")
+    else:
+        target = "task_chat_fts(rowid, text, acl) SELECT "
+    return (
+        f"INSERT INTO {target}{chat}.id, {chat}.text, {_ACL.format(t=task)}"
+    )
+
+
+def _plain_fts_triggers(source: str, fts: str, text: str) -> list:
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {source}_fts_insert "
+        f"AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {text}) VALUES (new.id, new.{text}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {source}_fts_update "
+        f"AFTER UPDATE OF {text} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {text}) "
+        f"VALUES ('delete', old.id, old.{text}); "
+        f"INSERT INTO {fts}(rowid, {text}) VALUES (new.id, new.{text}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {source}_fts_delete "
+        f"AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {text}) "
+        f"VALUES ('delete', old.id, old.{text}); END",
+    ]
+
+
+SEARCH_INDEX_DDL = [
+    "CREATE VIEW IF NOT EXISTS tasks_search AS "
+    f"SELECT t.id, t.description, {_ACL.format(t='t')} AS acl FROM tasks t",
+    # Сообщения без задачи (задача удалена) в индекс не попадают
+    "CREATE VIEW IF NOT EXISTS task_chat_search AS "
+    f"SELECT c.id, c.text, {_ACL.format(t='t')} AS acl "
+    "FROM task_chat c JOIN tasks t ON t.id = c.task_id",
+
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "description, acl, content = 'tasks_search', content_rowid = 'id', "
+    f"{_TOKENIZE})",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_chat_fts USING fts5("
+    "text, acl, content = 'task_chat_search', content_rowid = 'id', "
+    f"{_TOKENIZE})",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS meeting_fts USING fts5("
+    f"description, content = 'meeting', content_rowid = 'id', {_TOKENIZE})",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS teams_fts USING fts5("
+    f"name, content = 'teams', content_rowid = 'id', {_TOKENIZE})",
+
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert "
+    "AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, description, acl) "
+    f"VALUES (new.id, new.description, {_ACL.format(t='new')}); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update "
+    "AFTER UPDATE OF description, creator, performer ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, description, acl) "
+    f"VALUES ('delete', old.id, old.description, {_ACL.format(t='old')}); "
+    "INSERT INTO tasks_fts(rowid, description, acl) "
+    f"VALUES (new.id, new.description, {_ACL.format(t='new')}); END",
+    # Смена создателя или исполнителя меняет видимость всего чата задачи
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_chat_acl "
+    "AFTER UPDATE OF creator, performer ON tasks "
+    "WHEN old.creator IS NOT new.creator "
+    "OR old.performer IS NOT new.performer BEGIN "
+    f"{_chat_rows('delete', 'old', 'c')} "
+    "FROM task_chat c WHERE c.task_id = old.id; "
+    f"{_chat_rows('insert', 'new', 'c')} "
+    "FROM task_chat c WHERE c.task_id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete "
+    "AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, description, acl) "
+    f"VALUES ('delete', old.id, old.description, {_ACL.format(t='old')}); "
+    f"{_chat_rows('delete', 'old', 'c')} "
+    "FROM task_chat c WHERE c.task_id = old.id; END",
+
+    "CREATE TRIGGER IF NOT EXISTS task_chat_fts_insert "
+    "AFTER INSERT ON task_chat BEGIN "
+    f"{_chat_rows('insert', 't', 'new')} "
+    "FROM tasks t WHERE t.id = new.task_id; END",
+    "CREATE TRIGGER IF NOT EXISTS task_chat_fts_update "
+    "AFTER UPDATE OF text, task_id ON task_chat BEGIN "
+    f"{_chat_rows('delete', 't', 'old')} "
+    "FROM tasks t WHERE t.id = old.task_id; "
+    f"{_chat_rows('insert', 't', 'new')} "
+    "FROM tasks t WHERE t.id = new.task_id; END",
+    "CREATE TRIGGER IF NOT EXISTS task_chat_fts_delete "
+    "AFTER DELETE ON task_chat BEGIN "
+    f"{_chat_rows('delete', 't', 'old')} "
+    "FROM tasks t WHERE t.id = old.task_id; END",
+
+    *_plain_fts_triggers("meeting", "meeting_fts", "description"),
+    *_plain_fts_triggers("teams", "teams_fts", "name"),
+]
+
+# Заполнение по уже существующим данным (миграция)
+SEARCH_INDEX_BACKFILL = [
+    f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+    for fts in ("tasks_fts", "task_chat_fts", "meeting_fts", "teams_fts")
+]
+
+SEARCH_INDEX_DROP = [
+    *(
+        f"DROP TRIGGER IF EXISTS {source}_fts_{action}"
+        for source in ("teams", "meeting", "task_chat")
+        for action in ("delete", "update", "insert")
+    ),
+    "DROP TRIGGER IF EXISTS tasks_fts_delete",
+    "DROP TRIGGER IF EXISTS tasks_fts_chat_acl",
+    "DROP TRIGGER IF EXISTS tasks_fts_update",
+    "DROP TRIGGER IF EXISTS tasks_fts_insert",
+    "DROP TABLE IF EXISTS teams_fts",
+    "DROP TABLE IF EXISTS meeting_fts",
+    "DROP TABLE IF EXISTS task_chat_fts",
+    "DROP TABLE IF EXISTS tasks_fts",
+    "DROP VIEW IF EXISTS task_chat_search",
+    "DROP VIEW IF EXISTS tasks_search",
+]
+
+
+def create_search_index(target, connection, **kw):
+    # Как и create_span_index: FTS-таблицы, представления и триггеры вне
+    # ORM создаются вместе со схемой
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in SEARCH_INDEX_DDL:
+        connection.exec_driver_sql(statement)
+
+
+# Маркеры совпадений в snippet(): управляющие символы не встречаются в
+# тексте, поэтому шаблон может сначала экранировать фрагмент, а потом
+# заменить их на <mark>
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 16
+
+# Ограничение длины запроса: каждое слово — отдельный проход по индексу
+MAX_QUERY_TERMS = 8
+
+_WORD = re.compile(r"\w+")
+
+# Служебные слова встречаются почти в каждом сообщении: bm25 считает IDF
+# по всему списку документов слова, и такой запрос стоит десятки
+# миллисекунд, ничего не добавляя к результату
+STOP_WORDS = frozenset((
+    "а", "без", "бы", "в", "во", "вот", "все", "да", "для", "до", "его",
+    "ее", "если", "же", "за", "и", "из", "или", "им", "их", "к", "как",
+    "ко", "ли", "мы", "на", "над", "не", "нет", "ни", "но", "о", "об",
+    "от", "по", "под", "при", "про", "с", "со", "так", "там", "то", "ты",
+    "у", "уже", "что", "это", "я",
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "that", "the", "to", "with",
+))
+
+
+def match_terms(query: str) -> Optional[str]:
+    # Слова пользователя берутся в кавычки, чтобы синтаксис FTS5 (NEAR,
+    # OR, двоеточие, звёздочка) не интерпретировался. Префиксный поиск
+    # не используется: список документов префикса FTS5 собирает целиком,
+    # без пропусков по acl, и частый префикс стоит сотни миллисекунд
+    words = _WORD.findall(query.lower())
+    # Запрос из одних служебных слов всё же выполняется как есть
+    words = [word for word in words if word not in STOP_WORDS] or words
+    words = words[:MAX_QUERY_TERMS]
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words)
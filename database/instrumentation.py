@@ -0,0 +1,94 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+# Сколько одинаковых (с точностью до параметров) запросов считается N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def normalize_statement(statement: str) -> str:
+    statement = _IN_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.statements[normalize_statement(statement)] += 1
+        if self.parent:
+            self.parent.record(statement, duration)
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+# Запросы на одном соединении не вкладываются: хватает одной отметки,
+# которую снимает и успешное выполнение, и ошибка
+START_TIME_KEY = "query_start_time"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters,
+                           context, executemany):
+    conn.info[START_TIME_KEY] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters,
+                          context, executemany):
+    started = conn.info.pop(START_TIME_KEY, None)
+    stats = _current_stats.get()
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # Упавший запрос не доходит до after_cursor_execute: без этого его
+    # отметка досталась бы следующему
+    if exception_context.connection is not None:
+        exception_context.connection.info.pop(START_TIME_KEY, None)
+
+
+def instrument_engine(engine: AsyncEngine):
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute",
+                          _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute",
+                     _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute",
+                     _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+    return engine
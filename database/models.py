@@ -1,13 +1,18 @@
+import datetime
 from enum import Enum
+from typing import Optional
 from .database import Base
 from sqlalchemy import (Column, String, Integer, ForeignKey, Text, DateTime,
-                        )
-from sqlalchemy.orm import relationship
+                        Index, event, literal_column)
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy_utils import ChoiceType
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from .fts import create_search_index
+from .spans import create_span_index
+
 
 class UserRoleEnum(str, Enum):
     user = "user"
@@ -17,9 +22,32 @@ class UserRoleEnum(str, Enum):
 ROLE_CHOICES = [(role.value, role.name) for role in UserRoleEnum]
 
 
-class User(Base):
+class Versioned:
+    # Валидаторы HTTP-кэша (ETag / Last-Modified). onupdate срабатывает на
+    # любом UPDATE — и при flush ORM, и в update() репозиториев, а
+    # eager_defaults забирает новые значения через RETURNING, не оставляя
+    # просроченных атрибутов
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    version = Column(
+        Integer, nullable=False, default=1, server_default="1",
+        onupdate=literal_column("version") + 1
+    )
+
+    __mapper_args__ = {"eager_defaults": True}
+
+
+def search_folded(value: Optional[str]) -> Optional[str]:
+    # Ключ поиска по префиксу: casefold сворачивает и кириллицу, а NOCASE
+    # и LIKE в SQLite — только ASCII
+    return value.casefold() if value is not None else None
+
+
+class User(Versioned, Base):
     __tablename__ = 'users'
 
+    # Колонки с ключами поиска для имени и фамилии
+    SEARCH_COLUMNS = {'name': 'name_search', 'lastname': 'lastname_search'}
+
     ROLE_CHOICES = [
         ('user', 'Пользователь'),
         ('admin', 'Админ')
@@ -30,6 +58,10 @@ class User(Base):
     lastname = Column(String(30))
     email = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(128), nullable=False)
+    # search_folded(name) и search_folded(lastname): ставит ORM (validates)
+    # и UserRepository.update
+    name_search = Column(String(20))
+    lastname_search = Column(String(30))
     role = Column(
         ChoiceType(ROLE_CHOICES, impl=String(8)),
         default=UserRoleEnum.user.value
@@ -46,6 +78,20 @@ class User(Base):
         viewonly=True
     )
 
+    # LIKE 'abc%' идёт по индексу, только если индекс в NOCASE. Сама
+    # NOCASE сворачивает лишь ASCII: имя и фамилия ищутся по колонкам с
+    # casefold, email — как есть
+    __table_args__ = (
+        Index('ix_users_name_search', name_search.collate('NOCASE')),
+        Index('ix_users_lastname_search', lastname_search.collate('NOCASE')),
+        Index('ix_users_email_nocase', email.collate('NOCASE')),
+    )
+
+    @validates('name', 'lastname')
+    def _fold_search(self, key, value):
+        setattr(self, self.SEARCH_COLUMNS[key], search_folded(value))
+        return value
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
@@ -57,8 +103,15 @@ class User(Base):
         return dict(self.ROLE_CHOICES).get(self.role.code, 'Неизвестно')
 
 
-class Task(Base):
+class Task(Versioned, Base):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # creator OR performer: SQLite объединяет два поиска по индексам
+        Index('ix_tasks_creator', 'creator'),
+        # Календарь: performer + диапазон deadline + status
+        Index('ix_tasks_performer_deadline', 'performer', 'deadline',
+              'status'),
+    )
 
     STATUS_CHOICES = [
         ('open', 'Открыто'),
@@ -94,8 +147,11 @@ class Task(Base):
     )
 
 
-class TaskChat(Base):
+class TaskChat(Versioned, Base):
     __tablename__ = 'task_chat'
+    __table_args__ = (
+        Index('ix_task_chat_task_id_created_at', 'task_id', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -115,6 +171,10 @@ class TaskChat(Base):
 
 class UserTeam(Base):
     __tablename__ = 'user_teams'
+    __table_args__ = (
+        Index('ix_user_teams_team_id', 'team_id'),
+        Index('ix_user_teams_user_id', 'user_id'),
+    )
 
     ROLE_CHOICES = [
         ('staff', 'Сотрудник'),
@@ -129,7 +189,7 @@ class UserTeam(Base):
     user = relationship('User', backref='team_links')
 
 
-class Team(Base):
+class Team(Versioned, Base):
     __tablename__ = 'teams'
 
     id = Column(Integer, primary_key=True)
@@ -139,6 +199,10 @@ class Team(Base):
 
 class MeetingParticipant(Base):
     __tablename__ = 'meeting_participants'
+    __table_args__ = (
+        # Первичный ключ начинается с meeting_id, поиск по участнику — здесь
+        Index('ix_meeting_participants_user_id', 'user_id', 'meeting_id'),
+    )
 
     meeting_id = Column(Integer, ForeignKey('meeting.id'), primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
@@ -147,12 +211,24 @@ class MeetingParticipant(Base):
     meeting = relationship('Meeting', back_populates='participants')
 
 
-class Meeting(Base):
+class Meeting(Versioned, Base):
     __tablename__ = 'meeting'
+    __table_args__ = (
+        Index('ix_meeting_date', 'date'),
+    )
+
+    # Длительность в минутах; поиск занятости опирается на верхнюю границу
+    DEFAULT_DURATION = 60
+    MIN_DURATION = 5
+    MAX_DURATION = 24 * 60
 
     id = Column(Integer, primary_key=True)
     description = Column(Text)
     date = Column(DateTime)
+    duration = Column(
+        Integer, nullable=False, default=DEFAULT_DURATION,
+        server_default=str(DEFAULT_DURATION)
+    )
     creator_id = Column(Integer, ForeignKey('users.id'))
 
     participants = relationship(
@@ -161,3 +237,14 @@ class Meeting(Base):
     )
 
     creator = relationship("User", foreign_keys=[creator_id])
+
+    @property
+    def end(self):
+        return self.date + datetime.timedelta(minutes=self.duration)
+
+
+# R*Tree временных отрезков — виртуальные таблицы вне ORM
+event.listen(Base.metadata, "after_create", create_span_index)
+
+# Полнотекстовый поиск FTS5 — тоже вне ORM
+event.listen(Base.metadata, "after_create", create_search_index)
@@ -0,0 +1,65 @@
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+
+# Побочные эффекты записи (события pubsub, сброс кэша пользователей)
+# ждут настоящего коммита. В групповом коммите единица записи — только
+# SAVEPOINT общей транзакции: эффект привязан к транзакции, в которой
+# зарегистрирован, и пропадает вместе с её откатом
+PENDING_KEY = "on_commit"
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]):
+    sync_session = session.sync_session
+    transaction = (
+        sync_session.get_nested_transaction()
+        or sync_session.get_transaction()
+        or sync_session.begin()
+    )
+    sync_session.info.setdefault(PENDING_KEY, []).append(
+        (transaction, callback)
+    )
+
+
+def _inside(transaction: SessionTransaction,
+            ancestor: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back(session: Session, previous: SessionTransaction):
+    # Откат SAVEPOINT-а отменяет и эффекты вложенных в него транзакций.
+    # Неудачный flush откатывает свою подтранзакцию, а с ней — ближайший
+    # SAVEPOINT или внешнюю транзакцию: отдельного события для них нет
+    while not previous.nested and previous.parent is not None:
+        previous = previous.parent
+    pending = session.info.get(PENDING_KEY)
+    if pending:
+        pending[:] = [
+            (transaction, callback) for transaction, callback in pending
+            if not _inside(transaction, previous)
+        ]
+
+
+@event.listens_for(Session, "after_commit")
+def _run_committed(session: Session):
+    # after_commit приходит и на RELEASE SAVEPOINT — ждём внешний коммит
+    if session.get_nested_transaction() is not None:
+        return
+    pending = session.info.pop(PENDING_KEY, None) or []
+    for _, callback in pending:
+        callback()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_closed(session: Session, transaction: SessionTransaction):
+    # Внешняя транзакция закончилась без коммита (rollback, close)
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,119 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import (Any, AsyncIterator, List, NamedTuple, Optional, Sequence,
+                    Tuple)
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+NEXT = "next"
+PREV = "prev"
+
+
+class Page(NamedTuple):
+    items: Sequence[Any]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class PageQuery(NamedTuple):
+    # Запрос страницы: limit + 1 строк по ключам keys, для PREV — в
+    # обратном порядке. after_cursor — страница не первая
+    statement: Any
+    keys: Sequence[Any]
+    limit: int
+    backwards: bool
+    after_cursor: bool
+
+    def key_of(self, item) -> List[Any]:
+        return [getattr(item, column.key) for column in self.keys]
+
+    def cursors(self, first, last, has_more: bool):
+        # (next_cursor, prev_cursor) по крайним строкам страницы
+        has_next = has_more if not self.backwards else True
+        has_prev = self.after_cursor if not self.backwards else has_more
+        return (
+            encode_cursor(NEXT, self.key_of(last)) if has_next else None,
+            encode_cursor(PREV, self.key_of(first)) if has_prev else None,
+        )
+
+
+class PageStream:
+    """Страница, строки которой читаются из базы по ходу рендера.
+
+    Итерируется один раз. Курсоры становятся известны, когда строки
+    прочитаны, поэтому шаблон обращается к ним после цикла.
+    """
+
+    def __init__(self, rows: AsyncIterator[Any], query: PageQuery):
+        self.query = query
+        self.next_cursor: Optional[str] = None
+        self.prev_cursor: Optional[str] = None
+        self._rows = rows
+
+    async def __aiter__(self):
+        limit = self.query.limit
+        if self.query.backwards:
+            # Строки приходят в обратном порядке: страницу (не больше
+            # limit строк) приходится собрать целиком
+            items = [item async for item in self._rows]
+            has_more = len(items) > limit
+            items = items[:limit][::-1]
+            if items:
+                self.next_cursor, self.prev_cursor = self.query.cursors(
+                    items[0], items[-1], has_more
+                )
+            for item in items:
+                yield item
+            return
+
+        first = last = None
+        count = 0
+        async for item in self._rows:
+            count += 1
+            if count > limit:
+                break
+            if first is None:
+                first = item
+            last = item
+            yield item
+        if first is not None:
+            self.next_cursor, self.prev_cursor = self.query.cursors(
+                first, last, count > limit
+            )
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(direction: str, values: Sequence[Any]) -> str:
+    payload = json.dumps(
+        {"d": direction, "k": [_encode_value(v) for v in values]},
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        direction = payload["d"]
+        values = [_decode_value(v) for v in payload["k"]]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Некорректный курсор")
+    if direction not in (NEXT, PREV):
+        raise ValueError("Некорректный курсор")
+    return direction, values
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+logger = logging.getLogger(__name__)
+
+# hashlib отпускает GIL на время KDF, поэтому пула потоков достаточно
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Сколько операций может ждать пул; сверх этого запрос сразу отклоняется
+HASH_MAX_PENDING = 64
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+class PasswordHasher:
+    """Хеширование и проверка паролей вне event loop.
+
+    KDF выполняется в ограниченном пуле потоков, так что всплеск логинов
+    не останавливает остальные запросы. Число одновременно ожидающих
+    операций ограничено max_pending: лишние сразу получают
+    PasswordHasherBusy, а не растят очередь и время ответа.
+    """
+
+    def __init__(self, max_workers: int = HASH_WORKERS,
+                 max_pending: int = HASH_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def queue_depth(self) -> int:
+        # Операции, которые ждут свободного потока
+        return max(0, self.pending - self.max_workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password)
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        return await self._run(check_password_hash, password_hash, password)
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(
+                "Password hasher overloaded: %d pending, request rejected",
+                self.pending
+            )
+            raise PasswordHasherBusy(
+                "Сервер перегружен, повторите попытку позже"
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="password-hasher"
+            )
+        self.pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        except BaseException:
+            # Ошибка KDF или отмена запроса — не выполненная операция
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
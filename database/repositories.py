@@ -1,20 +1,110 @@
 import datetime
-from typing import Any, Dict, Optional
+import functools
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import (and_, func, update as sqlalchemy_update,
+from sqlalchemy import (and_, exists, func, literal, literal_column, or_,
+                        tuple_, union_all,
+                        update as sqlalchemy_update,
                         delete as sqlalchemy_delete)
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 
+from cache import user_cache
+from pubsub import hub
+from .database import write_queue
 from .models import (TaskChat, User, Task, Team, UserTeam,
-                     Meeting, MeetingParticipant)
+                     Meeting, MeetingParticipant, search_folded)
+from .fts import (SNIPPET_ELLIPSIS, SNIPPET_END, SNIPPET_START,
+                  SNIPPET_TOKENS, acl_token, match_terms, meeting_fts,
+                  task_chat_fts, tasks_fts, teams_fts)
+from .password_hasher import password_hasher
+from .pagination import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT, PREV, Page,
+                         PageQuery, PageStream, decode_cursor, encode_cursor)
+from .spans import (Span, ceil_minutes, floor_minutes, meeting_spans,
+                    task_spans)
+from .on_commit import on_commit
+from .write_queue import GROUP_COMMIT_KEY
+
+
+# Сколько строк за раз забирают потоковые выборки (yield_per)
+STREAM_BATCH_SIZE = 200
+
+# Сообщений чата задачи на страницу
+CHAT_PAGE_SIZE = 30
+
+
+def write_unit(method):
+    # Пока работает очередь записи, метод уходит единицей записи писателю,
+    # а переданная сессия (читатель) не используется
+    @functools.wraps(method)
+    async def wrapper(self, session: AsyncSession, *args, **kwargs):
+        if not write_queue.is_running or session.info.get(GROUP_COMMIT_KEY):
+            return await method(self, session, *args, **kwargs)
+        return await write_queue.submit(
+            lambda writer_session: method(
+                self, writer_session, *args, **kwargs
+            )
+        )
+    return wrapper
+
+
+def task_channel(task_id: int) -> str:
+    return f"task:{task_id}"
+
+
+def publish_on_commit(session: AsyncSession, channel: str, payload: dict):
+    # Подписчики узнают об изменении только после настоящего коммита,
+    # откат (в т.ч. SAVEPOINT-а единицы записи) ничего не публикует
+    on_commit(session, lambda: hub.publish_soon(channel, payload))
+
+
+async def touch(session: AsyncSession, model, id: int):
+    # Изменение связанных строк (участники команды или встречи) меняет
+    # страницу владельца: сдвигаем его updated_at, version растёт сама
+    await session.execute(
+        sqlalchemy_update(model).where(model.id == id)
+        .values(updated_at=func.now())
+    )
+
+
+async def users_version(session: AsyncSession, link, owner_column,
+                        owner_id: int) -> tuple:
+    # Сводка по пользователям связи (участники, члены команды, авторы
+    # сообщений) для валидаторов HTTP-кэша: состав, версии и последнее
+    # изменение одной агрегатной строкой
+    result = await session.execute(
+        select(func.count(), func.sum(User.id), func.sum(User.version),
+               func.max(User.updated_at))
+        .select_from(link)
+        .join(User, User.id == link.user_id)
+        .where(owner_column == owner_id)
+    )
+    return tuple(result.one())
+
+
+def selects_entity(statement) -> bool:
+    # select(Task) — ORM-объекты (scalars), select(Task.id, ...) — строки,
+    # даже если колонка одна
+    descriptions = statement.column_descriptions
+    return (
+        len(descriptions) == 1
+        and descriptions[0]["expr"] is descriptions[0]["entity"]
+    )
 
 
 class BaseRepository:
     def __init__(self, model):
         self.model = model
 
+    async def commit(self, session: AsyncSession):
+        # В групповом коммите фиксирует писатель, здесь только flush
+        if session.info.get(GROUP_COMMIT_KEY):
+            await session.flush()
+        else:
+            await session.commit()
+
     async def get(self, session: AsyncSession, id: int):
         result = await session.get(self.model, id)
         return result
@@ -25,13 +115,15 @@ class BaseRepository:
         )
         return result.scalars().all()
 
+    @write_unit
     async def add(self, session: AsyncSession, obj_in: dict):
         obj = self.model(**obj_in)
         session.add(obj)
-        await session.commit()
+        await self.commit(session)
         await session.refresh(obj)
         return obj
 
+    @write_unit
     async def update(self, session: AsyncSession,
                      id: int, obj_in: Dict[str, Any]):
         await session.execute(
@@ -39,14 +131,15 @@ class BaseRepository:
             .where(self.model.id == id)
             .values(**obj_in)
         )
-        await session.commit()
+        await self.commit(session)
         return True
 
+    @write_unit
     async def delete(self, session: AsyncSession, id: int):
         await session.execute(
             sqlalchemy_delete(self.model).where(self.model.id == id)
         )
-        await session.commit()
+        await self.commit(session)
 
     async def filter_by(self, session: AsyncSession, **kwargs):
         result = await session.execute(
@@ -54,21 +147,246 @@ class BaseRepository:
         )
         return result.scalars().all()
 
+    async def project(self, session: AsyncSession, *columns,
+                      where=None, order_by=None):
+        # Только нужные колонки: строки Row без ORM-объектов и identity map
+        stmt = select(*columns)
+        if where is not None:
+            stmt = stmt.where(where)
+        stmt = stmt.order_by(
+            order_by if order_by is not None else self.model.id
+        )
+        result = await session.execute(stmt)
+        return result.all()
+
+    def columns(self, fields: Sequence[str], *required) -> list:
+        # Колонки модели по именам полей (sparse fieldsets в API) и те, без
+        # которых запрос не обойтись: id, ключи курсора, проверка доступа
+        columns = [getattr(self.model, name) for name in fields]
+        for column in (self.model.id, *required):
+            if column.key not in fields:
+                fields = (*fields, column.key)
+                columns.append(column)
+        return columns
+
+    async def get_fields(self, session: AsyncSession, id: int,
+                         fields: Sequence[str], *required):
+        result = await session.execute(
+            select(*self.columns(fields, *required))
+            .where(self.model.id == id)
+        )
+        return result.first()
+
+    def page_query(self, cursor: Optional[str] = None,
+                   limit: int = DEFAULT_PAGE_SIZE,
+                   stmt=None, order_by=None,
+                   fields: Optional[Sequence[str]] = None) -> PageQuery:
+        # Keyset-пагинация по (order_by, id): стоимость страницы не зависит
+        # от её номера, порядок стабилен при вставках. Некорректный курсор
+        # отвергается здесь, до выполнения запроса
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        keys = [self.model.id]
+        if order_by is not None:
+            keys.insert(0, order_by)
+        if stmt is None:
+            stmt = (
+                select(*self.columns(fields, *keys)) if fields
+                else select(self.model)
+            )
+
+        direction, values = decode_cursor(cursor) if cursor else (NEXT, None)
+        backwards = direction == PREV
+        if values is not None:
+            if len(values) != len(keys):
+                raise ValueError("Некорректный курсор")
+            key = tuple_(*keys)
+            bound = tuple_(*[
+                literal(value, column.type)
+                for column, value in zip(keys, values)
+            ])
+            stmt = stmt.where(key < bound if backwards else key > bound)
+        stmt = stmt.order_by(
+            *[column.desc() if backwards else column for column in keys]
+        ).limit(limit + 1)
+        return PageQuery(stmt, keys, limit, backwards, values is not None)
+
+    async def fetch_page(self, session: AsyncSession,
+                         query: PageQuery) -> Page:
+        result = await session.execute(query.statement)
+        if selects_entity(query.statement):
+            items = list(result.scalars().all())
+        else:
+            items = list(result.all())
+        has_more = len(items) > query.limit
+        items = items[:query.limit]
+        if query.backwards:
+            items.reverse()
+        if not items:
+            return Page(items)
+        return Page(items, *query.cursors(items[0], items[-1], has_more))
+
+    def stream_page(self, session: AsyncSession, query: PageQuery,
+                    batch_size: int = STREAM_BATCH_SIZE) -> PageStream:
+        # Для потокового рендера: запрос выполняется, когда шаблон дойдёт
+        # до цикла по строкам, ORM-объекты создаются пачками (yield_per)
+        async def rows():
+            result = await session.stream(
+                query.statement.execution_options(yield_per=batch_size)
+            )
+            if selects_entity(query.statement):
+                result = result.scalars()
+            async for item in result:
+                yield item
+        return PageStream(rows(), query)
+
+    async def paginate(self, session: AsyncSession,
+                       cursor: Optional[str] = None,
+                       limit: int = DEFAULT_PAGE_SIZE,
+                       stmt=None, order_by=None,
+                       fields: Optional[Sequence[str]] = None) -> Page:
+        return await self.fetch_page(
+            session, self.page_query(cursor, limit, stmt, order_by, fields)
+        )
+
 
 class UserRepository(BaseRepository):
+    # Всё, что нужно полю выбора пользователя (подсказки поиска)
+    CHOICE_COLUMNS = (User.id, User.name, User.lastname, User.email)
+
     def __init__(self):
         super().__init__(model=User)
 
+    def invalidate_on_commit(self, session: AsyncSession, user_id: int):
+        # Сбрасываем кэш после настоящего коммита (в т.ч. группового),
+        # чтобы параллельный запрос не закэшировал старую версию
+        on_commit(session, lambda: user_cache.invalidate(user_id))
+
+    @write_unit
+    async def update(self, session: AsyncSession,
+                     id: int, obj_in: Dict[str, Any]):
+        self.invalidate_on_commit(session, id)
+        # UPDATE идёт мимо ORM и validates: ключи поиска ставим сами
+        obj_in = {**obj_in, **{
+            column: search_folded(obj_in[field])
+            for field, column in User.SEARCH_COLUMNS.items()
+            if field in obj_in
+        }}
+        return await super().update(session, id, obj_in)
+
+    @write_unit
+    async def delete(self, session: AsyncSession, id: int):
+        self.invalidate_on_commit(session, id)
+        return await super().delete(session, id)
+
+    async def get_many(self, session: AsyncSession,
+                       user_ids) -> Dict[int, User]:
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return {}
+        result = await session.execute(
+            select(User).where(User.id.in_(user_ids))
+        )
+        return {user.id: user for user in result.scalars()}
+
+    def prefix_filter(self, prefix: str):
+        # Шаблон собирается здесь: SQLite использует индекс для LIKE,
+        # только если справа связанный параметр, а не выражение. Имя и
+        # фамилия сравниваются по ключам search_folded — так и «ив»
+        # находит «Иван»
+        def pattern(value):
+            return (
+                value.replace("/", "//").replace("%", "/%")
+                .replace("_", "/_") + "%"
+            )
+        folded = pattern(search_folded(prefix))
+        return or_(
+            User.name_search.like(folded, escape="/"),
+            User.lastname_search.like(folded, escape="/"),
+            User.email.like(pattern(prefix), escape="/"),
+        )
+
+    async def search(self, session: AsyncSession, prefix: str,
+                     limit: int = 10):
+        # Без ORDER BY: иначе SQLite предпочтёт обход таблицы по id вместо
+        # трёх поисков по индексам (совпадения по имени идут первыми)
+        result = await session.execute(
+            select(*self.CHOICE_COLUMNS)
+            .where(self.prefix_filter(prefix))
+            .limit(limit)
+        )
+        return result.all()
+
+    async def _get_choices_page(self, session: AsyncSession, *criteria,
+                                prefix: Optional[str] = None,
+                                cursor: Optional[str] = None,
+                                limit: int = DEFAULT_PAGE_SIZE):
+        stmt = select(*self.CHOICE_COLUMNS).where(*criteria)
+        if prefix:
+            stmt = stmt.where(self.prefix_filter(prefix))
+        return await self.paginate(session, cursor, limit, stmt=stmt)
+
+    async def get_not_in_meeting(self, session: AsyncSession,
+                                 meeting_id: int, **page_kwargs):
+        return await self._get_choices_page(
+            session,
+            ~exists().where(
+                MeetingParticipant.meeting_id == meeting_id,
+                MeetingParticipant.user_id == User.id
+            ),
+            **page_kwargs
+        )
+
+    async def get_not_in_team(self, session: AsyncSession,
+                              team_id: int, **page_kwargs):
+        return await self._get_choices_page(
+            session,
+            ~exists().where(
+                UserTeam.team_id == team_id,
+                UserTeam.user_id == User.id
+            ),
+            **page_kwargs
+        )
+
+    async def get_in_team(self, session: AsyncSession, team_id: int,
+                          fields: Sequence[str], **page_kwargs):
+        # IN, а не EXISTS: участников мало, и SQLite ищет их по первичному
+        # ключу вместо обхода всех пользователей
+        return await self.paginate(
+            session,
+            stmt=select(*self.columns(fields)).where(User.id.in_(
+                select(UserTeam.user_id).where(UserTeam.team_id == team_id)
+            )),
+            **page_kwargs
+        )
+
+    async def get_in_meeting(self, session: AsyncSession, meeting_id: int,
+                             fields: Sequence[str], **page_kwargs):
+        return await self.paginate(
+            session,
+            stmt=select(*self.columns(fields)).where(User.id.in_(
+                select(MeetingParticipant.user_id)
+                .where(MeetingParticipant.meeting_id == meeting_id)
+            )),
+            **page_kwargs
+        )
+
     async def is_auth(self, session: AsyncSession, email: str, password: str):
         result = await session.execute(
             select(self.model).where(self.model.email == email)
         )
         user = result.scalars().first()
-        if user and user.check_password(password):
+        if user and await password_hasher.verify(user.password_hash, password):
             return user
         return False
 
     async def create_user(self, session: AsyncSession, user_data: dict):
+        # Хешируем до очереди записи, чтобы KDF не занимал писателя
+        password_hash = await password_hasher.hash(user_data["password"])
+        return await self._create_user(session, user_data, password_hash)
+
+    @write_unit
+    async def _create_user(self, session: AsyncSession,
+                           user_data: dict, password_hash: str):
         result = await session.execute(
             select(self.model).where(self.model.email == user_data["email"])
         )
@@ -81,21 +399,29 @@ class UserRepository(BaseRepository):
             lastname=user_data["lastname"],
             email=user_data["email"],
             role=user_data.get("role", "user"),
+            password_hash=password_hash,
         )
-        user.set_password(user_data["password"])
 
         session.add(user)
-        await session.commit()
+        await self.commit(session)
         return user
 
     async def update_password(
         self, session: AsyncSession, user_id: int, new_password: str
+    ):
+        password_hash = await password_hasher.hash(new_password)
+        return await self._set_password_hash(session, user_id, password_hash)
+
+    @write_unit
+    async def _set_password_hash(
+        self, session: AsyncSession, user_id: int, password_hash: str
     ):
         user = await self.get(session, user_id)
         if user:
-            user.set_password(new_password)
+            user.password_hash = password_hash
             session.add(user)
-            await session.commit()
+            self.invalidate_on_commit(session, user_id)
+            await self.commit(session)
             return user
         raise ValueError(
             "Такого пользователя не существует"
@@ -106,8 +432,9 @@ class TaskRepository(BaseRepository):
     def __init__(self):
         super().__init__(model=Task)
 
+    @write_unit
     async def create_task(self, session: AsyncSession, task_data: dict):
-        performer = await session.get(session, task_data["performer"])
+        performer = await session.get(User, task_data["performer"])
         if not performer:
             raise ValueError("Такого исполнителя не существует")
         task = self.model(
@@ -116,48 +443,105 @@ class TaskRepository(BaseRepository):
             description=task_data["description"],
             deadline=task_data["deadline"]
         )
-        await session.commit()
+        session.add(task)
+        await self.commit(session)
         return task
 
-    async def get_all_user_tasks(self, session: AsyncSession, user_id: int):
-        avg_assessment_subq = (
+    async def get_all_user_tasks(self, session: AsyncSession, user_id: int,
+                                 cursor: Optional[str] = None,
+                                 limit: int = DEFAULT_PAGE_SIZE):
+        average_assessment = await self.get_average_assessment(
+            session, user_id
+        )
+        page = await self.fetch_page(
+            session, self.user_tasks_query(user_id, cursor, limit)
+        )
+
+        return {
+            "tasks": page.items,
+            "page": page,
+            "avg": average_assessment
+        }
+
+    def user_tasks_query(self, user_id: int, cursor: Optional[str] = None,
+                         limit: int = DEFAULT_PAGE_SIZE,
+                         fields: Optional[Sequence[str]] = None) -> PageQuery:
+        # fields — только эти колонки, без ORM-объектов и участников
+        if fields:
+            stmt = select(*self.columns(fields))
+        else:
+            stmt = select(Task).options(
+                selectinload(Task.performer_user),
+                selectinload(Task.creator_user)
+            )
+        return self.page_query(
+            cursor, limit,
+            stmt=stmt.where(
+                (Task.creator == user_id) | (Task.performer == user_id)
+            )
+        )
+
+    async def get_average_assessment(self, session: AsyncSession,
+                                     user_id: int) -> Optional[float]:
+        average_assessment = await session.scalar(
             select(
                 func.avg(Task.assessment)
                 .filter(Task.assessment.is_not(None))
-                .label("average_assessment")
             )
             .where((Task.creator == user_id) | (Task.performer == user_id))
-        ).scalar_subquery()
+        )
+        return (
+            float(average_assessment)
+            if average_assessment is not None
+            else None
+        )
 
-        stmt = (
+    async def get_list_version(self, session: AsyncSession,
+                               user_id: int) -> tuple:
+        # Валидатор списка задач: одна агрегатная строка по задачам
+        # пользователя и их участникам вместо выборки и рендера страницы
+        creator, performer = aliased(User), aliased(User)
+        result = await session.execute(
             select(
-                Task,
-                avg_assessment_subq
-            )
-            .options(
-                selectinload(Task.performer_user),
-                selectinload(Task.creator_user)
+                func.count(Task.id), func.max(Task.id),
+                func.sum(Task.version), func.max(Task.updated_at),
+                func.sum(creator.version), func.max(creator.updated_at),
+                func.sum(performer.version), func.max(performer.updated_at),
             )
+            .outerjoin(creator, creator.id == Task.creator)
+            .outerjoin(performer, performer.id == Task.performer)
             .where((Task.creator == user_id) | (Task.performer == user_id))
         )
+        return tuple(result.one())
 
-        result = await session.execute(stmt)
-        rows = result.all()
-
-        if not rows:
-            return {"tasks": [], "avg": None}
-
-        tasks = [row[0] for row in rows]
-        average_assessment = rows[0][1]
-
-        return {
-            "tasks": tasks,
-            "avg": (
-                float(average_assessment)
-                if average_assessment is not None
-                else None
+    async def get_version(self, session: AsyncSession,
+                          task_id: int) -> Optional[tuple]:
+        # Валидатор страницы задачи: сама задача, её участники и чат с
+        # авторами. Первые два значения — creator и performer, по ним
+        # проверяется доступ
+        creator, performer = aliased(User), aliased(User)
+        result = await session.execute(
+            select(
+                Task.creator, Task.performer, Task.version, Task.updated_at,
+                creator.version, creator.updated_at,
+                performer.version, performer.updated_at,
             )
-        }
+            .outerjoin(creator, creator.id == Task.creator)
+            .outerjoin(performer, performer.id == Task.performer)
+            .where(Task.id == task_id)
+        )
+        task = result.first()
+        if task is None:
+            return None
+        chat = await session.execute(
+            select(func.count(), func.max(TaskChat.id),
+                   func.sum(TaskChat.version), func.max(TaskChat.updated_at))
+            .where(TaskChat.task_id == task_id)
+        )
+        authors = await users_version(
+            session, TaskChat, TaskChat.task_id, task_id
+        )
+        return (*task, *chat.one(), *authors)
 
     async def get_task_with_date(
         self, session: AsyncSession,
@@ -175,14 +559,30 @@ class TaskRepository(BaseRepository):
         )
         return result.scalars().all()
 
+    async def stream_user_deadlines(
+        self, session: AsyncSession, user_id: int,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> AsyncIterator:
+        result = await session.stream(
+            select(Task.id, Task.description, Task.deadline)
+            .where(
+                Task.performer == user_id,
+                Task.deadline.is_not(None),
+                Task.status != "completed"
+            )
+            .execution_options(yield_per=batch_size)
+        )
+        async for row in result:
+            yield row
+
     async def get_user_tasks(self, session: AsyncSession,
                              task_id: int, user_id: int):
+        # Чат задачи грузится отдельно постранично: TaskChatRepository
         result = await session.execute(
             select(Task)
             .options(
                 selectinload(Task.performer_user),
                 selectinload(Task.creator_user),
-                selectinload(Task.created_tasks).joinedload(TaskChat.user)
             )
             .where(
                 (Task.id == task_id) &
@@ -191,6 +591,7 @@ class TaskRepository(BaseRepository):
         )
         return result.scalars().first()
 
+    @write_unit
     async def update_status(self, session: AsyncSession,
                             task_id: int, task_status: str):
         task = await self.get(session, task_id)
@@ -198,10 +599,13 @@ class TaskRepository(BaseRepository):
             raise ValueError("Такого задания не существует")
         task.status = task_status
         session.add(task)
-        await session.commit()
+        publish_on_commit(session, task_channel(task_id),
+                          {"type": "status", "status": task_status})
+        await self.commit(session)
         await session.refresh(task)
         return task
 
+    @write_unit
     async def update_assessment(self, session: AsyncSession,
                                 task_id: int, assessment: int):
         task = await self.get(session, task_id)
@@ -209,20 +613,190 @@ class TaskRepository(BaseRepository):
             raise ValueError("Такого задания не существует")
         task.assessment = assessment
         session.add(task)
-        await session.commit()
+        publish_on_commit(session, task_channel(task_id),
+                          {"type": "assessment", "assessment": assessment})
+        await self.commit(session)
         await session.refresh(task)
         return task
 
+    def _bulk_criteria(self, task_ids: Sequence[int],
+                       user_id: Optional[int], *owners) -> list:
+        # Права — часть WHERE: чужие задачи не попадают под запрос и не
+        # входят в число затронутых строк. user_id=None — без фильтра
+        # (админка, доступ к ней уже проверен)
+        criteria = [Task.id.in_(task_ids)]
+        if user_id is not None:
+            criteria.append(or_(*(owner == user_id for owner in owners)))
+        return criteria
+
+    async def _bulk_update(self, session: AsyncSession,
+                           criteria: list, values: dict) -> list:
+        # Один UPDATE ... WHERE id IN (...) вместо загрузки каждой задачи;
+        # version и updated_at сдвигает onupdate. RETURNING отдаёт
+        # затронутые строки: по ним считается количество
+        result = await session.execute(
+            sqlalchemy_update(Task).where(*criteria).values(**values)
+            .returning(Task.id)
+        )
+        return result.all()
+
+    @write_unit
+    async def bulk_update_status(self, session: AsyncSession,
+                                 task_ids: Sequence[int], task_status: str,
+                                 user_id: Optional[int] = None) -> int:
+        # Статус, как и на странице задачи, меняет и исполнитель
+        if not task_ids:
+            return 0
+        rows = await self._bulk_update(
+            session,
+            self._bulk_criteria(task_ids, user_id,
+                                Task.creator, Task.performer),
+            {"status": task_status}
+        )
+        for row in rows:
+            publish_on_commit(session, task_channel(row.id),
+                              {"type": "status", "status": task_status})
+        await self.commit(session)
+        return len(rows)
+
+    @write_unit
+    async def bulk_reassign(self, session: AsyncSession,
+                            task_ids: Sequence[int], performer: int,
+                            user_id: Optional[int] = None) -> int:
+        if not task_ids:
+            return 0
+        if not await session.get(User, performer):
+            raise ValueError("Такого исполнителя не существует")
+        rows = await self._bulk_update(
+            session, self._bulk_criteria(task_ids, user_id, Task.creator),
+            {"performer": performer}
+        )
+        await self.commit(session)
+        return len(rows)
+
+    @write_unit
+    async def bulk_shift_deadline(self, session: AsyncSession,
+                                  task_ids: Sequence[int],
+                                  delta: datetime.timedelta,
+                                  user_id: Optional[int] = None) -> int:
+        if not task_ids:
+            return 0
+        # Сдвиг считает SQLite; результат — в том же виде, в каком
+        # SQLAlchemy хранит DateTime ('%f' — секунды с миллисекундами)
+        deadline = func.strftime(
+            "%Y-%m-%d %H:%M:%f000", Task.deadline,
+            f"{int(delta.total_seconds()):+d} seconds"
+        )
+        rows = await self._bulk_update(
+            session,
+            self._bulk_criteria(task_ids, user_id, Task.creator),
+            {"deadline": deadline}
+        )
+        await self.commit(session)
+        return len(rows)
+
+    @write_unit
+    async def bulk_delete(self, session: AsyncSession,
+                          task_ids: Sequence[int],
+                          user_id: Optional[int] = None) -> int:
+        if not task_ids:
+            return 0
+        criteria = self._bulk_criteria(task_ids, user_id, Task.creator)
+        # Каскад чата у Task — на уровне ORM, а здесь запрос: удаляем
+        # сообщения тем же множеством
+        await session.execute(
+            sqlalchemy_delete(TaskChat).where(
+                TaskChat.task_id.in_(select(Task.id).where(*criteria))
+            )
+        )
+        result = await session.execute(
+            sqlalchemy_delete(Task).where(*criteria).returning(Task.id)
+        )
+        rows = result.all()
+        await self.commit(session)
+        return len(rows)
+
 
 class TaskChatRepository(BaseRepository):
     def __init__(self):
         super().__init__(model=TaskChat)
 
+    @write_unit
+    async def add(self, session: AsyncSession, obj_in: dict):
+        # flush + refresh до коммита: событие собирается с id и
+        # created_at из базы, а уходит только после коммита
+        message = TaskChat(**obj_in)
+        session.add(message)
+        await session.flush()
+        await session.refresh(message)
+        author = await session.get(User, message.user_id)
+        # Автор уже загружен: ответ-фрагмент рисуется без новых запросов
+        set_committed_value(message, "user", author)
+        publish_on_commit(session, task_channel(message.task_id), {
+            "type": "comment",
+            "id": message.id,
+            "user_id": message.user_id,
+            "author": f"{author.name} {author.lastname}" if author else "",
+            "text": message.text,
+            "created_at": str(message.created_at),
+        })
+        await self.commit(session)
+        return message
+
+    async def get_history(self, session: AsyncSession, task_id: int,
+                          cursor: Optional[str] = None,
+                          limit: int = CHAT_PAGE_SIZE,
+                          fields: Optional[Sequence[str]] = None) -> Page:
+        # Последние limit сообщений (или предшествующие курсору) по индексу
+        # (task_id, created_at[, id]); в странице — по возрастанию времени.
+        # prev_cursor ведёт к более ранним сообщениям. С fields — строки
+        # только с этими колонками и без авторов
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        keys = (TaskChat.created_at, TaskChat.id)
+        stmt = (
+            select(*self.columns(fields, *keys)) if fields
+            else select(TaskChat)
+        ).where(TaskChat.task_id == task_id)
+        if cursor:
+            direction, values = decode_cursor(cursor)
+            if direction != PREV or len(values) != len(keys):
+                raise ValueError("Некорректный курсор")
+            stmt = stmt.where(tuple_(*keys) < tuple_(*[
+                literal(value, column.type)
+                for column, value in zip(keys, values)
+            ]))
+        result = await session.execute(
+            stmt.order_by(*[column.desc() for column in keys])
+            .limit(limit + 1)
+        )
+        messages = list(result.all() if fields else result.scalars())
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        messages.reverse()
+
+        # Авторы страницы — одним запросом по id, без join на каждой
+        # странице; relationship заполняется без ленивой загрузки
+        if not fields:
+            authors = await UserRepository().get_many(
+                session, {message.user_id for message in messages}
+            )
+            for message in messages:
+                set_committed_value(message, "user",
+                                    authors.get(message.user_id))
+
+        if not has_more:
+            return Page(messages)
+        oldest = messages[0]
+        return Page(messages, prev_cursor=encode_cursor(
+            PREV, [oldest.created_at, oldest.id]
+        ))
+
 
 class TeamRepository(BaseRepository):
     def __init__(self):
         super().__init__(Team)
 
+    @write_unit
     async def add(self, session: AsyncSession,
                   name: str, members: Optional[list[int]] = None):
         team = Team(name=name)
@@ -236,9 +810,10 @@ class TeamRepository(BaseRepository):
                     role='staff'
                 )
                 session.add(userteam)
-        await session.commit()
+        await self.commit(session)
         return team
 
+    @write_unit
     async def delete(self, session: AsyncSession, team_id: int):
         await session.execute(
             sqlalchemy_delete(Team).where(Team.id == team_id)
@@ -248,29 +823,36 @@ class TeamRepository(BaseRepository):
                 UserTeam.team_id == team_id
             )
         )
-        await session.commit()
+        await self.commit(session)
 
     async def get(self, session: AsyncSession, team_id: int):
         result = await session.execute(
             select(Team)
             .options(
-                selectinload(Team.users)
+                selectinload(Team.user_teams).joinedload(UserTeam.user)
             )
             .where(Team.id == team_id)
         )
         return result.scalars().first()
 
+    @write_unit
     async def add_member(self, session: AsyncSession,
                          team_id: int, user_id: int, role: str):
+        user = await session.get(User, user_id)
+        if not user:
+            raise ValueError("Такого пользователя не существует")
         userteam = UserTeam(
             user_id=user_id,
             team_id=team_id,
             role=role
         )
         session.add(userteam)
-        await session.commit()
+        await touch(session, Team, team_id)
+        await self.commit(session)
+        set_committed_value(userteam, "user", user)
         return userteam
 
+    @write_unit
     async def delete_member(self, session: AsyncSession,
                             team_id: int, user_id: int):
         await session.execute(
@@ -278,7 +860,20 @@ class TeamRepository(BaseRepository):
                 (UserTeam.team_id == team_id) & (UserTeam.user_id == user_id)
             )
         )
-        await session.commit()
+        await touch(session, Team, team_id)
+        await self.commit(session)
+
+    async def get_version(self, session: AsyncSession,
+                          team_id: int) -> Optional[tuple]:
+        team = (await session.execute(
+            select(Team.version, Team.updated_at).where(Team.id == team_id)
+        )).first()
+        if team is None:
+            return None
+        members = await users_version(
+            session, UserTeam, UserTeam.team_id, team_id
+        )
+        return (*team, *members)
 
     async def get_user_team(self, session: AsyncSession, user_id: int):
         result = await session.execute(
@@ -286,6 +881,7 @@ class TeamRepository(BaseRepository):
             .options(
                 selectinload(Team.user_teams).joinedload(UserTeam.user)
             )
+            .join(UserTeam, UserTeam.team_id == Team.id)
             .where(UserTeam.user_id == user_id)
         )
 
@@ -308,6 +904,22 @@ class MeetingRepository(BaseRepository):
         )
         return result.scalars().first()
 
+    async def get_version(self, session: AsyncSession,
+                          meeting_id: int) -> Optional[tuple]:
+        meeting = (await session.execute(
+            select(Meeting.version, Meeting.updated_at,
+                   User.version, User.updated_at)
+            .outerjoin(User, User.id == Meeting.creator_id)
+            .where(Meeting.id == meeting_id)
+        )).first()
+        if meeting is None:
+            return None
+        participants = await users_version(
+            session, MeetingParticipant, MeetingParticipant.meeting_id,
+            meeting_id
+        )
+        return (*meeting, *participants)
+
     async def get_all(self, session):
         result = await session.execute(
             select(Meeting)
@@ -315,13 +927,35 @@ class MeetingRepository(BaseRepository):
         )
         return result.scalars().all()
 
+    async def get_upcoming(self, session: AsyncSession,
+                           cursor: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE):
+        return await self.fetch_page(
+            session, self.upcoming_query(cursor, limit)
+        )
+
+    def upcoming_query(self, cursor: Optional[str] = None,
+                       limit: int = DEFAULT_PAGE_SIZE,
+                       fields: Optional[Sequence[str]] = None) -> PageQuery:
+        stmt = (
+            select(*self.columns(fields, Meeting.date)) if fields
+            else select(Meeting)
+        )
+        return self.page_query(
+            cursor, limit,
+            stmt=stmt.where(Meeting.date > datetime.datetime.now()),
+            order_by=Meeting.date
+        )
+
+    @write_unit
     async def add(self, session: AsyncSession,
                   date: datetime.datetime,
                   description: str,
-                  creator_id: int, members: Optional[list[int]] = None):
+                  creator_id: int, members: Optional[list[int]] = None,
+                  duration: int = Meeting.DEFAULT_DURATION):
         meeting = Meeting(
             description=description,
-            date=date, creator_id=creator_id
+            date=date, duration=duration, creator_id=creator_id
         )
         session.add(meeting)
         await session.flush()
@@ -332,9 +966,10 @@ class MeetingRepository(BaseRepository):
                     meeting_id=meeting.id,
                 )
                 session.add(usermeeting)
-        await session.commit()
+        await self.commit(session)
         return meeting
 
+    @write_unit
     async def delete(self, session: AsyncSession, meeting_id: int):
         await session.execute(
             sqlalchemy_delete(Meeting).where(Meeting.id == meeting_id)
@@ -344,18 +979,25 @@ class MeetingRepository(BaseRepository):
                 MeetingParticipant.meeting_id == meeting_id
             )
         )
-        await session.commit()
+        await self.commit(session)
 
+    @write_unit
     async def add_member(self, session: AsyncSession,
                          meeting_id: int, user_id: int):
+        user = await session.get(User, user_id)
+        if not user:
+            raise ValueError("Такого пользователя не существует")
         usermeeting = MeetingParticipant(
             user_id=user_id,
             meeting_id=meeting_id
         )
         session.add(usermeeting)
-        await session.commit()
+        await touch(session, Meeting, meeting_id)
+        await self.commit(session)
+        set_committed_value(usermeeting, "user", user)
         return usermeeting
 
+    @write_unit
     async def delete_member(self, session: AsyncSession,
                             meeting_id: int, user_id: int):
         await session.execute(
@@ -364,7 +1006,67 @@ class MeetingRepository(BaseRepository):
                 (MeetingParticipant.user_id == user_id)
             )
         )
-        await session.commit()
+        await touch(session, Meeting, meeting_id)
+        await self.commit(session)
+
+    async def stream_user_meetings(
+        self, session: AsyncSession, user_id: int,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> AsyncIterator:
+        result = await session.stream(
+            select(Meeting.id, Meeting.description, Meeting.date,
+                   Meeting.duration)
+            .join(MeetingParticipant)
+            .where(
+                MeetingParticipant.user_id == user_id,
+                Meeting.date.is_not(None)
+            )
+            .execution_options(yield_per=batch_size)
+        )
+        async for row in result:
+            yield row
+
+    def _busy_window(self, start: datetime.datetime,
+                     end: datetime.datetime):
+        # Встреча не длиннее MAX_DURATION, поэтому достаточно искать начала
+        # в [start - MAX_DURATION, end) по индексу на date; лишнее отсечёт
+        # вызывающий по фактическому концу
+        earliest = start - datetime.timedelta(minutes=Meeting.MAX_DURATION)
+        return and_(Meeting.date >= earliest, Meeting.date < end)
+
+    async def get_busy_intervals(self, session: AsyncSession,
+                                 user_ids: Sequence[int],
+                                 start: datetime.datetime,
+                                 end: datetime.datetime):
+        # По строке на участника: нужно, чтобы назвать занятых
+        result = await session.execute(
+            select(MeetingParticipant.user_id, Meeting.id,
+                   Meeting.date, Meeting.duration)
+            .join(Meeting, Meeting.id == MeetingParticipant.meeting_id)
+            .where(
+                MeetingParticipant.user_id.in_(user_ids),
+                self._busy_window(start, end)
+            )
+        )
+        return result.all()
+
+    async def get_busy_meetings(self, session: AsyncSession,
+                                user_ids: Sequence[int],
+                                start: datetime.datetime,
+                                end: datetime.datetime):
+        # По строке на встречу: для общей занятости группы неважно, кто
+        # именно занят, а общие встречи иначе повторялись бы на участника
+        result = await session.execute(
+            select(Meeting.id, Meeting.date, Meeting.duration)
+            .where(
+                self._busy_window(start, end),
+                exists().where(
+                    MeetingParticipant.meeting_id == Meeting.id,
+                    MeetingParticipant.user_id.in_(user_ids)
+                )
+            )
+        )
+        return result.all()
 
     async def get_meeting_with_date(
         self,
@@ -383,3 +1085,207 @@ class MeetingRepository(BaseRepository):
             ).order_by(Meeting.date)
         )
         return meetings_query.scalars().all()
+
+
+class CalendarRepository:
+    """Встречи и задачи пользователя как события с общей формой строки:
+    (type, id, description, at)."""
+
+    async def get_version(self, session: AsyncSession,
+                          user_id: int) -> tuple:
+        # Версия календаря пользователя по самой базе: состав, версии и
+        # последнее изменение его задач и встреч. Видит и запись в обход
+        # репозиториев (админка), и запись других воркеров
+        tasks = select(
+            literal("task"), func.count(), func.sum(Task.id),
+            func.sum(Task.version), func.max(Task.updated_at)
+        ).where(Task.performer == user_id)
+        meetings = (
+            select(literal("meeting"), func.count(), func.sum(Meeting.id),
+                   func.sum(Meeting.version), func.max(Meeting.updated_at))
+            .join(MeetingParticipant)
+            .where(MeetingParticipant.user_id == user_id)
+        )
+        result = await session.execute(union_all(tasks, meetings))
+        return tuple(value for row in result for value in row)
+
+    async def get_events(self, session: AsyncSession, user_id: int,
+                         windows: Sequence[Tuple[datetime.datetime,
+                                                 datetime.datetime]]):
+        # Окна полуоткрытые: [start, end)
+        def in_windows(column):
+            return or_(*(
+                and_(column >= start, column < end) for start, end in windows
+            ))
+
+        meetings = (
+            select(
+                literal("meeting").label("type"),
+                Meeting.id.label("id"),
+                Meeting.description.label("description"),
+                Meeting.date.label("at"),
+            )
+            .join(MeetingParticipant)
+            .where(MeetingParticipant.user_id == user_id,
+                   in_windows(Meeting.date))
+        )
+        tasks = select(
+            literal("task"), Task.id, Task.description, Task.deadline
+        ).where(
+            Task.performer == user_id,
+            Task.status != "completed",
+            in_windows(Task.deadline),
+        )
+        result = await session.execute(
+            union_all(meetings, tasks).order_by(literal_column("at"))
+        )
+        return result.all()
+
+    async def get_overlapping(self, session: AsyncSession, user_id: int,
+                              start: datetime.datetime,
+                              end: datetime.datetime):
+        # Всё, что пересекается с [start, end]: отрезки задач
+        # (created_at → deadline) и встреч ищутся по R*Tree сразу по обеим
+        # границам; его округлённые до минут кандидаты уточняются здесь.
+        # Исполнителя задачи в WHERE нет намеренно: иначе SQLite пойдёт
+        # от индекса по performer, а в R*Tree — только поиском по rowid
+        low, high = floor_minutes(start), ceil_minutes(end)
+
+        def overlaps(spans):
+            return and_(
+                spans.c.user_lo <= user_id, spans.c.user_hi >= user_id,
+                spans.c.start_at <= high, spans.c.end_at >= low,
+            )
+
+        tasks = (
+            select(literal("task").label("type"), Task.id, Task.description,
+                   Task.created_at.label("start"),
+                   Task.deadline.label("end"),
+                   literal(None).label("duration"))
+            .join(task_spans, task_spans.c.id == Task.id)
+            .where(overlaps(task_spans))
+        )
+        meetings = (
+            select(literal("meeting"), Meeting.id, Meeting.description,
+                   Meeting.date, Meeting.date, Meeting.duration)
+            .join(meeting_spans, meeting_spans.c.meeting_id == Meeting.id)
+            .where(overlaps(meeting_spans))
+        )
+        result = await session.execute(union_all(tasks, meetings))
+
+        spans = []
+        for row in result:
+            if row.duration is None:
+                span_start, span_end = sorted((row.start, row.end))
+            else:
+                span_start = row.start
+                span_end = row.start + datetime.timedelta(
+                    minutes=row.duration
+                )
+            if span_start <= end and span_end >= start:
+                spans.append(Span(row.type, row.id, row.description,
+                                  span_start, span_end))
+        spans.sort(key=lambda span: (span.start, span.type, span.id))
+        return spans
+
+
+class SearchRepository:
+    """Полнотекстовый поиск по задачам, их чату, встречам и командам.
+    Строка результата: (type, id, target_id, snippet, rank); target_id —
+    объект, на который ведёт ссылка (для сообщения — задача)."""
+
+    def _match(self, fts, terms: str, text_column: str,
+               user_id: Optional[int] = None):
+        name = literal_column(fts.name)
+        if user_id is not None:
+            # Видимость — второй колонкой индекса, см. database/fts.py
+            terms = (
+                f'{text_column} : ({terms}) AND acl : "{acl_token(user_id)}"'
+            )
+            rank = func.bm25(name, 1.0, 0.0)
+        else:
+            rank = func.bm25(name)
+        snippet = func.snippet(name, 0, SNIPPET_START, SNIPPET_END,
+                               SNIPPET_ELLIPSIS, SNIPPET_TOKENS)
+        return name.op("MATCH")(terms), snippet, rank
+
+    async def search(self, session: AsyncSession, user_id: int, query: str,
+                     is_admin: bool = False, cursor: Optional[str] = None,
+                     limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        terms = match_terms(query)
+        if terms is None:
+            return Page([])
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        match, snippet, rank = self._match(tasks_fts, terms, "description",
+                                           user_id)
+        tasks = select(
+            literal("task").label("type"), tasks_fts.c.rowid.label("id"),
+            tasks_fts.c.rowid.label("target_id"), snippet.label("snippet"),
+            rank.label("rank"),
+        ).select_from(tasks_fts).where(match)
+
+        match, snippet, rank = self._match(task_chat_fts, terms, "text",
+                                           user_id)
+        messages = (
+            select(literal("message"), task_chat_fts.c.rowid,
+                   TaskChat.task_id, snippet, rank)
+            .select_from(task_chat_fts)
+            .join(TaskChat, TaskChat.id == task_chat_fts.c.rowid)
+            .where(match)
+        )
+
+        # Встречи и команды админ видит все, остальные — только свои
+        match, snippet, rank = self._match(meeting_fts, terms, "description")
+        meetings = select(
+            literal("meeting"), meeting_fts.c.rowid, meeting_fts.c.rowid,
+            snippet, rank,
+        ).select_from(meeting_fts).where(match)
+        match, snippet, rank = self._match(teams_fts, terms, "name")
+        teams = select(
+            literal("team"), teams_fts.c.rowid, teams_fts.c.rowid,
+            snippet, rank,
+        ).select_from(teams_fts).where(match)
+        if not is_admin:
+            meetings = meetings.where(exists().where(
+                MeetingParticipant.meeting_id == meeting_fts.c.rowid,
+                MeetingParticipant.user_id == user_id,
+            ))
+            teams = teams.where(exists().where(
+                UserTeam.team_id == teams_fts.c.rowid,
+                UserTeam.user_id == user_id,
+            ))
+
+        # Keyset по (rank, type, id): bm25 отрицателен, лучшие — первыми
+        results = union_all(tasks, messages, meetings, teams).subquery()
+        keys = [results.c.rank, results.c.type, results.c.id]
+        stmt = select(results)
+        direction, values = decode_cursor(cursor) if cursor else (NEXT, None)
+        backwards = direction == PREV
+        if values is not None:
+            if len(values) != len(keys):
+                raise ValueError("Некорректный курсор")
+            key, bound = tuple_(*keys), tuple_(*map(literal, values))
+            stmt = stmt.where(key < bound if backwards else key > bound)
+        stmt = stmt.order_by(
+            *[key.desc() if backwards else key for key in keys]
+        ).limit(limit + 1)
+
+        items = list((await session.execute(stmt)).all())
+        has_more = len(items) > limit
+        items = items[:limit]
+        if backwards:
+            items.reverse()
+        if not items:
+            return Page(items)
+
+        def key_of(item):
+            return [item.rank, item.type, item.id]
+
+        has_next = has_more if not backwards else True
+        has_prev = values is not None if not backwards else has_more
+        return Page(
+            items,
+            encode_cursor(NEXT, key_of(items[-1])) if has_next else None,
+            encode_cursor(PREV, key_of(items[0])) if has_prev else None,
+        )
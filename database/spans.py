@@ -0,0 +1,178 @@
+import datetime
+import math
+from typing import NamedTuple, Optional
+
+from sqlalchemy import column, table
+
+
+# R*Tree с отрезками времени задач (created_at → deadline) и встреч
+# (date → date + duration). Измерения: пользователь и время в минутах от
+# эпохи; rtree_i32 хранит целые, поэтому границы округляются наружу, а
+# точную проверку делает вызывающий.
+task_spans = table(
+    "task_spans",
+    column("id"), column("user_lo"), column("user_hi"),
+    column("start_at"), column("end_at"),
+)
+
+meeting_spans = table(
+    "meeting_spans",
+    column("id"), column("user_lo"), column("user_hi"),
+    column("start_at"), column("end_at"), column("meeting_id"),
+)
+
+
+class Span(NamedTuple):
+    type: str
+    id: int
+    description: Optional[str]
+    start: datetime.datetime
+    end: datetime.datetime
+
+
+def _minutes(value: str) -> str:
+    return f"CAST(strftime('%s', {value}) AS INTEGER) / 60"
+
+
+def _minutes_ceil(value: str) -> str:
+    return f"(CAST(strftime('%s', {value}) AS INTEGER) + 59) / 60"
+
+
+def _epoch_seconds(value: datetime.datetime) -> float:
+    # strftime('%s') считает время без зоны как UTC — делаем так же
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def floor_minutes(value: datetime.datetime) -> int:
+    return math.floor(_epoch_seconds(value) / 60)
+
+
+def ceil_minutes(value: datetime.datetime) -> int:
+    return math.ceil(_epoch_seconds(value) / 60)
+
+
+# id встречи в R*Tree: участник (meeting_id, user_id) без опоры на rowid,
+# который VACUUM может перенумеровать
+_MEETING_SPAN_ID = "({meeting} << 32) | {user}"
+
+_TASK_SPAN_VALUES = (
+    "{t}.id, {t}.performer, {t}.performer, "
+    f"min({_minutes('{t}.created_at')}, {_minutes('{t}.deadline')}), "
+    f"max({_minutes_ceil('{t}.created_at')}, {_minutes_ceil('{t}.deadline')})"
+)
+_TASK_SPAN_WHEN = (
+    "{t}.performer IS NOT NULL AND {t}.created_at IS NOT NULL "
+    "AND {t}.deadline IS NOT NULL"
+)
+
+_MEETING_SPAN_VALUES = (
+    _MEETING_SPAN_ID.format(meeting="{m}.id", user="{p}.user_id")
+    + ", {p}.user_id, {p}.user_id, "
+    + _minutes("{m}.date") + ", "
+    + _minutes_ceil("{m}.date") + " + {m}.duration, {m}.id"
+)
+
+
+# id строки участника в триггерах: удалённой (old) и из выборки (p)
+_OLD_PARTICIPANT_SPAN_ID = _MEETING_SPAN_ID.format(
+    meeting="old.meeting_id", user="old.user_id"
+)
+_PARTICIPANT_SPAN_ID = _MEETING_SPAN_ID.format(
+    meeting="p.meeting_id", user="p.user_id"
+)
+
+
+def _task_span_insert(alias: str) -> str:
+    return (
+        "INSERT INTO task_spans "
+        f"SELECT {_TASK_SPAN_VALUES.format(t=alias)} "
+        f"WHERE {_TASK_SPAN_WHEN.format(t=alias)}"
+    )
+
+
+SPAN_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_spans "
+    "USING rtree_i32(id, user_lo, user_hi, start_at, end_at)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS meeting_spans "
+    "USING rtree_i32(id, user_lo, user_hi, start_at, end_at, +meeting_id)",
+
+    "CREATE TRIGGER IF NOT EXISTS tasks_spans_insert "
+    "AFTER INSERT ON tasks BEGIN "
+    f"{_task_span_insert('new')}; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_spans_update "
+    "AFTER UPDATE OF performer, created_at, deadline ON tasks BEGIN "
+    "DELETE FROM task_spans WHERE id = old.id; "
+    f"{_task_span_insert('new')}; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_spans_delete "
+    "AFTER DELETE ON tasks BEGIN "
+    "DELETE FROM task_spans WHERE id = old.id; END",
+
+    "CREATE TRIGGER IF NOT EXISTS meeting_participants_spans_insert "
+    "AFTER INSERT ON meeting_participants BEGIN "
+    "INSERT INTO meeting_spans "
+    f"SELECT {_MEETING_SPAN_VALUES.format(m='m', p='new')} "
+    "FROM meeting m WHERE m.id = new.meeting_id AND m.date IS NOT NULL; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS meeting_participants_spans_update "
+    "AFTER UPDATE OF meeting_id, user_id ON meeting_participants BEGIN "
+    "DELETE FROM meeting_spans WHERE id = "
+    f"{_OLD_PARTICIPANT_SPAN_ID}; "
+    "INSERT INTO meeting_spans "
+    f"SELECT {_MEETING_SPAN_VALUES.format(m='m', p='new')} "
+    "FROM meeting m WHERE m.id = new.meeting_id AND m.date IS NOT NULL; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS meeting_participants_spans_delete "
+    "AFTER DELETE ON meeting_participants BEGIN "
+    "DELETE FROM meeting_spans WHERE id = "
+    f"{_OLD_PARTICIPANT_SPAN_ID}; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS meeting_spans_update "
+    "AFTER UPDATE OF date, duration ON meeting BEGIN "
+    "DELETE FROM meeting_spans WHERE id IN ("
+    f"SELECT {_PARTICIPANT_SPAN_ID} "
+    "FROM meeting_participants p WHERE p.meeting_id = old.id); "
+    "INSERT INTO meeting_spans "
+    f"SELECT {_MEETING_SPAN_VALUES.format(m='new', p='p')} "
+    "FROM meeting_participants p "
+    "WHERE p.meeting_id = new.id AND new.date IS NOT NULL; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS meeting_spans_delete "
+    "AFTER DELETE ON meeting BEGIN "
+    "DELETE FROM meeting_spans WHERE id IN ("
+    f"SELECT {_PARTICIPANT_SPAN_ID} "
+    "FROM meeting_participants p WHERE p.meeting_id = old.id); "
+    "END",
+]
+
+# Заполнение по уже существующим данным (миграция)
+SPAN_INDEX_BACKFILL = [
+    "INSERT OR REPLACE INTO task_spans "
+    f"SELECT {_TASK_SPAN_VALUES.format(t='t')} FROM tasks t "
+    f"WHERE {_TASK_SPAN_WHEN.format(t='t')}",
+    "INSERT OR REPLACE INTO meeting_spans "
+    f"SELECT {_MEETING_SPAN_VALUES.format(m='m', p='p')} "
+    "FROM meeting_participants p JOIN meeting m ON m.id = p.meeting_id "
+    "WHERE m.date IS NOT NULL",
+]
+
+SPAN_INDEX_DROP = [
+    "DROP TRIGGER IF EXISTS meeting_spans_delete",
+    "DROP TRIGGER IF EXISTS meeting_spans_update",
+    "DROP TRIGGER IF EXISTS meeting_participants_spans_delete",
+    "DROP TRIGGER IF EXISTS meeting_participants_spans_update",
+    "DROP TRIGGER IF EXISTS meeting_participants_spans_insert",
+    "DROP TRIGGER IF EXISTS tasks_spans_delete",
+    "DROP TRIGGER IF EXISTS tasks_spans_update",
+    "DROP TRIGGER IF EXISTS tasks_spans_insert",
+    "DROP TABLE IF EXISTS meeting_spans",
+    "DROP TABLE IF EXISTS task_spans",
+]
+
+
+def create_span_index(target, connection, **kw):
+    # Слушатель after_create метаданных: виртуальные таблицы и триггеры
+    # вне ORM создаются вместе со схемой (create_all в DEV и тестах)
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in SPAN_INDEX_DDL:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+logger = logging.getLogger(__name__)
+
+# Ключ в session.info: сессия принадлежит писателю и коммитит пачкой
+GROUP_COMMIT_KEY = "group_commit"
+
+WriteUnit = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """Единственный писатель SQLite с групповым коммитом.
+
+    Единицы записи складываются в asyncio-очередь, фоновая задача забирает
+    всё накопившееся (до max_batch_size), выполняет каждую единицу в своём
+    SAVEPOINT и фиксирует пачку одним коммитом. Ошибка одной единицы
+    откатывает только её SAVEPOINT и возвращается её вызывающему.
+    Единица выполняется в контексте вызывающего: её запросы попадают в
+    статистику его запроса (collect_queries).
+    """
+
+    def __init__(self, session_maker: async_sessionmaker,
+                 max_batch_size: int = 100):
+        self.session_maker = session_maker
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.units = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.is_running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, unit: WriteUnit) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((unit, future, contextvars.copy_context()))
+        return await future
+
+    async def run(self, session: AsyncSession, unit: WriteUnit) -> Any:
+        # Несколько вызовов репозиториев одной транзакцией: единицей
+        # группового коммита, а без очереди (тесты, скрипты) — в переданной
+        # сессии, где репозитории только делают flush до общего коммита
+        if self.is_running:
+            return await self.submit(unit)
+        session.info[GROUP_COMMIT_KEY] = True
+        try:
+            result = await unit(session)
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            session.info.pop(GROUP_COMMIT_KEY, None)
+        return result
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch):
+        outcomes = []
+        try:
+            async with self.session_maker() as session:
+                session.info[GROUP_COMMIT_KEY] = True
+                for unit, future, context in batch:
+                    if future.done():
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            # BEGIN и SAVEPOINT — запросы самой очереди: не
+                            # откладываем их до первого запроса единицы
+                            await session.connection()
+                            result = await asyncio.create_task(
+                                unit(session), context=context
+                            )
+                            outcomes.append((future, result))
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                await session.commit()
+        except Exception as e:
+            logger.exception("Group commit failed")
+            for future, _ in outcomes:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.units += len(outcomes)
+        for future, result in outcomes:
+            if not future.done():
+                future.set_result(result)
@@ -1,6 +1,7 @@
 from database.repositories import (UserRepository, TaskRepository,
                                    TaskChatRepository, TeamRepository,
-                                   MeetingRepository)
+                                   MeetingRepository, CalendarRepository,
+                                   SearchRepository)
 
 
 def get_user_repo():
@@ -21,3 +22,11 @@ def get_team_repo():
 
 def get_meeting_repo():
     return MeetingRepository()
+
+
+def get_calendar_repo():
+    return CalendarRepository()
+
+
+def get_search_repo():
+    return SearchRepository()
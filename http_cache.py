@@ -0,0 +1,97 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterable, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+
+
+# Вместе с процессом меняются шаблоны и код: страница, отданная прошлой
+# версией приложения, не считается актуальной
+STARTED_AT = datetime.now(timezone.utc).replace(microsecond=0)
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class Validator(NamedTuple):
+    etag: str
+    last_modified: datetime
+
+
+def is_not_modified(headers, etag: str, last_modified: datetime) -> bool:
+    # Сравнение слабое (RFC 9110, 13.1.2): для условного GET этого
+    # достаточно, префикс W/ не учитывается ни у одной из сторон
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        return "*" in candidates or etag.removeprefix("W/") in candidates
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+def http_date(value: datetime) -> str:
+    return formatdate(value.timestamp(), usegmt=True)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite возвращает CURRENT_TIMESTAMP без зоны, но в UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def data_validator(key: Iterable, parts: Iterable) -> Validator:
+    """Валидатор ответа по версиям данных, из которых он собран.
+
+    parts — значения из дешёвых запросов (version, count, max(id),
+    max(updated_at) ...), key — от чего ещё зависит ответ. Last-Modified —
+    самый поздний updated_at среди parts.
+    """
+    parts = tuple(parts)
+    digest = hashlib.sha1(repr((
+        int(STARTED_AT.timestamp()), tuple(key), parts
+    )).encode()).hexdigest()[:24]
+    stamps = [_as_utc(part) for part in parts if isinstance(part, datetime)]
+    stamps.append(STARTED_AT)
+    # Ответ собирается из нескольких запросов: ETag слабый
+    return Validator(f'W/"{digest}"', max(stamps))
+
+
+def page_validator(user, parts: Iterable) -> Validator:
+    # Страница зависит и от того, кто её смотрит: в ETag входят id, версия
+    # и роль пользователя, в Last-Modified — его updated_at
+    return data_validator(
+        (user.id, user.version, user.role), (*parts, user.updated_at)
+    )
+
+
+def cache_headers(validator: Validator) -> dict:
+    # no-cache: браузер хранит страницу, но каждый раз переспрашивает
+    return {
+        "ETag": validator.etag,
+        "Last-Modified": http_date(validator.last_modified),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+
+def not_modified(request: Request,
+                 validator: Validator) -> Optional[Response]:
+    # Ответ 304, если у клиента актуальная копия; иначе None — страницу
+    # нужно собрать и отдать с cache_headers
+    if not is_not_modified(request.headers, *validator):
+        return None
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cache_headers(validator)
+    )
@@ -3,9 +3,9 @@ import logging
 
 from fastapi import FastAPI, HTTPException, Request, status
 from contextlib import asynccontextmanager
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from dotenv import load_dotenv
 
@@ -18,9 +18,17 @@ from applications.task.router import router as task_router
 from applications.team.router import router as team_router
 from applications.meeting.router import router as meeting_router
 from applications.calendar.router import router as calendar_router
+from applications.search.router import router as search_router
 from applications.admin_panel.router import router as admin_router
+from applications.api.router import router as api_router
 
-from database.database import engine, Base
+from database.database import (engine, admin_session_maker, Base,
+                               write_queue)
+from database.instrumentation import collect_queries
+from database.password_hasher import PasswordHasherBusy, password_hasher
+from pubsub import hub
+from templating import precompile_templates, templates
+from utils import is_api
 
 
 load_dotenv()
@@ -35,15 +43,65 @@ async def lifespan(app):
     if MODE == "DEV":
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+    precompile_templates()
+    await write_queue.start()
+    await hub.start()
     yield
+    await hub.stop()
+    await write_queue.stop()
+    password_hasher.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
-templates = Jinja2Templates(directory="templates")
+
+
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    with collect_queries() as stats:
+        response = await call_next(request)
+
+    # В заголовках — запросы до начала ответа. Потоковые страницы читают
+    # строки уже после заголовков, поэтому итог пишется в лог, когда
+    # отдано всё тело
+    elapsed_ms = stats.total_time * 1000
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Query-Time"] = f"{elapsed_ms:.2f}ms"
+
+    body_iterator = response.body_iterator
+
+    async def body_with_stats():
+        async for chunk in body_iterator:
+            yield chunk
+        log_query_stats(request, stats)
+
+    response.body_iterator = body_with_stats()
+    return response
+
+
+def log_query_stats(request: Request, stats):
+    logger.info(
+        "%s %s: %d SQL queries in %.2f ms",
+        request.method, request.url.path, stats.count,
+        stats.total_time * 1000
+    )
+    for statement, count in stats.repeated():
+        logger.warning(
+            "Possible N+1 on %s %s: %d x %s",
+            request.method, request.url.path, count, statement
+        )
+
+
+def api_error(exc: StarletteHTTPException) -> ORJSONResponse:
+    return ORJSONResponse(
+        {"detail": exc.detail}, status_code=exc.status_code,
+        headers=exc.headers
+    )
 
 
 @app.exception_handler(status.HTTP_401_UNAUTHORIZED)
 async def unauthorized_handler(request: Request, exc: HTTPException):
+    if is_api(request):
+        return api_error(exc)
     return RedirectResponse(
         "/auth/login", status_code=status.HTTP_303_SEE_OTHER
     )
@@ -51,6 +109,8 @@ async def unauthorized_handler(request: Request, exc: HTTPException):
 
 @app.exception_handler(status.HTTP_404_NOT_FOUND)
 async def not_found_exception_handler(request: Request, exc: HTTPException):
+    if is_api(request):
+        return api_error(exc)
     logger.warning(
         "404 Not Found: %s %s",
         request.method,
@@ -72,6 +132,11 @@ async def not_found_exception_handler(request: Request, exc: HTTPException):
 async def validation_exception_handler(
     request: Request, exc: RequestValidationError
 ):
+    if is_api(request):
+        return ORJSONResponse(
+            {"detail": jsonable_encoder(exc.errors())},
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
     return templates.TemplateResponse(
         "errors/400.html",
         {"request": request, "error": exc.errors()},
@@ -79,10 +144,26 @@ async def validation_exception_handler(
     )
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(
+    request: Request, exc: PasswordHasherBusy
+):
+    return templates.TemplateResponse(
+        "errors/other.html",
+        {"request": request, "error": StarletteHTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, str(exc)
+        )},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"}
+    )
+
+
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(
     request: Request, exc: StarletteHTTPException
 ):
+    if is_api(request):
+        return api_error(exc)
     if exc.status_code == status.HTTP_403_FORBIDDEN:
         return templates.TemplateResponse(
             "errors/403.html",
@@ -102,6 +183,10 @@ app.include_router(task_router)
 app.include_router(team_router)
 app.include_router(meeting_router)
 app.include_router(calendar_router)
+app.include_router(search_router)
 app.include_router(admin_router)
+app.include_router(api_router)
 
-setup_admin(app, engine)
+# Страницы админки читают пул читателей: писатель с BEGIN IMMEDIATE
+# нужен только для записи (см. WriterModelView)
+setup_admin(app, admin_session_maker)
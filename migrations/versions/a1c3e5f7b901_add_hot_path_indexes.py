@@ -0,0 +1,44 @@
+"""add hot path indexes
+
+Revision ID: a1c3e5f7b901
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c3e5f7b901'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_tasks_creator', 'tasks', ['creator']),
+    ('ix_tasks_performer_deadline', 'tasks',
+     ['performer', 'deadline', 'status']),
+    ('ix_task_chat_task_id_created_at', 'task_chat',
+     ['task_id', 'created_at']),
+    ('ix_user_teams_team_id', 'user_teams', ['team_id']),
+    ('ix_user_teams_user_id', 'user_teams', ['user_id']),
+    ('ix_meeting_participants_user_id', 'meeting_participants',
+     ['user_id', 'meeting_id']),
+    ('ix_meeting_date', 'meeting', ['date']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # В DEV таблицы (и индексы) уже создал create_all
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,76 @@
+"""add user search columns
+
+Revision ID: a7c9e1f3b568
+Revises: f6b8d0e2a457
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1f3b568'
+down_revision: Union[str, None] = 'f6b8d0e2a457'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Колонка пользователя -> колонка с её ключом поиска (см. User)
+SEARCH_COLUMNS = {'name': 'name_search', 'lastname': 'lastname_search'}
+LENGTHS = {'name': 20, 'lastname': 30}
+
+
+def _fold(value):
+    return value.casefold() if value is not None else None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column, search_column in SEARCH_COLUMNS.items():
+        op.add_column('users', sa.Column(
+            search_column, sa.String(LENGTHS[column])
+        ))
+
+    # casefold есть только в Python: ключи заполняются построчно
+    connection = op.get_bind()
+    users = connection.execute(
+        sa.text("SELECT id, name, lastname FROM users")
+    ).all()
+    if users:
+        connection.execute(
+            sa.text(
+                "UPDATE users SET name_search = :name_search, "
+                "lastname_search = :lastname_search WHERE id = :id"
+            ),
+            [
+                {"id": user.id, "name_search": _fold(user.name),
+                 "lastname_search": _fold(user.lastname)}
+                for user in users
+            ]
+        )
+
+    for column, search_column in SEARCH_COLUMNS.items():
+        op.drop_index(
+            f'ix_users_{column}_nocase', table_name='users', if_exists=True
+        )
+        op.create_index(
+            f'ix_users_{search_column}', 'users',
+            [sa.text(f'{search_column} COLLATE NOCASE')],
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column, search_column in reversed(SEARCH_COLUMNS.items()):
+        op.drop_index(
+            f'ix_users_{search_column}', table_name='users', if_exists=True
+        )
+        op.create_index(
+            f'ix_users_{column}_nocase', 'users',
+            [sa.text(f'{column} COLLATE NOCASE')],
+            if_not_exists=True
+        )
+        op.drop_column('users', search_column)
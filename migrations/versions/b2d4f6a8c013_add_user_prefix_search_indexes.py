@@ -0,0 +1,39 @@
+"""add user prefix search indexes
+
+Revision ID: b2d4f6a8c013
+Revises: a1c3e5f7b901
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c013'
+down_revision: Union[str, None] = 'a1c3e5f7b901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = ['name', 'lastname', 'email']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in COLUMNS:
+        op.create_index(
+            f'ix_users_{column}_nocase', 'users',
+            [sa.text(f'{column} COLLATE NOCASE')],
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(COLUMNS):
+        op.drop_index(
+            f'ix_users_{column}_nocase', table_name='users', if_exists=True
+        )
@@ -0,0 +1,32 @@
+"""add time span rtree
+
+Revision ID: d4f6b8c0e235
+Revises: c3e5a7b9d124
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from database.spans import (SPAN_INDEX_BACKFILL, SPAN_INDEX_DDL,
+                            SPAN_INDEX_DROP)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6b8c0e235'
+down_revision: Union[str, None] = 'c3e5a7b9d124'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for statement in SPAN_INDEX_DDL + SPAN_INDEX_BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in SPAN_INDEX_DROP:
+        op.execute(statement)
@@ -0,0 +1,32 @@
+"""add fulltext search
+
+Revision ID: e5a7c9d1f346
+Revises: d4f6b8c0e235
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from database.fts import (SEARCH_INDEX_BACKFILL, SEARCH_INDEX_DDL,
+                          SEARCH_INDEX_DROP)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9d1f346'
+down_revision: Union[str, None] = 'd4f6b8c0e235'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for statement in SEARCH_INDEX_DDL + SEARCH_INDEX_BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in SEARCH_INDEX_DROP:
+        op.execute(statement)
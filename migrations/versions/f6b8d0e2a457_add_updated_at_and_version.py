@@ -0,0 +1,47 @@
+"""add updated_at and version
+
+Revision ID: f6b8d0e2a457
+Revises: e5a7c9d1f346
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d0e2a457'
+down_revision: Union[str, None] = 'e5a7c9d1f346'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('users', 'tasks', 'task_chat', 'teams', 'meeting')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Обычный ALTER TABLE, без пересоздания таблиц: на tasks, task_chat,
+    # meeting и teams висят триггеры поиска и R*Tree. SQLite не добавляет
+    # колонку с CURRENT_TIMESTAMP по умолчанию, поэтому updated_at
+    # заполняется отдельно, а для новых строк его ставит ORM
+    for table in VERSIONED_TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime()))
+        op.add_column(table, sa.Column(
+            'version', sa.Integer(), nullable=False, server_default='1'
+        ))
+    for table in ('tasks', 'task_chat'):
+        op.execute(
+            f"UPDATE {table} "
+            "SET updated_at = coalesce(created_at, CURRENT_TIMESTAMP)"
+        )
+    for table in ('users', 'teams', 'meeting'):
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in VERSIONED_TABLES:
+        op.drop_column(table, 'version')
+        op.drop_column(table, 'updated_at')
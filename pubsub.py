@@ -0,0 +1,195 @@
+import asyncio
+import contextlib
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Сколько событий может ждать один подписчик; кто не успевает их
+# забирать, отключается, а не копит память и не тормозит остальных
+SUBSCRIBER_QUEUE_SIZE = 64
+
+Handler = Callable[[str, str], Awaitable[None]]
+
+_CLOSED = object()
+
+
+class Broker(ABC):
+    """Транспорт событий между процессами (воркерами uvicorn).
+
+    Хаб каждого воркера публикует через брокер и получает от него все
+    сообщения, включая свои. Сообщения — строки JSON, поэтому реализация
+    поверх Redis pub/sub, NATS и т.п. только пересылает их по каналу.
+    """
+
+    @abstractmethod
+    async def subscribe(self, handler: Handler):
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, handler: Handler):
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str):
+        ...
+
+
+class LocalBroker(Broker):
+    """Брокер в памяти процесса: один воркер или тесты (несколько хабов
+    на одном LocalBroker ведут себя как воркеры с общим брокером)."""
+
+    def __init__(self):
+        self._handlers = []
+
+    async def subscribe(self, handler: Handler):
+        self._handlers.append(handler)
+
+    async def unsubscribe(self, handler: Handler):
+        with contextlib.suppress(ValueError):
+            self._handlers.remove(handler)
+
+    async def publish(self, channel: str, message: str):
+        for handler in list(self._handlers):
+            await handler(channel, message)
+
+
+class Subscription:
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.evicted = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def offer(self, event: Any) -> bool:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self):
+        # Очередь может быть полна: освобождаем её под маркер закрытия,
+        # недоставленные события всё равно уже не нужны
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._queue.get()
+        if event is _CLOSED:
+            raise StopAsyncIteration
+        return event
+
+
+class Hub:
+    """Процессный pub/sub: раздаёт события подписчикам каналов.
+
+    У каждого подписчика своя ограниченная очередь. Переполнение значит,
+    что клиент не успевает: его подписка закрывается с evicted=True,
+    публикация при этом никогда не ждёт.
+    """
+
+    def __init__(self, broker: Optional[Broker] = None,
+                 queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.broker = broker or LocalBroker()
+        self.queue_size = queue_size
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+        self._channels = defaultdict(set)
+        self._started = False
+        self._tasks = set()
+
+    async def start(self):
+        if not self._started:
+            self._started = True
+            await self.broker.subscribe(self._deliver)
+
+    async def stop(self):
+        if self._started:
+            self._started = False
+            await self.broker.unsubscribe(self._deliver)
+        for subscriptions in self._channels.values():
+            for subscription in subscriptions:
+                subscription.close()
+        self._channels.clear()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        await self.start()
+        subscription = Subscription(channel, self.queue_size)
+        self._channels[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._remove(subscription)
+
+    def subscribers(self, channel: str) -> int:
+        return len(self._channels.get(channel, ()))
+
+    async def publish(self, channel: str, event: Any):
+        self.published += 1
+        await self.broker.publish(channel, json.dumps(event, default=str))
+
+    def publish_soon(self, channel: str, event: Any):
+        # Для синхронных обработчиков (after_commit): публикация уходит
+        # задачей в текущий цикл событий
+        task = asyncio.get_running_loop().create_task(
+            self.publish(channel, event)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._publish_done)
+
+    def _publish_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Event publish failed", exc_info=task.exception())
+
+    async def _deliver(self, channel: str, message: str):
+        subscriptions = self._channels.get(channel)
+        if not subscriptions:
+            return
+        event = json.loads(message)
+        for subscription in list(subscriptions):
+            if subscription.offer(event):
+                self.delivered += 1
+            else:
+                self._evict(subscription)
+
+    def _evict(self, subscription: Subscription):
+        self.evicted += 1
+        logger.warning(
+            "Slow subscriber on %s evicted: %d events pending",
+            subscription.channel, self.queue_size
+        )
+        subscription.evicted = True
+        self._remove(subscription)
+        subscription.close()
+
+    def _remove(self, subscription: Subscription):
+        subscriptions = self._channels.get(subscription.channel)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._channels[subscription.channel]
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(map(len, self._channels.values())),
+            "published": self.published,
+            "delivered": self.delivered,
+            "evicted": self.evicted,
+        }
+
+
+# События задач (чат, статус, оценка) для подключённых страниц
+hub = Hub()
@@ -0,0 +1,62 @@
+import logging
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = "templates"
+
+# Скомпилированный байткод шаблонов переживает перезапуск: ключ — имя и
+# контрольная сумма исходника, поэтому изменённый шаблон просто
+# компилируется заново. Без настройки — каталог во временной папке
+BYTECODE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR")
+
+
+def create_environment(
+    cache_dir: Optional[str] = BYTECODE_CACHE_DIR
+) -> Environment:
+    # Проверка mtime на каждом рендере нужна только при разработке
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=os.environ.get("MODE") == "DEV",
+        bytecode_cache=FileSystemBytecodeCache(cache_dir),
+    )
+
+
+# Общее окружение для всех роутеров и обработчиков ошибок: base.html и
+# шаблоны ошибок компилируются и кэшируются один раз на процесс
+templates = Jinja2Templates(env=create_environment())
+
+# Асинхронное окружение для потокового рендера (generate_async) тех же
+# шаблонов. Код async-шаблона отличается от обычного, поэтому байткод
+# лежит в кэше под другим именем
+stream_env = templates.env.overlay(
+    enable_async=True,
+    bytecode_cache=FileSystemBytecodeCache(
+        BYTECODE_CACHE_DIR, "__jinja2_async_%s.cache"
+    ),
+)
+
+
+def precompile_templates(env: Optional[Environment] = None) -> int:
+    # Вызывается из lifespan: первый запрос после деплоя не платит за
+    # компиляцию, а синтаксическая ошибка в шаблоне валит старт
+    environments = [env] if env else [templates.env, stream_env]
+    started = time.perf_counter()
+    names = environments[0].list_templates()
+    for environment in environments:
+        for name in names:
+            environment.get_template(name)
+    logger.info(
+        "Precompiled %d templates in %.1f ms",
+        len(names), (time.perf_counter() - started) * 1000
+    )
+    return len(names)
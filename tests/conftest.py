@@ -0,0 +1,58 @@
+import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.database import Base
+from database.models import (Meeting, MeetingParticipant, Task, TaskChat,
+                             Team, User, UserTeam)
+
+
+NOW = datetime.datetime(2026, 1, 15, 12, 0)
+
+
+@pytest.fixture
+async def seeded_db(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'seeded.sqlite3'}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_maker() as session:
+        users = [
+            User(id=i, name=f"User{i}", lastname="Test",
+                 email=f"user{i}@example.com", password_hash="x")
+            for i in range(1, 51)
+        ]
+        session.add_all(users)
+        for i in range(1, 501):
+            session.add(Task(
+                id=i, creator=i % 5 + 1, performer=i % 50 + 1,
+                description=f"Task {i}", status="open",
+                deadline=NOW + datetime.timedelta(hours=i)
+            ))
+            session.add(TaskChat(user_id=i % 50 + 1, task_id=i, text="hi"))
+        for i in range(1, 11):
+            session.add(Team(id=i, name=f"Team {i}"))
+            for user_id in range(i, 51, 10):
+                session.add(UserTeam(user_id=user_id, team_id=i))
+        for i in range(1, 101):
+            session.add(Meeting(
+                id=i, description=f"Meeting {i}", creator_id=1,
+                date=NOW + datetime.timedelta(hours=i)
+            ))
+            session.add(MeetingParticipant(meeting_id=i, user_id=i % 50 + 1))
+        await session.commit()
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    yield engine, session_maker, statements
+    await engine.dispose()
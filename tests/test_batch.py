@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from applications.api.batch import BatchRunner
+from applications.api.schemas import BatchIn
+from database.database import use_explicit_transactions, write_queue
+from database.models import Task, TaskChat, User
+from database.repositories import (TaskChatRepository, TaskRepository,
+                                   task_channel)
+from pubsub import hub
+
+
+def batch(*operations, atomic=False) -> BatchIn:
+    return BatchIn.model_validate(
+        {"operations": list(operations), "atomic": atomic}
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_in_one_transaction(seeded_db):
+    engine, session_maker, _ = seeded_db
+    # SAVEPOINT-ы операций работают, как у писателя, только при явном BEGIN
+    use_explicit_transactions(engine)
+    await engine.dispose()
+    async with session_maker() as session:
+        # Задача 1: создатель 2, исполнитель 2; задача 2 пользователю 2 чужая
+        user = await session.get(User, 2)
+        runner = BatchRunner(user, TaskRepository(), TaskChatRepository())
+
+        partial = await runner.run(session, batch(
+            {"op": "change_status", "task_id": 1, "status": "in_work"},
+            {"op": "add_comment", "task_id": 2, "text": "чужая"},
+            {"op": "add_comment", "task_id": 1, "text": "готово"},
+            {"op": "create_task", "performer": 3, "description": "x",
+             "deadline": "2026-02-01T10:00:00"},
+        ))
+        aborted = await runner.run(session, batch(
+            {"op": "change_assessment", "task_id": 1, "assessment": 5},
+            {"op": "change_status", "task_id": 10_000, "status": "open"},
+            {"op": "add_comment", "task_id": 1, "text": "не дойдёт"},
+            atomic=True
+        ))
+
+    assert partial["committed"] is True
+    assert [r["status"] for r in partial["results"]] == [200, 403, 201, 403]
+    assert partial["results"][0]["result"]["status"] == "in_work"
+    assert partial["results"][2]["result"]["text"] == "готово"
+
+    assert aborted["committed"] is False
+    assert [r["status"] for r in aborted["results"]] == [424, 404, 424]
+
+    async with session_maker() as session:
+        task = await session.get(Task, 1)
+        messages = await session.scalar(
+            select(func.count(TaskChat.id)).where(TaskChat.task_id == 1)
+        )
+    assert (task.status.code, task.assessment, task.version) == (
+        "in_work", None, 2
+    )
+    assert messages == 2
+
+
+@pytest.mark.asyncio
+async def test_aborted_batch_in_group_commit_has_no_side_effects(
+    seeded_db, monkeypatch
+):
+    engine, session_maker, _ = seeded_db
+    use_explicit_transactions(engine)
+    await engine.dispose()
+    # Как в проде: пакет — единица группового коммита рядом с другими
+    monkeypatch.setattr(write_queue, "session_maker", session_maker)
+
+    async with session_maker() as session:
+        runner = BatchRunner(
+            await session.get(User, 2), TaskRepository(), TaskChatRepository()
+        )
+
+    async with hub.subscribe(task_channel(1)) as aborted_events, \
+            hub.subscribe(task_channel(6)) as committed_events:
+        await write_queue.start()
+        try:
+            async with session_maker() as session:
+                aborted, committed = await asyncio.gather(
+                    runner.run(session, batch(
+                        {"op": "add_comment", "task_id": 1, "text": "нет"},
+                        {"op": "change_status", "task_id": 1,
+                         "status": "completed"},
+                        {"op": "change_status", "task_id": 10_000,
+                         "status": "open"},
+                        atomic=True
+                    )),
+                    runner.run(session, batch(
+                        {"op": "add_comment", "task_id": 6, "text": "да"},
+                    ))
+                )
+        finally:
+            await write_queue.stop()
+
+        assert aborted["committed"] is False
+        assert committed["committed"] is True
+        event = await asyncio.wait_for(committed_events.__anext__(), 1)
+        assert event["text"] == "да"
+        await asyncio.sleep(0)
+        # Откаченный пакет ничего не публикует
+        assert aborted_events._queue.empty()
+
+    async with session_maker() as session:
+        task = await session.get(Task, 1)
+        messages = await session.scalar(
+            select(func.count(TaskChat.id)).where(TaskChat.task_id == 1)
+        )
+    assert (task.status.code, task.version, messages) == ("open", 1, 1)
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete
+from starlette.requests import Request
+
+from applications.auth.security import (CurrentUser, create_access_token,
+                                        get_current_user)
+from cache import TTLCache, user_cache
+from database.database import async_session_maker
+from database.instrumentation import collect_queries
+from database.models import User
+from database.repositories import UserRepository
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expiry_and_lru():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # вытесняет "b": "a" читали последним
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    timer.now = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 2, "misses": 2, "size": 1}
+
+
+def test_ttl_cache_skips_value_read_before_invalidate():
+    cache = TTLCache()
+    # Запрос снял поколение и читает базу; тем временем коммит сбросил ключ
+    generation = cache.generation(1)
+    cache.invalidate(1)
+    cache.set(1, "stale", generation)
+    assert cache.get(1) is None
+
+    cache.set(1, "fresh", cache.generation(1))
+    assert cache.get(1) == "fresh"
+    generation = cache.generation(1)
+    cache.clear()
+    cache.set(1, "stale", generation)
+    assert cache.get(1) is None
+
+
+def _request_with_token(user_id: int) -> Request:
+    token = create_access_token({"sub": str(user_id)}, timedelta(minutes=5))
+    return Request({
+        "type": "http",
+        "headers": [(b"cookie", f'access_token="Bearer {token}"'.encode())],
+    })
+
+
+@pytest.mark.asyncio
+async def test_current_user_cache_invalidated_on_update():
+    user_repo = UserRepository()
+    current_user = get_current_user()
+    async with async_session_maker() as session:
+        await session.execute(
+            delete(User).where(User.email == "cached@example.com")
+        )
+        user = await user_repo.add(session, {
+            "name": "Cached", "lastname": "User",
+            "email": "cached@example.com", "password_hash": "x"
+        })
+        user_cache.clear()
+        session.expunge_all()
+        request = _request_with_token(user.id)
+
+        try:
+            with collect_queries() as stats:
+                first = await current_user(request, user_repo, session)
+                second = await current_user(request, user_repo, session)
+            assert first is second
+            assert stats.count == 1
+            # В кэше снимок, а не ORM-объект сессии
+            assert isinstance(first, CurrentUser)
+            assert first.role == "user"
+
+            await user_repo.update(session, user.id, {"name": "Renamed"})
+            assert user.id not in user_cache._data
+            session.expunge_all()
+            refreshed = await current_user(request, user_repo, session)
+            assert refreshed.name == "Renamed"
+        finally:
+            await user_repo.delete(session, user.id)
+    assert user.id not in user_cache._data
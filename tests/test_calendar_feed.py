@@ -0,0 +1,23 @@
+import pytest
+
+from applications.calendar.feed import ICS_LINE_LIMIT, stream_feed
+
+
+@pytest.mark.asyncio
+async def test_feed_streams_meetings_and_deadlines(seeded_db):
+    _, session_maker, _ = seeded_db
+
+    chunks = [
+        chunk async for chunk in stream_feed(2, "test", session_maker)
+    ]
+    feed = "".join(chunks)
+
+    # Пользователь 2: встречи 1 и 51, задачи 1, 51, ..., 451
+    assert feed.count("BEGIN:VEVENT") == 2 + 10
+    assert "UID:meeting-51@test" in feed
+    assert "UID:task-451@test" in feed
+    assert len(chunks) == feed.count("BEGIN:VEVENT") + 2
+    assert feed.endswith("END:VCALENDAR\r\n")
+    assert all(
+        len(line.encode()) <= ICS_LINE_LIMIT for line in feed.split("\r\n")
+    )
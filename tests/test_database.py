@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.exc import OperationalError
+
+from database.database import (admin_session_maker, async_session_maker,
+                               read_session_maker)
+from database.models import Team
+from database.repositories import TeamRepository
+from database.write_queue import WriteQueue
+
+
+@pytest.mark.asyncio
+async def test_writer_pragmas():
+    async with async_session_maker() as session:
+        journal_mode = await session.scalar(text("PRAGMA journal_mode"))
+        synchronous = await session.scalar(text("PRAGMA synchronous"))
+        busy_timeout = await session.scalar(text("PRAGMA busy_timeout"))
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == 5000
+
+
+@pytest.mark.asyncio
+async def test_reader_is_query_only():
+    async with read_session_maker() as session:
+        assert await session.scalar(text("PRAGMA query_only")) == 1
+        with pytest.raises(OperationalError):
+            await session.execute(
+                text("CREATE TABLE read_only_probe (id INTEGER)")
+            )
+
+
+@pytest.mark.asyncio
+async def test_write_queue_group_commit():
+    queue = WriteQueue(async_session_maker)
+    team_repo = TeamRepository()
+    await queue.start()
+    try:
+        async def add_team(session, name):
+            return await team_repo.add(session, name)
+
+        async def fail(session):
+            await session.execute(
+                delete(Team).where(Team.name.like("group-commit-%"))
+            )
+            raise ValueError("boom")
+
+        units = [
+            queue.submit(lambda s, i=i: add_team(s, f"group-commit-{i}"))
+            for i in range(10)
+        ]
+        units.append(queue.submit(fail))
+        results = await asyncio.gather(*units, return_exceptions=True)
+    finally:
+        await queue.stop()
+
+    assert isinstance(results[-1], ValueError)
+    assert all(isinstance(team, Team) for team in results[:-1])
+    assert queue.units == 10
+    assert queue.batches < 10
+
+    async with async_session_maker() as session:
+        count = await session.scalar(
+            select(func.count(Team.id))
+            .where(Team.name.like("group-commit-%"))
+        )
+        await session.execute(
+            delete(Team).where(Team.name.like("group-commit-%"))
+        )
+        await session.commit()
+    assert count == 10
+
+
+@pytest.mark.asyncio
+async def test_admin_session_routes_writes_to_writer():
+    async with admin_session_maker() as session:
+        # Выборки админки читает пул читателей
+        assert await session.scalar(text("PRAGMA query_only")) == 1
+        team = Team(name="admin-routing")
+        session.add(team)
+        await session.commit()
+        await session.delete(team)
+        await session.commit()
+
+    async with read_session_maker() as session:
+        count = await session.scalar(
+            select(func.count(Team.id)).where(Team.name == "admin-routing")
+        )
+    assert count == 0
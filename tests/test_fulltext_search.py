@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import delete, update
+
+from database.fts import match_terms
+from database.models import Meeting, Task, TaskChat, Team
+from database.repositories import SearchRepository
+
+
+async def search(session_maker, user_id, query, **kwargs):
+    async with session_maker() as session:
+        page = await SearchRepository().search(session, user_id, query,
+                                               **kwargs)
+    return {(item.type, item.id) for item in page.items}, page
+
+
+def test_match_terms_quotes_user_input():
+    assert match_terms('отчёт NEAR "x"*') == '"отчёт" "near" "x"'
+    assert match_terms("  ,; ") is None
+    assert match_terms("отчёт и план") == '"отчёт" "план"'
+    assert match_terms("и") == '"и"'
+
+
+@pytest.mark.asyncio
+async def test_search_respects_task_visibility(seeded_db):
+    _, session_maker, _ = seeded_db
+    # Task 7: creator 3, performer 8
+    found, _ = await search(session_maker, 8, "task 7")
+    assert ("task", 7) in found
+    found, _ = await search(session_maker, 3, "task 7")
+    assert ("task", 7) in found
+    found, _ = await search(session_maker, 9, "task 7")
+    assert ("task", 7) not in found
+
+
+@pytest.mark.asyncio
+async def test_search_follows_writes(seeded_db):
+    _, session_maker, _ = seeded_db
+    async with session_maker() as session:
+        session.add(TaskChat(user_id=8, task_id=7, text="квартальный отчёт"))
+        await session.execute(
+            update(Meeting).where(Meeting.id == 7)
+            .values(description="Разбор: отчёт за квартал")
+        )
+        await session.execute(
+            update(Team).where(Team.id == 8).values(name="Отчёт и аналитика")
+        )
+        await session.commit()
+
+    found, page = await search(session_maker, 8, "отчёт")
+    assert found == {("message", 501), ("meeting", 7), ("team", 8)}
+    message = next(item for item in page.items if item.type == "message")
+    assert message.target_id == 7
+    assert "\x02отчёт\x03" in message.snippet
+
+    # Смена исполнителя переносит видимость чата задачи
+    async with session_maker() as session:
+        await session.execute(
+            update(Task).where(Task.id == 7).values(performer=9)
+        )
+        await session.commit()
+    found, _ = await search(session_maker, 8, "квартальный")
+    assert found == set()
+    found, _ = await search(session_maker, 9, "квартальный")
+    assert found == {("message", 501)}
+
+    async with session_maker() as session:
+        await session.execute(delete(Task).where(Task.id == 7))
+        await session.commit()
+    found, _ = await search(session_maker, 9, "квартальный")
+    assert found == set()
+
+
+@pytest.mark.asyncio
+async def test_search_meetings_and_teams_for_members_only(seeded_db):
+    _, session_maker, _ = seeded_db
+    # Meeting 7: participant 8; team 8: users 8, 18, ...
+    found, _ = await search(session_maker, 9, "meeting 7")
+    assert ("meeting", 7) not in found
+    found, _ = await search(session_maker, 8, "meeting 7")
+    assert ("meeting", 7) in found
+    found, _ = await search(session_maker, 9, "team 8")
+    assert ("team", 8) not in found
+    found, _ = await search(session_maker, 9, "team 8", is_admin=True)
+    assert ("team", 8) in found
+
+
+@pytest.mark.asyncio
+async def test_search_pagination(seeded_db):
+    _, session_maker, _ = seeded_db
+    # Пользователь 1 — создатель задач 5, 10, ..., 500
+    seen = []
+    cursor = None
+    while True:
+        async with session_maker() as session:
+            page = await SearchRepository().search(
+                session, 1, "task", cursor=cursor, limit=30
+            )
+        seen.extend((item.type, item.id) for item in page.items)
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+    assert len(seen) == len(set(seen))
+    assert {id for type, id in seen if type == "task"} == set(
+        range(5, 501, 5)
+    )
+
+    async with session_maker() as session:
+        back = await SearchRepository().search(session, 1, "task",
+                                               cursor=page.prev_cursor,
+                                               limit=30)
+    last = len(page.items)
+    assert [(i.type, i.id) for i in back.items] == seen[-last - 30:-last]
@@ -0,0 +1,103 @@
+import logging
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from main import app
+from applications.team.router import get_current_user_dep_admin
+from database.database import async_session_maker, read_session_maker
+from database.instrumentation import (START_TIME_KEY, collect_queries,
+                                      normalize_statement)
+from database.models import User
+from database.repositories import TeamRepository
+from database.write_queue import WriteQueue
+from dependencies import get_team_repo
+
+
+@pytest.fixture
+def real_team_repo():
+    app.dependency_overrides.clear()
+
+    async def _admin():
+        return User(id=1, email="admin@example.com", name="Admin",
+                    lastname="User", role="admin")
+
+    app.dependency_overrides[get_current_user_dep_admin] = _admin
+    app.dependency_overrides[get_team_repo] = TeamRepository
+    yield
+    app.dependency_overrides.clear()
+
+
+def test_normalize_statement_collapses_in_lists():
+    assert normalize_statement(
+        "SELECT * FROM users\n WHERE id IN (?, ?, ?)"
+    ) == "SELECT * FROM users WHERE id IN (?)"
+
+
+@pytest.mark.asyncio
+async def test_collect_queries_flags_n_plus_one():
+    async with read_session_maker() as session:
+        with collect_queries() as outer:
+            with collect_queries() as inner:
+                for user_id in range(1, 5):
+                    await session.execute(
+                        select(User).where(User.id == user_id)
+                    )
+
+    assert inner.count == outer.count == 4
+    assert inner.total_time > 0
+    [(statement, count)] = inner.repeated()
+    assert count == 4
+    assert statement.startswith("SELECT users.id")
+
+
+@pytest.mark.asyncio
+async def test_write_queue_units_count_for_caller():
+    queue = WriteQueue(async_session_maker)
+    await queue.start()
+    try:
+        with collect_queries() as stats:
+            await queue.submit(
+                lambda session: session.execute(select(User.id).limit(1))
+            )
+    finally:
+        await queue.stop()
+
+    # Единица выполнялась в задаче очереди, но запрос — вызывающего
+    assert stats.count == 1
+    assert normalize_statement(
+        next(iter(stats.statements))
+    ).startswith("SELECT users.id")
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_leaves_no_start_time():
+    async with read_session_maker() as session:
+        with collect_queries() as stats:
+            with pytest.raises(OperationalError):
+                await session.execute(text("SELECT * FROM missing_table"))
+            connection = await session.connection()
+            assert START_TIME_KEY not in connection.sync_connection.info
+            await session.execute(select(User.id).limit(1))
+
+    assert stats.count == 1
+
+
+@pytest.mark.asyncio
+async def test_query_count_header(real_team_repo, query_budget, caplog):
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+    caplog.set_level(logging.INFO, logger="main")
+    async with AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        with query_budget(1):
+            response = await client.get("/teams")
+
+    assert response.status_code == 200
+    # Список команд рендерится потоком: заголовки уходят до выборки,
+    # а итог по запросам попадает в лог после тела
+    assert response.headers["X-DB-Query-Count"] == "0"
+    assert response.headers["X-DB-Query-Time"].endswith("ms")
+    assert "GET /teams: 1 SQL queries" in caplog.text
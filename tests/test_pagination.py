@@ -0,0 +1,86 @@
+import pytest
+
+from database.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from database.repositories import MeetingRepository, TaskRepository
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor("next", [5])
+    assert decode_cursor(cursor) == ("next", [5])
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_paginate_forward_and_back(seeded_db):
+    _, session_maker, _ = seeded_db
+    task_repo = TaskRepository()
+
+    async with session_maker() as session:
+        pages = []
+        cursor = None
+        while True:
+            tasks = await task_repo.get_all_user_tasks(
+                session, 3, cursor=cursor, limit=15
+            )
+            pages.append([task.id for task in tasks["tasks"]])
+            cursor = tasks["page"].next_cursor
+            if not cursor:
+                break
+
+        back = await task_repo.get_all_user_tasks(
+            session, 3, cursor=tasks["page"].prev_cursor, limit=15
+        )
+
+    ids = [task_id for page in pages for task_id in page]
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids)) == 100
+    assert [task.id for task in back["tasks"]] == pages[-2]
+    assert back["page"].next_cursor and back["page"].prev_cursor
+
+
+@pytest.mark.asyncio
+async def test_paginate_limit_and_order_by(seeded_db):
+    _, session_maker, _ = seeded_db
+    async with session_maker() as session:
+        page = await MeetingRepository().paginate(session, limit=1000)
+        dated = await MeetingRepository().paginate(
+            session, limit=5, order_by=MeetingRepository().model.date
+        )
+        following = await MeetingRepository().paginate(
+            session, dated.next_cursor, limit=5,
+            order_by=MeetingRepository().model.date
+        )
+
+    assert len(page.items) == MAX_PAGE_SIZE
+    assert page.prev_cursor is None
+    dates = [m.date for m in dated.items + following.items]
+    assert dates == sorted(dates)
+
+
+@pytest.mark.asyncio
+async def test_stream_page_matches_fetch_page(seeded_db):
+    _, session_maker, _ = seeded_db
+    task_repo = TaskRepository()
+
+    async with session_maker() as session:
+        first = await task_repo.fetch_page(
+            session, task_repo.user_tasks_query(3, limit=15)
+        )
+        middle = await task_repo.fetch_page(
+            session, task_repo.user_tasks_query(3, first.next_cursor, 15)
+        )
+        for cursor in (None, first.next_cursor, middle.prev_cursor):
+            query = task_repo.user_tasks_query(3, cursor, 15)
+            expected = await task_repo.fetch_page(session, query)
+            stream = task_repo.stream_page(session, query, batch_size=4)
+            # Курсоры появляются только после чтения строк
+            assert stream.next_cursor is None
+            items = [task async for task in stream]
+
+            assert [task.id for task in items] == [
+                task.id for task in expected.items
+            ]
+            assert items[0].performer_user is not None
+            assert stream.next_cursor == expected.next_cursor
+            assert stream.prev_cursor == expected.prev_cursor
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import pytest
+
+from database.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_off_loop():
+    hasher = PasswordHasher(max_workers=2)
+    try:
+        password_hash = await hasher.hash("secret-password")
+        assert await hasher.verify(password_hash, "secret-password")
+        assert not await hasher.verify(password_hash, "wrong-password")
+        # Ошибка KDF не считается выполненной операцией
+        with pytest.raises(ValueError):
+            await hasher._run(int, "not-a-number")
+    finally:
+        hasher.shutdown()
+    assert hasher.stats()["completed"] == 3
+    assert hasher.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_admission_limit_rejects_overflow():
+    hasher = PasswordHasher(max_workers=1, max_pending=2)
+    release = threading.Event()
+    try:
+        blocked = [
+            asyncio.create_task(hasher._run(release.wait)) for _ in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        assert hasher.pending == 2
+        assert hasher.queue_depth == 1
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.verify("hash", "password")
+        assert hasher.rejected == 1
+
+        release.set()
+        await asyncio.gather(*blocked)
+        assert hasher.pending == 0
+    finally:
+        release.set()
+        hasher.shutdown()
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from applications.admin_panel.views import TaskAdmin
+from database.database import use_explicit_transactions
+from database.models import Task, User
+from database.repositories import (TaskChatRepository, TaskRepository,
+                                   publish_on_commit, task_channel)
+from database.write_queue import WriteQueue
+from pubsub import Broker, Hub, LocalBroker, hub
+
+
+async def drain(subscription, count):
+    return [await asyncio.wait_for(subscription.__anext__(), 1)
+            for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_hub_fans_out_to_channel_subscribers():
+    events = Hub()
+    async with events.subscribe("task:1") as first, \
+            events.subscribe("task:1") as second, \
+            events.subscribe("task:2") as other:
+        await events.publish("task:1", {"type": "status", "status": "open"})
+        assert await drain(first, 1) == [{"type": "status", "status": "open"}]
+        assert await drain(second, 1) == [{"type": "status", "status": "open"}]
+        assert other._queue.empty()
+    assert events.subscribers("task:1") == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_evicted():
+    events = Hub(queue_size=3)
+    async with events.subscribe("task:1") as slow, \
+            events.subscribe("task:1") as fast:
+        for i in range(3):
+            await events.publish("task:1", {"n": i})
+            assert await drain(fast, 1) == [{"n": i}]
+        # Четвёртое событие не помещается в очередь медленного подписчика
+        await events.publish("task:1", {"n": 3})
+
+        assert slow.evicted and not fast.evicted
+        assert [event async for event in slow] == []
+        assert await drain(fast, 1) == [{"n": 3}]
+        assert events.subscribers("task:1") == 1
+    assert events.stats()["evicted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_share_events_through_broker():
+    broker = LocalBroker()
+    worker_a, worker_b = Hub(broker), Hub(broker)
+    async with worker_b.subscribe("task:5") as subscription:
+        await worker_a.publish("task:5", {"type": "comment", "id": 1})
+        assert await drain(subscription, 1) == [{"type": "comment", "id": 1}]
+
+    await worker_b.stop()
+    await worker_a.publish("task:5", {"type": "comment", "id": 2})
+    assert worker_b.stats()["delivered"] == 1
+
+
+def test_incomplete_broker_fails_on_creation():
+    class PublishOnly(Broker):
+        async def publish(self, channel, message):
+            pass
+
+    with pytest.raises(TypeError):
+        PublishOnly()
+
+
+@pytest.mark.asyncio
+async def test_repository_writes_publish_after_commit(seeded_db):
+    _, session_maker, _ = seeded_db
+    async with hub.subscribe(task_channel(7)) as subscription:
+        async with session_maker() as session:
+            await TaskChatRepository().add(session, {
+                "user_id": 8, "task_id": 7, "text": "Готово"
+            })
+            await TaskRepository().update_status(session, 7, "completed")
+
+        # Откат ничего не публикует
+        async with session_maker() as session:
+            publish_on_commit(session, task_channel(7), {"type": "draft"})
+            await session.rollback()
+
+        comment, status = await drain(subscription, 2)
+        assert comment["type"] == "comment"
+        assert comment["author"] == "User8 Test"
+        assert comment["text"] == "Готово"
+        assert comment["id"] and comment["created_at"]
+        assert status == {"type": "status", "status": "completed"}
+        await asyncio.sleep(0)
+        assert subscription._queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_admin_task_edit_publishes_status():
+    # Админка пишет мимо репозитория: событие шлёт её хук
+    task = Task(id=7, status="in_work", assessment=4)
+    async with hub.subscribe(task_channel(7)) as subscription:
+        await TaskAdmin().after_model_change({}, task, False, None)
+        await TaskAdmin().after_model_change({}, task, True, None)
+
+        assert await drain(subscription, 2) == [
+            {"type": "status", "status": "in_work"},
+            {"type": "assessment", "assessment": 4},
+        ]
+        await asyncio.sleep(0)
+        assert subscription._queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_unit_publishes_nothing(seeded_db):
+    engine, session_maker, _ = seeded_db
+    use_explicit_transactions(engine)
+    await engine.dispose()
+    queue = WriteQueue(session_maker)
+
+    async def comment(session):
+        return await TaskChatRepository().add(session, {
+            "user_id": 8, "task_id": 7, "text": "Готово"
+        })
+
+    async def fail_on_flush(session):
+        # Событие уже зарегистрировано, а SAVEPOINT единицы откатывается
+        await TaskRepository().update_status(session, 7, "completed")
+        session.add(User(email="user1@example.com", name="Dup",
+                         lastname="Test", password_hash="x"))
+        await session.flush()
+
+    async with hub.subscribe(task_channel(7)) as subscription:
+        await queue.start()
+        try:
+            results = await asyncio.gather(
+                queue.submit(comment), queue.submit(fail_on_flush),
+                return_exceptions=True
+            )
+        finally:
+            await queue.stop()
+
+        assert isinstance(results[1], IntegrityError)
+        [event] = await drain(subscription, 1)
+        assert event["type"] == "comment"
+        await asyncio.sleep(0)
+        assert subscription._queue.empty()
+
+    async with session_maker() as session:
+        assert (await session.get(Task, 7)).status.code == "open"
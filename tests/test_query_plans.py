@@ -0,0 +1,165 @@
+import datetime
+import re
+
+import pytest
+
+from database.pagination import NEXT, PREV, encode_cursor
+from database.repositories import (CalendarRepository, MeetingRepository,
+                                   SearchRepository, TaskChatRepository,
+                                   TaskRepository, TeamRepository,
+                                   UserRepository)
+from tests.conftest import NOW
+
+
+# Запросы, которые по смыслу читают всю таблицу
+FULL_SCAN_ALLOWED = {
+    "UserRepository.get_all",
+    "TeamRepository.get_all",
+}
+
+# R*Tree: "INDEX 1:" — поиск по rowid, "INDEX 2:<ограничения>" — по
+# координатам; "INDEX 2:" без ограничений — полный обход
+FULL_SCAN = re.compile(
+    r"\bSCAN (\w+)\b"
+    r"(?! USING (COVERING )?INDEX| VIRTUAL TABLE INDEX (1:|\d+:\S))"
+)
+
+REPOSITORY_QUERIES = {
+    "UserRepository.get": lambda s: UserRepository().get(s, 1),
+    "UserRepository.get_all": lambda s: UserRepository().get_all(s),
+    "UserRepository.get_not_in_meeting:cursor": (
+        lambda s: UserRepository().get_not_in_meeting(
+            s, 1, prefix="User1", cursor=encode_cursor(NEXT, [10])
+        )
+    ),
+    "UserRepository.get_not_in_team:cursor": (
+        lambda s: UserRepository().get_not_in_team(
+            s, 1, cursor=encode_cursor(NEXT, [10])
+        )
+    ),
+    "UserRepository.get_in_team:cursor": (
+        lambda s: UserRepository().get_in_team(
+            s, 1, ("email",), cursor=encode_cursor(NEXT, [10])
+        )
+    ),
+    "UserRepository.get_in_meeting": (
+        lambda s: UserRepository().get_in_meeting(s, 1, ("email",))
+    ),
+    "UserRepository.search": (
+        lambda s: UserRepository().search(s, "User1_%")
+    ),
+    "UserRepository.is_auth": lambda s: UserRepository().is_auth(
+        s, "user1@example.com", "password"
+    ),
+    "TaskRepository.get_all_user_tasks": (
+        lambda s: TaskRepository().get_all_user_tasks(s, 3)
+    ),
+    "TaskRepository.get_all_user_tasks:cursor": (
+        lambda s: TaskRepository().get_all_user_tasks(
+            s, 3, cursor=encode_cursor(NEXT, [100])
+        )
+    ),
+    "TaskRepository.get_list_version": (
+        lambda s: TaskRepository().get_list_version(s, 3)
+    ),
+    "TaskRepository.get_version": (
+        lambda s: TaskRepository().get_version(s, 3)
+    ),
+    "TaskRepository.get_task_with_date": (
+        lambda s: TaskRepository().get_task_with_date(
+            s, 3, NOW, NOW + datetime.timedelta(days=30)
+        )
+    ),
+    "TaskRepository.get_user_tasks": (
+        lambda s: TaskRepository().get_user_tasks(s, 2, 3)
+    ),
+    "TaskChatRepository.get_history": (
+        lambda s: TaskChatRepository().get_history(s, 3)
+    ),
+    "TaskChatRepository.get_history:cursor": (
+        lambda s: TaskChatRepository().get_history(
+            s, 3, encode_cursor(PREV, [NOW, 10])
+        )
+    ),
+    "TeamRepository.get_all": lambda s: TeamRepository().get_all(s),
+    "TeamRepository.paginate:cursor": lambda s: TeamRepository().paginate(
+        s, encode_cursor(NEXT, [3])
+    ),
+    "TeamRepository.get": lambda s: TeamRepository().get(s, 1),
+    "TeamRepository.get_version": (
+        lambda s: TeamRepository().get_version(s, 1)
+    ),
+    "TeamRepository.get_user_team": (
+        lambda s: TeamRepository().get_user_team(s, 11)
+    ),
+    "MeetingRepository.get": lambda s: MeetingRepository().get(s, 1),
+    "MeetingRepository.get_version": (
+        lambda s: MeetingRepository().get_version(s, 1)
+    ),
+    "MeetingRepository.get_all": lambda s: MeetingRepository().get_all(s),
+    "MeetingRepository.get_upcoming": (
+        lambda s: MeetingRepository().get_upcoming(s)
+    ),
+    "MeetingRepository.get_upcoming:cursor": (
+        lambda s: MeetingRepository().get_upcoming(
+            s, encode_cursor(NEXT, [NOW, 10])
+        )
+    ),
+    "MeetingRepository.get_meeting_with_date": (
+        lambda s: MeetingRepository().get_meeting_with_date(
+            s, NOW, NOW + datetime.timedelta(days=30), 2
+        )
+    ),
+    "MeetingRepository.get_busy_intervals": (
+        lambda s: MeetingRepository().get_busy_intervals(
+            s, list(range(1, 51)), NOW, NOW + datetime.timedelta(days=30)
+        )
+    ),
+    "MeetingRepository.get_busy_meetings": (
+        lambda s: MeetingRepository().get_busy_meetings(
+            s, [2, 3], NOW, NOW + datetime.timedelta(days=2)
+        )
+    ),
+    "CalendarRepository.get_overlapping": (
+        lambda s: CalendarRepository().get_overlapping(
+            s, 2, NOW, NOW + datetime.timedelta(days=7)
+        )
+    ),
+    "CalendarRepository.get_events": (
+        lambda s: CalendarRepository().get_events(s, 2, [
+            (NOW, NOW + datetime.timedelta(days=30)),
+            (NOW + datetime.timedelta(days=60),
+             NOW + datetime.timedelta(days=67)),
+        ])
+    ),
+    "SearchRepository.search": (
+        lambda s: SearchRepository().search(s, 2, "task meet")
+    ),
+    "SearchRepository.search:cursor": (
+        lambda s: SearchRepository().search(
+            s, 2, "task", cursor=encode_cursor(NEXT, [-1.5, "task", 10])
+        )
+    ),
+}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query_name", sorted(REPOSITORY_QUERIES))
+async def test_repository_query_plan(seeded_db, query_name):
+    engine, session_maker, statements = seeded_db
+    async with session_maker() as session:
+        await REPOSITORY_QUERIES[query_name](session)
+    assert statements
+
+    full_scans = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            for row in result:
+                if FULL_SCAN.search(row.detail):
+                    full_scans.append((row.detail, statement))
+
+    if query_name not in FULL_SCAN_ALLOWED:
+        assert not full_scans, full_scans
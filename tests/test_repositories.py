@@ -0,0 +1,320 @@
+import datetime
+
+import pytest
+
+from database.models import Meeting, MeetingParticipant, Task, TaskChat
+from database.repositories import (CalendarRepository, MeetingRepository,
+                                   TaskChatRepository, TaskRepository,
+                                   UserRepository)
+from tests.conftest import NOW
+
+
+@pytest.mark.asyncio
+async def test_available_users_anti_join(seeded_db):
+    _, session_maker, _ = seeded_db
+    user_repo = UserRepository()
+
+    async with session_maker() as session:
+        not_in_team = await user_repo.get_not_in_team(session, 1, limit=100)
+        not_in_meeting = await user_repo.get_not_in_meeting(
+            session, 1, prefix="User1", limit=100
+        )
+
+    # Команда 1: пользователи 1, 11, 21, 31, 41
+    team_ids = [user.id for user in not_in_team.items]
+    assert len(team_ids) == 45
+    assert not {1, 11, 21, 31, 41} & set(team_ids)
+    assert not_in_team.items[0]._fields == ("id", "name", "lastname", "email")
+
+    # Встреча 1: участник 2; User1* — 1 и 10..19
+    meeting_ids = [user.id for user in not_in_meeting.items]
+    assert meeting_ids == [1] + list(range(10, 20))
+
+
+@pytest.mark.asyncio
+async def test_search_escapes_wildcards(seeded_db):
+    _, session_maker, _ = seeded_db
+    async with session_maker() as session:
+        plain = await UserRepository().search(session, "user4", limit=20)
+        wildcard = await UserRepository().search(session, "user_", limit=20)
+
+    assert sorted(row.id for row in plain) == [4] + list(range(40, 50))
+    assert wildcard == []
+
+
+@pytest.mark.asyncio
+async def test_search_folds_cyrillic_case(seeded_db):
+    _, session_maker, _ = seeded_db
+    user_repo = UserRepository()
+    async with session_maker() as session:
+        user = await user_repo.add(session, {
+            "name": "Иван", "lastname": "Петров",
+            "email": "ivan@example.com", "password_hash": "x"
+        })
+        by_name = await user_repo.search(session, "ив")
+        by_lastname = await user_repo.search(session, "ПЕТ")
+        # UPDATE мимо ORM пересчитывает ключи поиска
+        await user_repo.update(session, user.id, {"lastname": "Ёлкин"})
+        renamed = await user_repo.search(session, "ёлк")
+        stale = await user_repo.search(session, "пет")
+
+    assert [row.id for row in by_name] == [user.id]
+    assert [row.id for row in by_lastname] == [user.id]
+    assert [row.lastname for row in renamed] == ["Ёлкин"]
+    assert stale == []
+
+
+@pytest.mark.asyncio
+async def test_calendar_events_single_query(seeded_db):
+    _, session_maker, statements = seeded_db
+
+    async with session_maker() as session:
+        events = await CalendarRepository().get_events(session, 2, [
+            (NOW, NOW + datetime.timedelta(hours=48)),
+            (NOW + datetime.timedelta(hours=51),
+             NOW + datetime.timedelta(hours=52)),
+        ])
+
+    # Пользователь 2: встречи и задачи 1 и 51 (часы от NOW)
+    assert len(statements) == 1
+    assert [(event.type, event.id) for event in events] == [
+        ("meeting", 1), ("task", 1), ("meeting", 51), ("task", 51)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_calendar_version_sees_direct_writes(seeded_db):
+    _, session_maker, statements = seeded_db
+    calendar_repo = CalendarRepository()
+
+    async def versions(*user_ids):
+        async with session_maker() as session:
+            return [
+                await calendar_repo.get_version(session, user_id)
+                for user_id in user_ids
+            ]
+
+    before = await versions(2, 3, 9)
+    statements.clear()
+    await versions(2)
+    assert len(statements) == 1
+
+    # Правка из админки идёт мимо репозиториев: ORM-объект и коммит
+    async with session_maker() as session:
+        task = await session.get(Task, 1)
+        task.performer = 3
+        session.add(MeetingParticipant(meeting_id=1, user_id=9))
+        await session.commit()
+
+    after = await versions(2, 3, 9)
+    assert all(old != new for old, new in zip(before, after))
+
+
+@pytest.mark.asyncio
+async def test_calendar_version_follows_repository_writes(seeded_db):
+    _, session_maker, _ = seeded_db
+    calendar_repo = CalendarRepository()
+
+    async with session_maker() as session:
+        before = await calendar_repo.get_version(session, 3)
+        # Встреча 2: участник 3; удаление меняет состав, а не версии
+        await MeetingRepository().delete(session, 2)
+        after_delete = await calendar_repo.get_version(session, 3)
+        # Задача 1: исполнитель 2 переходит к 3
+        await TaskRepository().update(session, 1, {"performer": 3})
+        after_update = await calendar_repo.get_version(session, 3)
+
+    assert len({before, after_delete, after_update}) == 3
+
+
+@pytest.mark.asyncio
+async def test_overlapping_spans_follow_writes(seeded_db):
+    _, session_maker, _ = seeded_db
+    calendar_repo = CalendarRepository()
+    hour = datetime.timedelta(hours=1)
+
+    async with session_maker() as session:
+        # Пользователь 2: встреча 1 в 13:00-14:00; задача 1 — от дедлайна
+        # в 13:00 до created_at (момент вставки)
+        spans = await calendar_repo.get_overlapping(
+            session, 2, NOW, NOW + hour
+        )
+        assert [(span.type, span.id) for span in spans] == [
+            ("meeting", 1), ("task", 1)
+        ]
+
+        await MeetingRepository().update(session, 1, {
+            "date": NOW + 10 * hour, "duration": 30
+        })
+        await TaskRepository().update(session, 1, {"performer": 3})
+        assert await calendar_repo.get_overlapping(
+            session, 2, NOW, NOW + hour
+        ) == []
+
+        moved = await calendar_repo.get_overlapping(
+            session, 2, NOW + 10 * hour + datetime.timedelta(minutes=29),
+            NOW + 11 * hour
+        )
+        assert [(span.type, span.id) for span in moved] == [("meeting", 1)]
+        assert moved[0].end == NOW + 10 * hour + datetime.timedelta(
+            minutes=30
+        )
+        # Сразу после конца встречи пересечения уже нет
+        assert await calendar_repo.get_overlapping(
+            session, 2, NOW + 10 * hour + datetime.timedelta(seconds=1801),
+            NOW + 11 * hour
+        ) == []
+
+        await MeetingRepository().delete_member(session, 1, 2)
+        assert await calendar_repo.get_overlapping(
+            session, 2, NOW + 10 * hour, NOW + 11 * hour
+        ) == []
+
+
+@pytest.mark.asyncio
+async def test_task_chat_history_pages(seeded_db):
+    _, session_maker, statements = seeded_db
+    async with session_maker() as session:
+        # Одинаковое время у соседних сообщений: порядок добирает id
+        session.add_all([
+            TaskChat(user_id=i % 3 + 1, task_id=1, text=f"message {i}",
+                     created_at=NOW + datetime.timedelta(minutes=i // 2))
+            for i in range(25)
+        ])
+        await session.commit()
+
+    texts, cursor, pages = [], None, 0
+    while True:
+        async with session_maker() as session:
+            statements.clear()
+            page = await TaskChatRepository().get_history(
+                session, 1, cursor, limit=10
+            )
+            # Страница и её авторы — два запроса независимо от размера
+            assert len(statements) == 2
+            authors = {message.user.id for message in page.items}
+        texts = [message.text for message in page.items] + texts
+        pages += 1
+        if not page.prev_cursor:
+            break
+        cursor = page.prev_cursor
+
+    # Сообщение из фикстуры ("hi") создано текущим временем — позже NOW
+    assert pages == 3
+    assert texts == [f"message {i}" for i in range(25)] + ["hi"]
+    assert authors <= {1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_versions_follow_writes(seeded_db):
+    _, session_maker, _ = seeded_db
+    task_repo = TaskRepository()
+    meeting_repo = MeetingRepository()
+
+    async with session_maker() as session:
+        task_version = await task_repo.get_version(session, 1)
+        list_version = await task_repo.get_list_version(session, 2)
+        meeting_version = await meeting_repo.get_version(session, 1)
+        assert await task_repo.get_version(session, 10_000) is None
+
+        # update() репозитория (Core) и update_status (flush ORM)
+        await task_repo.update(session, 1, {"description": "Changed"})
+        task = await task_repo.update_status(session, 1, "in_work")
+        assert task.version == 3
+        assert task.updated_at is not None
+
+        # Новый участник меняет страницу встречи через touch
+        await meeting_repo.add_member(session, 1, 3)
+        meeting = await session.get(Meeting, 1)
+        assert meeting.version == 2
+
+        assert await task_repo.get_version(session, 1) != task_version
+        assert await task_repo.get_list_version(session, 2) != list_version
+        assert await meeting_repo.get_version(session, 1) != meeting_version
+
+
+@pytest.mark.asyncio
+async def test_sparse_fields_select_only_requested_columns(seeded_db):
+    _, session_maker, statements = seeded_db
+    task_repo = TaskRepository()
+
+    async with session_maker() as session:
+        statements.clear()
+        first = await task_repo.fetch_page(
+            session,
+            task_repo.user_tasks_query(2, limit=3, fields=("status",))
+        )
+        second = await task_repo.fetch_page(
+            session,
+            task_repo.user_tasks_query(
+                2, first.next_cursor, limit=3, fields=("status",)
+            )
+        )
+        members = await UserRepository().get_in_team(
+            session, 1, ("email",), limit=100
+        )
+
+    # id добавляется как ключ курсора, остальные колонки не читаются
+    assert first.items[0]._fields == ("status", "id")
+    assert "description" not in statements[0][0]
+    assert [task.id for task in first.items + second.items] == [
+        1, 6, 11, 16, 21, 26
+    ]
+    assert [user.email for user in members.items] == [
+        f"user{i}@example.com" for i in (1, 11, 21, 31, 41)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_task_operations(seeded_db):
+    _, session_maker, _ = seeded_db
+    task_repo = TaskRepository()
+    calendar_repo = CalendarRepository()
+
+    async with session_maker() as session:
+        before = [
+            await calendar_repo.get_version(session, user_id)
+            for user_id in (2, 7)
+        ]
+        # Пользователь 2 создал задачи 1, 6, 11 ...; задача 2 — чужая
+        assert await task_repo.bulk_update_status(
+            session, [1, 2, 6], "in_work", user_id=2
+        ) == 2
+        # Статус меняет и исполнитель: задача 6 создана 2, исполнитель 7
+        assert await task_repo.bulk_update_status(
+            session, [6], "completed", user_id=7
+        ) == 1
+        assert await task_repo.bulk_shift_deadline(
+            session, [1, 2], datetime.timedelta(days=1), user_id=2
+        ) == 1
+        assert await task_repo.bulk_reassign(
+            session, [1, 6, 2], 3, user_id=2
+        ) == 2
+        with pytest.raises(ValueError):
+            await task_repo.bulk_reassign(session, [1], 10_000)
+        # Без user_id (админка) — без фильтра по автору
+        assert await task_repo.bulk_delete(session, [2, 3, 10_000]) == 2
+        assert await task_repo.bulk_update_status(session, [], "open") == 0
+
+    async with session_maker() as session:
+        tasks = {task.id: task for task in await task_repo.filter_by(session)}
+        chat = await session.scalars(
+            TaskChat.__table__.select().with_only_columns(TaskChat.task_id)
+        )
+        after = [
+            await calendar_repo.get_version(session, user_id)
+            for user_id in (2, 7)
+        ]
+
+    assert (tasks[1].status.code, tasks[6].status.code) == (
+        "in_work", "completed"
+    )
+    assert tasks[1].deadline == NOW + datetime.timedelta(hours=1, days=1)
+    assert tasks[11].deadline == NOW + datetime.timedelta(hours=11)
+    assert (tasks[1].performer, tasks[6].performer) == (3, 3)
+    # status, deadline, performer — три UPDATE одной задачи
+    assert tasks[1].version == 4
+    assert 2 not in tasks and 3 not in tasks
+    assert not {2, 3} & set(chat.all())
+    # Исполнители задач 1 и 6 до переназначения
+    assert after[0] != before[0] and after[1] != before[1]
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from applications.meeting.scheduling import (find_common_slots,
+                                             find_conflicts, free_slots,
+                                             merge_intervals)
+from database.repositories import MeetingRepository
+from tests.conftest import NOW
+
+
+def at(hour, minute=0, day=2):
+    # 2 марта 2026 — понедельник
+    return datetime(2026, 3, day, hour, minute)
+
+
+def test_merge_intervals_sweep():
+    assert merge_intervals([
+        (at(13), at(14)), (at(9), at(10)), (at(9, 30), at(11)),
+        (at(11), at(12)), (at(13, 15), at(13, 45)),
+    ]) == [(at(9), at(12)), (at(13), at(14))]
+
+
+def test_free_slots_within_working_hours():
+    busy = merge_intervals([(at(8), at(10)), (at(12), at(17, 30))])
+    slots = free_slots(busy, at(0), at(0, day=4), timedelta(hours=1))
+
+    assert slots == [
+        (at(10), at(12)),
+        (at(9, day=3), at(18, day=3)),
+    ]
+    # Выходные пропускаются: 7-8 марта — суббота и воскресенье
+    assert free_slots([], at(0, day=7), at(0, day=9),
+                      timedelta(minutes=30)) == []
+
+
+def test_free_slots_busy_across_days():
+    busy = [(at(17), at(10, day=3))]
+    assert free_slots(busy, at(9), at(18, day=3), timedelta(hours=2)) == [
+        (at(9), at(17)), (at(10, day=3), at(18, day=3))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_common_slots_and_conflicts(seeded_db):
+    _, session_maker, _ = seeded_db
+    meeting_repo = MeetingRepository()
+
+    # Встреча i у пользователя i % 50 + 1 начинается через i часов от NOW
+    async with session_maker() as session:
+        conflicts = await find_conflicts(
+            session, meeting_repo, [2, 3, 4], NOW + timedelta(minutes=90),
+            timedelta(hours=1)
+        )
+        slots = await find_common_slots(
+            session, meeting_repo, [2, 3], NOW, NOW + timedelta(hours=6),
+            timedelta(minutes=30)
+        )
+
+    # Пользователь 2 занят 13-14, 3 — 14-15, 4 — 15-16
+    assert conflicts == [2, 3]
+    assert slots == [
+        (NOW, NOW + timedelta(hours=1)),
+        (NOW + timedelta(hours=3), NOW + timedelta(hours=6)),
+    ]
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from applications.meeting import router as meeting_router
+from applications.task import router as task_router
+from applications.team import router as team_router
+import main
+from templating import create_environment, precompile_templates, templates
+from utils import coalesce_chunks
+
+
+def test_routers_share_one_environment():
+    assert task_router.templates is templates
+    assert team_router.templates is templates
+    assert meeting_router.templates is templates
+    assert main.templates is templates
+
+
+def test_precompile_fills_bytecode_cache(tmp_path):
+    env = create_environment(str(tmp_path))
+    count = precompile_templates(env)
+
+    assert count == len(env.list_templates())
+    assert "base.html" in env.list_templates()
+    # Байткод каждого шаблона лежит на диске для следующего процесса
+    assert len(list(tmp_path.iterdir())) == count
+
+    # Новое окружение берёт байткод из кэша, а не компилирует исходник
+    fresh = create_environment(str(tmp_path))
+    fresh.compile = None
+    fresh.get_template("base.html")
+
+
+@pytest.mark.asyncio
+async def test_coalesce_chunks_flushes_when_render_waits():
+    rows = asyncio.Event()
+
+    async def render():
+        yield "<html>"
+        yield "<body>"
+        await rows.wait()
+        for row in range(3):
+            yield f"<p>{row}</p>"
+        yield "</body>"
+
+    chunks = coalesce_chunks(render())
+    # Оболочка уходит, не дожидаясь строк
+    assert await chunks.__anext__() == "<html><body>"
+    rows.set()
+    assert [chunk async for chunk in chunks] == [
+        "<p>0</p><p>1</p><p>2</p></body>"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_chunks_reraises_render_errors():
+    async def render():
+        yield "<html>"
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        async for _ in coalesce_chunks(render()):
+            pass
@@ -1,8 +1,37 @@
+import asyncio
 from fastapi.requests import Request
 from fastapi.templating import Jinja2Templates
-from starlette.responses import Response
-from typing import Optional
+from starlette.responses import Response, StreamingResponse
+from typing import AsyncIterator, Callable, Dict, Optional
+from database.database import AsyncSession, read_session_maker
 from database.models import User  # замени на свой путь
+from templating import stream_env
+
+
+# Сколько кусков рендера может ждать отправки: дальше рендер
+# приостанавливается, пока клиент не заберёт уже готовое
+STREAM_MAX_PENDING = 256
+
+
+def is_partial(request: Request) -> bool:
+    # Запрос от htmx (заголовок HX-Request): вместо 303 на всю страницу
+    # отвечаем только изменившимся фрагментом
+    return request.headers.get("HX-Request") == "true"
+
+
+def is_api(request: Request) -> bool:
+    # JSON API (/api/v1/...): ошибки отдаются JSON, а не страницами
+    return request.url.path.startswith("/api/")
+
+
+def _user_context(user: User) -> dict:
+    return {
+        "id": user.id,
+        "name": user.name,
+        "lastname": user.lastname,
+        "email": user.email,
+        "role": user.role
+    }
 
 
 def render_template(
@@ -14,13 +43,81 @@ def render_template(
     status_code: int = 200
 ) -> Response:
     if user:
-        context["user"] = {
-            "name": user.name,
-            "lastname": user.lastname,
-            "email": user.email,
-            "role": user.role
-        }
+        context["user"] = _user_context(user)
     context["request"] = request
     return templates.TemplateResponse(
         template_name, context, status_code=status_code
     )
+
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[str], max_pending: int = STREAM_MAX_PENDING
+) -> AsyncIterator[str]:
+    # generate_async отдаёт по куску на каждый узел шаблона. Рендер идёт
+    # отдельной задачей, а накопленное уходит одним куском, как только он
+    # упирается в ожидание (выборку из базы): оболочка страницы уходит до
+    # первого запроса, строки — пачками, а не сотнями мелких send
+    queue: asyncio.Queue = asyncio.Queue(max_pending)
+
+    async def produce():
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+        except Exception as error:
+            await queue.put(error)
+        else:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            parts = []
+            item = await queue.get()
+            while isinstance(item, str):
+                parts.append(item)
+                if queue.empty():
+                    break
+                item = queue.get_nowait()
+            if parts:
+                yield "".join(parts)
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                return
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+def stream_template(
+    request: Request,
+    template_name: str,
+    context: dict,
+    user: Optional[User] = None,
+    streams: Optional[
+        Dict[str, Callable[[AsyncSession], AsyncIterator]]
+    ] = None,
+    status_code: int = 200,
+    session_maker=read_session_maker
+) -> Response:
+    # Потоковый рендер для длинных списков. streams — имя в контексте ->
+    # функция от сессии, возвращающая асинхронный итератор строк. Сессия
+    # открывается внутри тела ответа: зависимость get_db закрывается
+    # раньше, чем StreamingResponse начнёт его отдавать
+    if user:
+        context["user"] = _user_context(user)
+    context["request"] = request
+    template = stream_env.get_template(template_name)
+
+    async def body():
+        async with session_maker() as session:
+            for name, stream in (streams or {}).items():
+                context[name] = stream(session)
+            async for chunk in coalesce_chunks(
+                template.generate_async(context)
+            ):
+                yield chunk
+
+    return StreamingResponse(
+        body(), status_code=status_code, media_type="text/html"
+    )